@@ -1,26 +1,116 @@
 import os
-import traceback
 from flask import Flask
 from flask_cors import CORS
 
-from util import get_database_url
+from util import get_database_url, get_engine_options
 from models.database import db, migrate
 from models.casting import Actor, Movie, actor_movie_relation
-from routes import health_blueprint, casting_blueprint
+from routes import health_blueprint, metrics_blueprint, casting_blueprint
 from errors import errors_blueprint
+from commands import catalog_cli
+from encoders import FastJSONEncoder
+from cache import create_response_cache
+from replicas import ReplicaRouter, create_sticky_store, get_replica_binds
+from instrumentation import instrument_app, start_metrics_directory
+from metrics import MetricsDirectory
+from profiler import start_background_profiler
+from slow_queries import install_slow_query_log
 
 def create_app(database_url):
     app = Flask(__name__)
     app.config['JSON_SORT_KEYS'] = False
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(database_url)
+    app.config['SQLALCHEMY_BINDS'] = get_replica_binds([
+        url
+        for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+        if url
+    ])
+    app.config['REPLICA_STICKY_SECONDS'] = float(
+        os.getenv('REPLICA_STICKY_SECONDS', 5)
+    )
+    app.config['REPLICA_RETRY_SECONDS'] = float(
+        os.getenv('REPLICA_RETRY_SECONDS', 30)
+    )
+    app.config['REPLICA_STICKY_URL'] = os.getenv(
+        'REPLICA_STICKY_URL',
+        os.getenv('RESPONSE_CACHE_URL')
+    )
+    app.config['PAGE_SIZE_DEFAULT'] = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    app.config['PAGE_SIZE_MAX'] = int(os.getenv('PAGE_SIZE_MAX', 200))
+    app.config['BATCH_SIZE_MAX'] = int(os.getenv('BATCH_SIZE_MAX', 1000))
+    app.config['STREAM_BATCH_SIZE'] = int(
+        os.getenv('STREAM_BATCH_SIZE', 1000)
+    )
+    app.config['FAST_SERIALIZATION'] = bool(int(
+        os.getenv('FAST_SERIALIZATION', 1)
+    ))
+    app.config['FAST_JSON'] = bool(int(os.getenv('FAST_JSON', 1)))
+    if app.config['FAST_JSON']:
+        app.config['JSON_AS_ASCII'] = False
+        app.json_encoder = FastJSONEncoder
+    app.config['PROFILING_ENABLED'] = bool(int(
+        os.getenv('PROFILING_ENABLED', 0)
+    ))
+    app.config['PROFILING_SAMPLE_INTERVAL'] = float(
+        os.getenv('PROFILING_SAMPLE_INTERVAL', 0.001)
+    )
+    app.config['PROFILING_BACKGROUND_INTERVAL'] = float(
+        os.getenv('PROFILING_BACKGROUND_INTERVAL', 0)
+    )
+    app.config['PROFILING_DIRECTORY'] = os.getenv(
+        'PROFILING_DIRECTORY',
+        'profiles'
+    )
+    app.config['PROFILING_FLUSH_INTERVAL'] = float(
+        os.getenv('PROFILING_FLUSH_INTERVAL', 60)
+    )
+    app.config['METRICS_DIRECTORY'] = os.getenv('METRICS_DIRECTORY')
+    app.config['METRICS_FLUSH_INTERVAL'] = float(
+        os.getenv('METRICS_FLUSH_INTERVAL', 1)
+    )
+    app.config['SLOW_QUERY_SECONDS'] = float(
+        os.getenv('SLOW_QUERY_SECONDS', 0.25)
+    )
+    app.config['SLOW_QUERY_RATE_SECONDS'] = float(
+        os.getenv('SLOW_QUERY_RATE_SECONDS', 60)
+    )
+    app.config['SLOW_QUERY_EXPLAIN'] = bool(int(
+        os.getenv('SLOW_QUERY_EXPLAIN', 1)
+    ))
+    app.config['RESPONSE_CACHE_SIZE'] = int(
+        os.getenv('RESPONSE_CACHE_SIZE', 1000)
+    )
+    app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL')
+    app.config['RESPONSE_CACHE_TTL'] = int(
+        os.getenv('RESPONSE_CACHE_TTL', 300)
+    )
+    app.extensions['response_cache'] = create_response_cache(app.config)
+    if app.config['METRICS_DIRECTORY']:
+        app.extensions['metrics_directory'] = MetricsDirectory(
+            app.config['METRICS_DIRECTORY'],
+            interval=app.config['METRICS_FLUSH_INTERVAL']
+        )
+    app.extensions['replica_router'] = ReplicaRouter(
+        app.config['SQLALCHEMY_BINDS'],
+        sticky_seconds=app.config['REPLICA_STICKY_SECONDS'],
+        retry_seconds=app.config['REPLICA_RETRY_SECONDS'],
+        sticky_store=create_sticky_store(app.config)
+    )
     db.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
+    instrument_app(app)
+    install_slow_query_log(app)
+    app.before_first_request(lambda: start_background_profiler(app))
+    app.before_first_request(lambda: start_metrics_directory(app))
 
     app.register_blueprint(health_blueprint)
+    app.register_blueprint(metrics_blueprint)
     app.register_blueprint(casting_blueprint)
     app.register_blueprint(errors_blueprint)
+    app.cli.add_command(catalog_cli)
     return app
 
 
@@ -0,0 +1,369 @@
+import logging
+from types import SimpleNamespace
+from databases import Database
+from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Query
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException, NotFound
+
+from app import create_app
+from auth import (
+    check_permissions,
+    parse_bearer_token,
+    token_cache,
+    verify_token
+)
+from encoders import FastJSONEncoder
+from errors import (
+    create_http_error,
+    create_internal_error,
+    create_validation_error
+)
+from models.casting import Actor, Movie, actor_movie_relation, select_versions
+from routes.casting import filter_actors, filter_movies, find_tables
+from schema import (
+    ActorSchema,
+    MovieSchema,
+    ActorFieldsSchema,
+    MovieFieldsSchema,
+    ActorPageSchema,
+    MoviePageSchema
+)
+from serializers import get_schema, get_serializer
+from util import (
+    get_database_url,
+    page_query,
+    split_page,
+    create_validators,
+    is_not_modified,
+    create_validator_headers
+)
+
+
+logger = logging.getLogger(__name__)
+
+json_encoder = FastJSONEncoder(ensure_ascii=False, sort_keys=False)
+
+relationships = {
+    'movies': (Movie, 'actor_id', 'movie_id'),
+    'actors': (Actor, 'movie_id', 'actor_id')
+}
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return json_encoder.encode(content).encode('utf-8')
+
+
+async def authenticate(request, permission):
+    token = parse_bearer_token(request.headers.get('Authorization'))
+    payload = token_cache.get(token)
+    if payload is None:
+        # Verifying a token that is not cached may fetch the JWKS, which
+        # would block the event loop.
+        payload = await run_in_threadpool(verify_token, token)
+        token_cache.set(token, payload)
+
+    check_permissions(permission, payload)
+    return payload
+
+
+def load_query_params(request, schema_class):
+    args = MultiDict(request.query_params.multi_items())
+    with request.app.state.flask_app.app_context():
+        return get_schema(schema_class).load(args)
+
+
+def create_serializer(request, schema_class, page):
+    return get_serializer(
+        schema_class,
+        only=page['only'],
+        exclude=page['exclude'],
+        fast=request.app.state.flask_app.config['FAST_SERIALIZATION']
+    )
+
+
+def select_columns(model, page):
+    names = [column.key for column in model.__table__.columns]
+    if page['only'] is not None:
+        selected = ['id', page.get('sort', 'id').lstrip('-')] + page['only']
+        names = [name for name in names if name in selected]
+
+    return Query([getattr(model, name) for name in names])
+
+
+async def fetch_rows(database, query):
+    records = await database.fetch_all(query)
+    return [SimpleNamespace(**dict(record)) for record in records]
+
+
+async def load_related(database, rows, relationship):
+    model, owner_key, related_key = relationships[relationship]
+    related = {row.id: [] for row in rows}
+    for row in rows:
+        setattr(row, relationship, related[row.id])
+
+    if not related:
+        return
+
+    owner_id = actor_movie_relation.c[owner_key]
+    query = select([owner_id, *model.__table__.columns]).\
+        select_from(
+            model.__table__.join(
+                actor_movie_relation,
+                actor_movie_relation.c[related_key] == model.id
+            )
+        ).\
+        where(owner_id.in_(list(related))).\
+        order_by(model.id)
+
+    for record in await database.fetch_all(query):
+        values = dict(record)
+        related[values.pop(owner_key)].append(SimpleNamespace(**values))
+
+
+async def fetch_page(database, query, model, page, limit, cursor):
+    rows = await fetch_rows(
+        database,
+        page_query(query, model.id, limit, cursor, page['sort']).statement
+    )
+    for relationship in page['expand']:
+        await load_related(database, rows, relationship)
+    return rows
+
+
+async def respond_conditionally(request, tables, render):
+    database = request.app.state.database
+    versions = [
+        (record['name'], record['version'], record['updated_at'])
+        for record in await database.fetch_all(select_versions(tables))
+    ]
+    full_path = f'{request.url.path}?{request.url.query}'
+    etag, last_modified = create_validators(versions, full_path)
+    headers = create_validator_headers(etag, last_modified)
+
+    if is_not_modified(etag, last_modified, request.headers):
+        return Response(status_code=304, headers=headers)
+
+    response = await render()
+    response.headers.update(headers)
+    return response
+
+
+def stream_page(request, query, model, page, serialize):
+    database = request.app.state.database
+    batch_size = request.app.state.flask_app.config['STREAM_BATCH_SIZE']
+    name = page['sort'].lstrip('-')
+
+    async def generate():
+        yield '{"success": true, "data": ['
+
+        separator = ''
+        cursor = None
+        while True:
+            rows = await fetch_page(
+                database,
+                query,
+                model,
+                page,
+                batch_size,
+                cursor
+            )
+            chunk = [
+                separator + json_encoder.encode(serialize(row))
+                for row in rows[:batch_size]
+            ]
+            if chunk:
+                yield ','.join(chunk)
+                separator = ','
+
+            if len(rows) <= batch_size:
+                break
+
+            last = rows[batch_size - 1]
+            cursor = {'value': getattr(last, name), 'id': last.id}
+
+        yield ']}'
+
+    return StreamingResponse(generate(), media_type='application/json')
+
+
+async def list_entities(request, model, schema_class, page, filter_rows):
+    query = filter_rows(select_columns(model, page), page)
+    serialize = create_serializer(request, schema_class, page)
+
+    if page['stream']:
+        return stream_page(request, query, model, page, serialize)
+
+    rows = await fetch_page(
+        request.app.state.database,
+        query,
+        model,
+        page,
+        page['limit'],
+        page['cursor']
+    )
+    rows, next_cursor = split_page(rows, model.id, page['limit'], page['sort'])
+
+    return FastJSONResponse({
+        'success': True,
+        'data': [serialize(row) for row in rows],
+        'next_cursor': next_cursor
+    })
+
+
+async def show_entity(request, model, schema_class, page, entity_id):
+    query = select_columns(model, page).\
+        filter(model.id == entity_id)
+    database = request.app.state.database
+
+    rows = await fetch_rows(database, query.statement)
+    if not rows:
+        return None
+
+    for relationship in page['expand']:
+        await load_related(database, rows, relationship)
+    serialize = create_serializer(request, schema_class, page)
+
+    return FastJSONResponse({
+        'success': True,
+        'data': [serialize(rows[0])]
+    })
+
+
+async def health(request):
+    return FastJSONResponse({
+        'success': True
+    })
+
+
+async def retrieve_actors(request):
+    await authenticate(request, 'get:actors')
+    page = load_query_params(request, ActorPageSchema)
+    tables = find_tables('actor', 'movie', page, 'movie_id')
+
+    return await respond_conditionally(
+        request,
+        tables,
+        lambda: list_entities(request, Actor, ActorSchema, page, filter_actors)
+    )
+
+
+async def retrieve_actor(request):
+    await authenticate(request, 'get:actors')
+    actor_id = request.path_params['actor_id']
+    page = load_query_params(request, ActorFieldsSchema)
+    tables = find_tables('actor', 'movie', page, None)
+
+    async def render():
+        response = await show_entity(
+            request,
+            Actor,
+            ActorSchema,
+            page,
+            actor_id
+        )
+        if response is None:
+            raise NotFound(
+                description=f'An actor with the id "{actor_id}" was not found.'
+            )
+        return response
+
+    return await respond_conditionally(request, tables, render)
+
+
+async def retrieve_movies(request):
+    await authenticate(request, 'get:movies')
+    page = load_query_params(request, MoviePageSchema)
+    tables = find_tables('movie', 'actor', page, 'actor_id')
+
+    return await respond_conditionally(
+        request,
+        tables,
+        lambda: list_entities(request, Movie, MovieSchema, page, filter_movies)
+    )
+
+
+async def retrieve_movie(request):
+    await authenticate(request, 'get:movies')
+    movie_id = request.path_params['movie_id']
+    page = load_query_params(request, MovieFieldsSchema)
+    tables = find_tables('movie', 'actor', page, None)
+
+    async def render():
+        response = await show_entity(
+            request,
+            Movie,
+            MovieSchema,
+            page,
+            movie_id
+        )
+        if response is None:
+            raise NotFound(
+                description=f'A movie with the id "{movie_id}" was not found.'
+            )
+        return response
+
+    return await respond_conditionally(request, tables, render)
+
+
+async def validation_error(request, exception):
+    return FastJSONResponse(create_validation_error(exception), 400)
+
+
+async def handle_exception(request, exception):
+    return FastJSONResponse(create_http_error(exception), exception.code)
+
+
+async def internal_error(request, exception):
+    logger.exception(
+        'Exception on %s %s',
+        request.method,
+        request.url.path,
+        exc_info=exception
+    )
+    return FastJSONResponse(create_internal_error(), 500)
+
+
+def create_asgi_app(database_url):
+    flask_app = create_app(database_url)
+    database = Database(database_url)
+
+    app = Starlette(
+        routes=[
+            Route('/health', health),
+            Route('/actors', retrieve_actors, methods=['GET']),
+            Route(
+                '/actors/{actor_id:int}',
+                retrieve_actor,
+                methods=['GET']
+            ),
+            Route('/movies', retrieve_movies, methods=['GET']),
+            Route(
+                '/movies/{movie_id:int}',
+                retrieve_movie,
+                methods=['GET']
+            ),
+            # Writes and every other route are served by the Flask app.
+            Mount('/', WSGIMiddleware(flask_app))
+        ],
+        exception_handlers={
+            ValidationError: validation_error,
+            HTTPException: handle_exception,
+            Exception: internal_error
+        },
+        on_startup=[database.connect],
+        on_shutdown=[database.disconnect]
+    )
+    app.state.flask_app = flask_app
+    app.state.database = database
+    return app
+
+
+app = create_asgi_app(get_database_url())
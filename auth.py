@@ -1,22 +1,46 @@
+import os
 import json
-from flask import request
-from werkzeug.exceptions import BadRequest, Unauthorized, Forbidden
+import time
+import hashlib
+import logging
+import threading
+from flask import g, request
+from werkzeug.exceptions import (
+    BadRequest,
+    Unauthorized,
+    Forbidden,
+    ServiceUnavailable
+)
 from functools import wraps
-from jose import jwt
+from collections import OrderedDict
+from jose import jwk, jwt
 from urllib.request import urlopen
 
+from instrumentation import timed
+from profiler import PROFILE_PERMISSION, get_profile_mode, profile_request
+
 AUTH0_DOMAIN = 'chad-fsnd.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'casting'
+JWKS_URL = os.getenv(
+    'JWKS_URL',
+    f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
+)
+
+logger = logging.getLogger(__name__)
 
 
 def get_bearer_token():
-    if 'Authorization' not in request.headers:
+    return parse_bearer_token(request.headers.get('Authorization'))
+
+
+def parse_bearer_token(header):
+    if header is None:
         raise Unauthorized(
             description='Authorization header is expected.'
         )
 
-    parts = request.headers['Authorization'].split(' ')
+    parts = header.split(' ')
     if parts[0].lower() != 'bearer':
         raise Unauthorized(
             description='Authorization header must start with "Bearer".'
@@ -34,37 +58,244 @@ def get_bearer_token():
     return token
 
 
-def get_jwks():
-    url = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(url.read())
-    return jwks
+def create_key_registry(jwks):
+    registry = {}
+    for key in jwks['keys']:
+        if 'kid' not in key or key.get('kty') != 'RSA':
+            continue
 
+        if key.get('use', 'sig') != 'sig':
+            continue
 
-def find_rsa_key(unverified_header, jwks):
-    rsa_key = {}
-    if 'kid' not in unverified_header:
-        raise Unauthorized(
-            description='Authorization malformed.'
-        )
+        try:
+            registry[key['kid']] = jwk.construct(
+                {
+                    'kty': key['kty'],
+                    'kid': key['kid'],
+                    'n': key['n'],
+                    'e': key['e']
+                },
+                ALGORITHMS[0]
+            )
+        except Exception:
+            logger.warning(
+                'Skipping the unusable JWKS key "%s".',
+                key['kid'],
+                exc_info=True
+            )
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
+    return registry
+
+
+class JWKSCache:
+    def __init__(
+        self,
+        url,
+        ttl=3600,
+        refresh_margin=300,
+        min_refetch_interval=30,
+        fetch_timeout=5
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl)
+        self.min_refetch_interval = min_refetch_interval
+        self.fetch_timeout = fetch_timeout
+
+        self._keys = {}
+        self._attempted_at = None
+        self._completed_at = None
+        self._refresh_at = 0
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._refreshing = False
+
+    def fetch(self):
+        with urlopen(self.url, timeout=self.fetch_timeout) as response:
+            jwks = json.loads(response.read())
+
+        return create_key_registry(jwks)
+
+    def refresh(self, throttle=True):
+        requested_at = time.monotonic()
+        with self._lock:
+            # Single flight: a caller that waited on the lock reuses the
+            # result of the fetch that finished while it was waiting.
+            if self._completed_at is not None:
+                if self._completed_at >= requested_at:
+                    return self._keys
+
+                since_attempt = requested_at - self._attempted_at
+                if (
+                    throttle and
+                    self._keys and
+                    since_attempt < self.min_refetch_interval
+                ):
+                    return self._keys
+
+            self._attempted_at = time.monotonic()
+            try:
+                keys = self.fetch()
+            except Exception:
+                self._completed_at = time.monotonic()
+                if not self._keys:
+                    raise ServiceUnavailable(
+                        description=(
+                            'Unable to retrieve the authentication keys.'
+                        )
+                    )
+
+                logger.warning(
+                    'Unable to refresh the JWKS from %s,'
+                    ' serving the cached keys.',
+                    self.url,
+                    exc_info=True
+                )
+                self._refresh_at = (
+                    self._attempted_at + self.min_refetch_interval
+                )
+                return self._keys
+
+            self._completed_at = time.monotonic()
+            self._keys = keys
+            self._refresh_at = (
+                self._attempted_at + self.ttl - self.refresh_margin
+            )
+            self._expires_at = self._attempted_at + self.ttl
+            return keys
+
+    def refresh_in_background(self):
+        with self._background_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(throttle=False)
+            except Exception:
+                logger.warning(
+                    'Background JWKS refresh failed.',
+                    exc_info=True
+                )
+            finally:
+                with self._background_lock:
+                    self._refreshing = False
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def get_keys(self):
+        now = time.monotonic()
+        if not self._keys or now >= self._expires_at:
+            return self.refresh()
+
+        if now >= self._refresh_at:
+            self.refresh_in_background()
+
+        return self._keys
+
+    def get_key(self, kid):
+        key = self.get_keys().get(kid)
+        if key is None:
+            # The IdP may have rotated its signing keys since the last
+            # fetch, so an unknown kid triggers one throttled refetch.
+            key = self.refresh().get(kid)
+
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._attempted_at = None
+            self._completed_at = None
+            self._refresh_at = 0
+            self._expires_at = 0
+
+
+jwks_cache = JWKSCache(
+    JWKS_URL,
+    ttl=float(os.getenv('JWKS_TTL', 3600)),
+    refresh_margin=float(os.getenv('JWKS_REFRESH_MARGIN', 300)),
+    min_refetch_interval=float(os.getenv('JWKS_MIN_REFETCH_INTERVAL', 30)),
+    fetch_timeout=float(os.getenv('JWKS_FETCH_TIMEOUT', 5))
+)
+
+
+class TokenCache:
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self.digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, token, payload):
+        expires_at = payload.get('exp')
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size
             }
 
-    return rsa_key
+
+token_cache = TokenCache(
+    max_size=int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+)
 
 
 def retrieve_rsa_key(unverified_header):
-    jwks = get_jwks()
-    rsa_key = find_rsa_key(unverified_header, jwks)
+    if 'kid' not in unverified_header:
+        raise Unauthorized(
+            description='Authorization malformed.'
+        )
+
+    rsa_key = jwks_cache.get_key(unverified_header['kid'])
 
-    if not rsa_key:
+    if rsa_key is None:
         raise BadRequest(
             description=(
                 'Unable to find the appropriate authentication key.'
@@ -75,6 +306,15 @@ def retrieve_rsa_key(unverified_header):
 
 
 def decode_token(token):
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        token_cache.set(token, payload)
+
+    return payload
+
+
+def verify_token(token):
     try:
         unverified_header = jwt.get_unverified_header(token)
         rsa_key = retrieve_rsa_key(unverified_header)
@@ -123,9 +363,20 @@ def requires_auth(permission=''):
     def requires_auth_decorator(function):
         @wraps(function)
         def wrapper(*args, **kwargs):
-            token = get_bearer_token()
-            token_payload = decode_token(token)
-            check_permissions(permission, token_payload)
-            return function(*args, **kwargs, token=token_payload)
+            profile_mode = get_profile_mode()
+
+            def call():
+                with timed('auth'):
+                    token = get_bearer_token()
+                    token_payload = decode_token(token)
+                    check_permissions(permission, token_payload)
+                    if profile_mode is not None:
+                        check_permissions(PROFILE_PERMISSION, token_payload)
+                g.token = token_payload
+                return function(*args, **kwargs, token=token_payload)
+
+            if profile_mode is None:
+                return call()
+            return profile_request(profile_mode, call)
         return wrapper
     return requires_auth_decorator
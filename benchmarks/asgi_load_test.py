@@ -0,0 +1,100 @@
+import os
+import time
+import argparse
+from http.client import HTTPConnection
+from threading import Thread
+from urllib.parse import urlsplit
+
+from util import load_test_env
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_connection(url, path, headers, deadline, latencies, errors):
+    parts = urlsplit(url)
+    connection = HTTPConnection(parts.hostname, parts.port, timeout=30)
+
+    while time.perf_counter() < deadline:
+        started_at = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except OSError:
+            errors.append(time.perf_counter() - started_at)
+            connection.close()
+            continue
+
+        if response.status == 200:
+            latencies.append(time.perf_counter() - started_at)
+        else:
+            errors.append(time.perf_counter() - started_at)
+
+    connection.close()
+
+
+def load_test(url, path, headers, connections, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        Thread(
+            target=run_connection,
+            args=(url, path, headers, deadline, latencies, errors)
+        )
+        for _ in range(connections)
+    ]
+
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compares the throughput of the sync Flask app and the ASGI app'
+            ' under the same number of concurrent connections. Both apps'
+            ' must already be running, for example with'
+            ' "gunicorn -b :8000 app:app" and'
+            ' "uvicorn --port 8001 asgi:app".'
+        )
+    )
+    parser.add_argument('--sync-url', default='http://localhost:8000')
+    parser.add_argument('--async-url', default='http://localhost:8001')
+    parser.add_argument('--path', default='/actors')
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    load_test_env()
+    headers = {'Authorization': f'Bearer {os.getenv("ASSISTANT_TOKEN")}'}
+
+    print(f'{"app":8} {"requests/s":>12} {"p50 ms":>10} {"p99 ms":>10}'
+          f' {"errors":>8}')
+    for name, url in (('sync', args.sync_url), ('async', args.async_url)):
+        latencies, errors, elapsed = load_test(
+            url,
+            args.path,
+            headers,
+            args.connections,
+            args.duration
+        )
+        print(f'{name:8} {len(latencies) / elapsed:12.1f}'
+              f' {percentile(latencies, 0.5) * 1e3:10.1f}'
+              f' {percentile(latencies, 0.99) * 1e3:10.1f}'
+              f' {len(errors):8d}')
+
+
+if __name__ == '__main__':
+    main()
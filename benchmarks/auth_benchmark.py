@@ -0,0 +1,45 @@
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from timeit import timeit
+
+import auth
+from auth import JWKSCache, TokenCache, decode_token
+from util import create_signing_key, create_token
+
+
+def measure(token, iterations):
+    seconds = timeit(lambda: decode_token(token), number=iterations)
+    return seconds / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compares the per-request cost of decoding a token.'
+    )
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    private_key, public_jwk = create_signing_key('benchmark')
+    token = create_token(private_key, 'benchmark', ['get:actors'])
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json') as jwks_file:
+        json.dump({'keys': [public_jwk]}, jwks_file)
+        jwks_file.flush()
+        auth.jwks_cache = JWKSCache(Path(jwks_file.name).as_uri())
+
+        auth.token_cache = TokenCache(max_size=0)
+        uncached = measure(token, args.iterations)
+
+        auth.token_cache = TokenCache()
+        cached = measure(token, args.iterations)
+
+    print(f'without token cache: {uncached:10.1f} us/request')
+    print(f'with token cache:    {cached:10.1f} us/request')
+    print(f'speedup:             {uncached / cached:10.1f}x')
+    print(f'cache stats:         {auth.token_cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
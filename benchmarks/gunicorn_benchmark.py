@@ -0,0 +1,125 @@
+import os
+import time
+import argparse
+import subprocess
+from urllib.request import urlopen
+
+from benchmarks.asgi_load_test import load_test, percentile
+from util import load_test_env
+
+
+def parse_setting(setting):
+    worker_class, _, size = setting.partition(':')
+    workers, _, threads = size.partition('x')
+    return worker_class, int(workers), int(threads or 1)
+
+
+def default_settings(cpus):
+    settings = [
+        f'sync:{cpus * 2 + 1}',
+        f'gthread:{cpus + 1}x4',
+        f'gthread:{cpus}x8'
+    ]
+    try:
+        import gevent
+        settings.append(f'gevent:{cpus + 1}')
+    except ImportError:
+        pass
+    return settings
+
+
+def wait_until_ready(url, server, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f'gunicorn exited with code {server.returncode}.')
+        try:
+            with urlopen(f'{url}/health', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+
+    raise SystemExit(f'gunicorn did not start listening at {url}.')
+
+
+def run_setting(setting, args, headers):
+    worker_class, workers, threads = parse_setting(setting)
+    url = f'http://127.0.0.1:{args.port}'
+    environment = {
+        **os.environ,
+        'GUNICORN_BIND': f'127.0.0.1:{args.port}',
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(threads)
+    }
+
+    server = subprocess.Popen(
+        [
+            'gunicorn',
+            '-c', 'gunicorn.conf.py',
+            '--log-level', 'warning',
+            'app:app'
+        ],
+        env=environment
+    )
+    try:
+        wait_until_ready(url, server)
+        return load_test(
+            url,
+            args.path,
+            headers,
+            args.connections,
+            args.duration
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0)) \
+        if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+
+    parser = argparse.ArgumentParser(
+        description=(
+            'Starts gunicorn with gunicorn.conf.py once per worker setting,'
+            ' runs the same load against each one and reports the setting'
+            ' with the highest throughput. A setting is written as'
+            ' "worker_class:workers" or "worker_class:workersxthreads".'
+        )
+    )
+    parser.add_argument(
+        '--settings',
+        default=','.join(default_settings(cpus))
+    )
+    parser.add_argument('--path', default='/actors')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    load_test_env()
+    headers = {'Authorization': f'Bearer {os.getenv("ASSISTANT_TOKEN")}'}
+
+    results = []
+    print(f'{"setting":16} {"requests/s":>12} {"p50 ms":>10} {"p99 ms":>10}'
+          f' {"errors":>8}')
+    for setting in args.settings.split(','):
+        latencies, errors, elapsed = run_setting(setting, args, headers)
+        throughput = len(latencies) / elapsed
+        results.append((throughput, setting))
+        print(f'{setting:16} {throughput:12.1f}'
+              f' {percentile(latencies, 0.5) * 1e3:10.1f}'
+              f' {percentile(latencies, 0.99) * 1e3:10.1f}'
+              f' {len(errors):8d}')
+
+    throughput, setting = max(results)
+    worker_class, workers, threads = parse_setting(setting)
+    print()
+    print(f'best: {setting} ({throughput:.1f} requests/s)')
+    print(f'  GUNICORN_WORKER_CLASS={worker_class}'
+          f' WEB_CONCURRENCY={workers} GUNICORN_THREADS={threads}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+from timeit import timeit
+from flask import Flask, jsonify
+from flask.json import JSONEncoder
+
+from encoders import FastJSONEncoder, orjson
+from schema import ActorSchema
+from serializers import get_serializer
+from benchmarks.serializer_benchmark import create_actors
+
+
+def measure(app, encoder, payload, iterations):
+    app.json_encoder = encoder
+    with app.test_request_context():
+        seconds = timeit(lambda: jsonify(payload), number=iterations)
+    return seconds / iterations * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compares jsonify with the standard library encoder and the'
+            ' fast encoder on a large list response.'
+        )
+    )
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson is not installed, the fast encoder falls back to json')
+
+    serialize = get_serializer(ActorSchema)
+    payload = {
+        'success': True,
+        'data': [
+            serialize(actor)
+            for actor in create_actors(args.rows, args.movies)
+        ],
+        'next_cursor': None
+    }
+
+    app = Flask(__name__)
+    app.config['JSON_SORT_KEYS'] = False
+    app.config['JSON_AS_ASCII'] = False
+    standard = measure(app, JSONEncoder, payload, args.iterations)
+    fast = measure(app, FastJSONEncoder, payload, args.iterations)
+
+    print(f'rows:                  {args.rows:10d}')
+    print(f'standard library:      {standard:10.1f} ms')
+    print(f'fast encoder:          {fast:10.1f} ms')
+    print(f'speedup:               {standard / fast:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
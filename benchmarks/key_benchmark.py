@@ -0,0 +1,82 @@
+import argparse
+from timeit import timeit
+from jose import jwt
+
+from auth import ALGORITHMS, API_AUDIENCE, AUTH0_DOMAIN, create_key_registry
+from util import create_signing_key, create_token
+
+
+def find_jwk(kid, jwks):
+    rsa_key = {}
+    for key in jwks['keys']:
+        if key['kid'] == kid:
+            rsa_key = {
+                'kty': key['kty'],
+                'kid': key['kid'],
+                'use': key['use'],
+                'n': key['n'],
+                'e': key['e']
+            }
+
+    return rsa_key
+
+
+def decode(token, key):
+    return jwt.decode(
+        token,
+        key,
+        algorithms=ALGORITHMS,
+        audience=API_AUDIENCE,
+        issuer=f'https://{AUTH0_DOMAIN}/'
+    )
+
+
+def measure(function, iterations):
+    seconds = timeit(function, number=iterations)
+    return seconds / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compares rebuilding RSA keys from the JWKS on every request'
+            ' with looking up pre-parsed keys by kid.'
+        )
+    )
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--keys', type=int, default=3)
+    args = parser.parse_args()
+
+    signing_keys = [
+        create_signing_key(f'key-{index}')
+        for index in range(args.keys)
+    ]
+    jwks = {'keys': [public_jwk for _, public_jwk in signing_keys]}
+    private_key, public_jwk = signing_keys[-1]
+    kid = public_jwk['kid']
+    token = create_token(private_key, kid, ['get:actors'])
+    registry = create_key_registry(jwks)
+
+    lookup_jwk = measure(lambda: find_jwk(kid, jwks), args.iterations)
+    lookup_registry = measure(lambda: registry[kid], args.iterations)
+    decode_jwk = measure(
+        lambda: decode(token, find_jwk(kid, jwks)),
+        args.iterations
+    )
+    decode_registry = measure(
+        lambda: decode(token, registry[kid]),
+        args.iterations
+    )
+
+    print(f'key lookup, jwk scan:        {lookup_jwk:10.2f} us/request')
+    print(f'key lookup, registry:        {lookup_registry:10.2f} us/request')
+    print(f'verification, jwk scan:      {decode_jwk:10.2f} us/request')
+    print(f'verification, registry:      {decode_registry:10.2f} us/request')
+    print(
+        'saving per request:          '
+        f'{decode_jwk - decode_registry:10.2f} us'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import time
+import argparse
+from threading import Thread
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from models.database import pool_checkout_seconds, pool_checkout_timeouts
+from util import get_database_url, get_engine_options, get_pool_options
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_client(engine, requests, hold, waits, timeouts):
+    for _ in range(requests):
+        started_at = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                waits.append(time.perf_counter() - started_at)
+                connection.execute('SELECT 1')
+                time.sleep(hold)
+        except PoolTimeoutError:
+            timeouts.append(time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Saturates the connection pool configured by the DB_POOL_*'
+            ' environment variables with concurrent clients that hold a'
+            ' connection for a fixed time.'
+        )
+    )
+    parser.add_argument('--clients', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--hold', type=float, default=0.05)
+    args = parser.parse_args()
+
+    database_url = get_database_url()
+    options = get_engine_options(database_url)
+    if not options:
+        options = {
+            **get_pool_options(),
+            'connect_args': {'check_same_thread': False}
+        }
+    engine = create_engine(database_url, **options)
+    pool = engine.pool
+
+    waits = []
+    timeouts = []
+    threads = [
+        Thread(
+            target=run_client,
+            args=(engine, args.requests, args.hold, waits, timeouts)
+        )
+        for _ in range(args.clients)
+    ]
+
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+    engine.dispose()
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    histogram = pool_checkout_seconds.get(pool=pool.name)
+    print(f'clients:               {args.clients:10d}')
+    print(f'pool capacity:         {capacity:10d}')
+    print(f'checkouts:             {len(waits):10d}')
+    print(f'timeouts:              {len(timeouts):10d}')
+    print(f'checkout wait p50:     {percentile(waits, 0.5) * 1e3:10.1f} ms')
+    print(f'checkout wait p99:     {percentile(waits, 0.99) * 1e3:10.1f} ms')
+    print(f'checkout wait mean:    '
+          f'{histogram["sum"] / max(histogram["count"], 1) * 1e3:10.1f} ms')
+    print(f'timeout counter:       '
+          f'{pool_checkout_timeouts.get(pool=pool.name):10d}')
+    print(f'throughput:            {len(waits) / elapsed:10.1f} requests/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+from timeit import timeit
+from datetime import datetime
+
+from models.casting import Actor, Movie
+from schema import ActorSchema
+from serializers import get_schema, get_serializer
+
+
+def create_actors(count, movies_per_actor):
+    movies = [
+        Movie(
+            id=index,
+            title=f'Movie {index}',
+            release_date=datetime(2000, 1, 1)
+        )
+        for index in range(movies_per_actor)
+    ]
+    return [
+        Actor(
+            id=index,
+            name=f'Actor {index}',
+            age=40,
+            gender='female',
+            movies=movies
+        )
+        for index in range(count)
+    ]
+
+
+def measure(function, iterations):
+    seconds = timeit(function, number=iterations)
+    return seconds / iterations * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compares dumping actors with a new schema per request,'
+            ' a shared schema, and the compiled fast dump.'
+        )
+    )
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    actors = create_actors(args.rows, args.movies)
+    schema = get_schema(ActorSchema)
+    serialize = get_serializer(ActorSchema)
+
+    new_schema = measure(
+        lambda: [ActorSchema().dump(actor) for actor in actors[:100]],
+        args.iterations
+    ) * args.rows / 100
+    shared_schema = measure(
+        lambda: [schema.dump(actor) for actor in actors],
+        args.iterations
+    )
+    fast_dump = measure(
+        lambda: [serialize(actor) for actor in actors],
+        args.iterations
+    )
+
+    print(f'rows:                  {args.rows:10d}')
+    print(f'new schema per dump:   {new_schema:10.1f} ms')
+    print(f'shared schema:         {shared_schema:10.1f} ms')
+    print(f'fast dump:             {fast_dump:10.1f} ms')
+    print(f'speedup over marshmallow: {shared_schema / fast_dump:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
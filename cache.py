@@ -0,0 +1,163 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app, request
+from sqlalchemy import event
+
+from models.database import db
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUBackend:
+    shared = False
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+            value, _ = entry
+            return value
+
+    def set(self, key, value, tags):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags):
+        with self._lock:
+            stale_keys = [
+                key
+                for key, (_, entry_tags) in self._entries.items()
+                if not entry_tags.isdisjoint(tags)
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedBackend:
+    shared = True
+
+    def __init__(self, client, prefix='casting:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def generation_key(self, tag):
+        return f'{self.prefix}generation:{tag}'
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, tags):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def get_generations(self, tags):
+        keys = [self.generation_key(tag) for tag in tags]
+        generations = self.client.mget(keys)
+
+        for index, generation in enumerate(generations):
+            if generation is None:
+                # Starting from the clock keeps a generation that was
+                # evicted from the shared cache from matching old entries.
+                self.client.set(keys[index], time.time_ns(), nx=True)
+                generations[index] = self.client.get(keys[index])
+
+        return [int(generation) for generation in generations]
+
+    def invalidate(self, tags):
+        for tag in tags:
+            self.client.incr(self.generation_key(tag))
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create_key(self, tags, scope, generations):
+        values = [
+            request.path,
+            sorted(request.args.items(multi=True)),
+            sorted(scope),
+            list(zip(tags, generations))
+        ]
+        digest = hashlib.sha256(json.dumps(values).encode()).hexdigest()
+        return f'response:{digest}'
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, tags, response, etag, last_modified):
+        self.backend.set(key, {
+            'body': response.get_data(as_text=True),
+            'etag': etag,
+            'last_modified': last_modified.isoformat()
+        }, tags)
+
+    def invalidate(self, tags):
+        self.backend.invalidate(sorted(tags))
+
+
+def create_response_cache(config):
+    url = config['RESPONSE_CACHE_URL']
+    if url and redis is not None:
+        client = redis.Redis.from_url(url)
+        return ResponseCache(
+            SharedBackend(client, ttl=config['RESPONSE_CACHE_TTL'])
+        )
+
+    if url:
+        logger.warning(
+            'The redis package is not installed, '
+            'responses are cached in process.'
+        )
+
+    return ResponseCache(LRUBackend(config['RESPONSE_CACHE_SIZE']))
+
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_changed_tables(session):
+    tables = session.info.pop('changed_tables', None)
+    if not tables or not current_app:
+        return
+
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is not None:
+        response_cache.invalidate(tables)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_changed_tables(session):
+    session.info.pop('changed_tables', None)
@@ -0,0 +1,175 @@
+import io
+import csv
+import json
+import click
+from flask.cli import AppGroup
+from flask.json import dumps as json_dumps
+from marshmallow import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+
+from models.database import db
+from models.casting import (
+    Actor,
+    Movie,
+    actor_movie_relation,
+    bump_versions
+)
+from schema import ActorRecordSchema, MovieRecordSchema, CastingRecordSchema
+from errors import flatten_messages
+
+
+catalog_cli = AppGroup(
+    'catalog',
+    help='Exports and imports the catalog as newline-delimited JSON.'
+)
+
+entities = {
+    'actors': (Actor.__table__, ActorRecordSchema),
+    'movies': (Movie.__table__, MovieRecordSchema),
+    'castings': (actor_movie_relation, CastingRecordSchema)
+}
+
+
+def read_batches(file, batch_size):
+    # Blank lines are skipped, so a batch is only yielded once it is full
+    # or the file has been read to the end.
+    batch = []
+    for line_number, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            batch.append((line_number, json.loads(line)))
+        except ValueError:
+            raise click.ClickException(
+                f'Line {line_number}: The line is not valid JSON.'
+            )
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def load_batch(schema, batch):
+    line_numbers = [line_number for line_number, _ in batch]
+    records = [record for _, record in batch]
+
+    try:
+        return schema.load(records, many=True)
+    except ValidationError as exception:
+        messages = {
+            f'Line {line_numbers[index]}': index_messages
+            for index, index_messages in exception.messages.items()
+        }
+        reasons = [
+            f'{param["name"]}: {param["reason"]}'
+            for param in flatten_messages(messages)
+        ]
+        raise click.ClickException(
+            'The records are not valid.\n' + '\n'.join(reasons)
+        )
+
+
+def copy_rows(table, rows):
+    columns = [column.name for column in table.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    buffer.seek(0)
+
+    statement = (
+        f'COPY {table.name} ({", ".join(columns)})'
+        ' FROM STDIN WITH (FORMAT csv)'
+    )
+    cursor = db.session.connection().connection.cursor()
+    # The raw cursor raises the errors of the driver, so they are wrapped
+    # like the ones of the statements run through SQLAlchemy.
+    dbapi_error = db.engine.dialect.dbapi.Error
+    try:
+        cursor.copy_expert(statement, buffer)
+    except dbapi_error as exception:
+        raise DBAPIError.instance(statement, None, exception, dbapi_error)
+
+
+def insert_rows(table, rows):
+    if db.engine.dialect.name == 'postgresql':
+        copy_rows(table, rows)
+    else:
+        db.session.execute(table.insert(), rows)
+
+
+def reset_sequence(table):
+    if db.engine.dialect.name != 'postgresql':
+        return
+
+    maximum = db.session.execute(select([func.max(table.c.id)])).scalar()
+    sequence = func.pg_get_serial_sequence(table.name, 'id')
+    db.session.execute(
+        select([func.setval(sequence, maximum or 1, maximum is not None)])
+    )
+
+
+@catalog_cli.command('export')
+@click.argument('entity', type=click.Choice(list(entities)))
+@click.option('--output', type=click.File('w'), default='-')
+@click.option('--batch-size', type=int, default=1000)
+def export_command(entity, output, batch_size):
+    table, schema_class = entities[entity]
+    schema = schema_class()
+
+    query = table.select().\
+        order_by(*table.primary_key.columns).\
+        execution_options(stream_results=True)
+    result = db.session.execute(query)
+
+    count = 0
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+
+        output.write(''.join(
+            json_dumps(schema.dump(row)) + '\n'
+            for row in rows
+        ))
+        count += len(rows)
+
+    click.echo(f'Exported {count} {entity}.', err=True)
+
+
+@catalog_cli.command('import')
+@click.argument('entity', type=click.Choice(list(entities)))
+@click.argument('file', type=click.File('r'), default='-')
+@click.option('--batch-size', type=int, default=1000)
+def import_command(entity, file, batch_size):
+    table, schema_class = entities[entity]
+    schema = schema_class()
+
+    count = 0
+    try:
+        for batch in read_batches(file, batch_size):
+            rows = load_batch(schema, batch)
+            insert_rows(table, rows)
+            count += len(rows)
+
+        if 'id' in table.c:
+            reset_sequence(table)
+
+        bump_versions(table.name)
+        db.session.commit()
+    except DBAPIError as exception:
+        db.session.rollback()
+        raise click.ClickException(
+            f'The records could not be imported: {exception.orig}'
+        )
+    except Exception:
+        db.session.rollback()
+        raise
+
+    click.echo(f'Imported {count} {entity}.', err=True)
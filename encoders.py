@@ -0,0 +1,29 @@
+from flask.json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONEncoder(JSONEncoder):
+    def can_use_orjson(self):
+        return orjson is not None and \
+            not self.ensure_ascii and \
+            self.indent in (None, 2)
+
+    def encode(self, o):
+        if not self.can_use_orjson():
+            return super().encode(o)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent == 2:
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(o, default=self.default, option=option).\
+                decode()
+        except orjson.JSONEncodeError:
+            return super().encode(o)
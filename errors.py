@@ -1,13 +1,14 @@
-import traceback
-from flask import Blueprint, jsonify
+import logging
+from flask import Blueprint, jsonify, request
 from werkzeug.exceptions import HTTPException, InternalServerError
 from marshmallow import ValidationError
 
+logger = logging.getLogger(__name__)
+
 errors_blueprint = Blueprint('errors', __name__)
 
 
-@errors_blueprint.app_errorhandler(ValidationError)
-def validation_error(exception):
+def flatten_messages(messages):
     invalid_params = []
 
     def traverse_messages(attribute, messages):
@@ -36,30 +37,45 @@ def validation_error(exception):
                         submessages
                     )
 
-    traverse_messages('', exception.messages)
+    traverse_messages('', messages)
+    return invalid_params
 
-    return jsonify({
+
+def create_validation_error(exception):
+    return {
         'success': False,
         'description': 'The request parameters are not valid.',
-        'invalid_params': invalid_params
-    }), 400
+        'invalid_params': flatten_messages(exception.messages)
+    }
 
-@errors_blueprint.app_errorhandler(HTTPException)
-def handle_exception(exception):
-    return jsonify({
+
+def create_http_error(exception):
+    return {
         'success': False,
         'description': exception.description
-    }), exception.code
+    }
 
-@errors_blueprint.app_errorhandler(InternalServerError)
-@errors_blueprint.app_errorhandler(Exception)
-def internal_error(exception):
-    trace = traceback.format_exc()
-    print(trace)
-    return jsonify({
+
+def create_internal_error():
+    return {
         'success': False,
         'description': (
             'We apoligize. Our service seems to'
             ' have experienced an unexpected error.'
         )
-    }), 500
+    }
+
+
+@errors_blueprint.app_errorhandler(ValidationError)
+def validation_error(exception):
+    return jsonify(create_validation_error(exception)), 400
+
+@errors_blueprint.app_errorhandler(HTTPException)
+def handle_exception(exception):
+    return jsonify(create_http_error(exception)), exception.code
+
+@errors_blueprint.app_errorhandler(InternalServerError)
+@errors_blueprint.app_errorhandler(Exception)
+def internal_error(exception):
+    logger.exception('Exception on %s %s', request.method, request.path)
+    return jsonify(create_internal_error()), 500
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+
+def count_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+cpus = count_cpus()
+
+bind = os.getenv('GUNICORN_BIND', f'0.0.0.0:{os.getenv("PORT", 8000)}')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+if worker_class == 'gthread':
+    default_workers = cpus + 1
+    default_threads = 4
+else:
+    default_workers = cpus * 2 + 1
+    default_threads = 1
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', default_threads))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+preload_app = bool(int(os.getenv('GUNICORN_PRELOAD', 1)))
+
+if 'METRICS_DIRECTORY' not in os.environ:
+    # Each worker keeps its own metrics, so they are shared through files
+    # that /metrics merges whichever worker serves the scrape.
+    os.environ['METRICS_DIRECTORY'] = tempfile.mkdtemp(
+        prefix='casting-metrics-'
+    )
+    temporary_metrics_directory = os.environ['METRICS_DIRECTORY']
+else:
+    temporary_metrics_directory = None
+
+if worker_class == 'gthread':
+    # Every thread of a worker can hold a database connection at once.
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+if worker_class == 'gevent':
+    # The app is preloaded, so the standard library has to be patched
+    # before it is imported and creates its locks and sockets.
+    try:
+        from gevent import monkey
+        from psycogreen.gevent import patch_psycopg
+    except ImportError as exception:
+        raise RuntimeError(
+            'The gevent worker class needs the gevent and psycogreen'
+            ' packages: pip install gevent psycogreen'
+        ) from exception
+
+    monkey.patch_all()
+    patch_psycopg()
+
+
+def on_starting(server):
+    from metrics import clear_directory
+
+    clear_directory(os.environ['METRICS_DIRECTORY'])
+
+
+def post_fork(server, worker):
+    from app import app
+    from metrics import registry
+    from models.database import db
+
+    # Samples recorded by the master before the fork would be counted
+    # once by every worker.
+    registry.clear()
+
+    # Connections opened by the master before the fork must not be
+    # shared, so each worker starts with empty pools.
+    with app.app_context():
+        for bind in [None, *app.config['SQLALCHEMY_BINDS']]:
+            db.get_engine(app, bind=bind).dispose()
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+
+    mark_process_dead(os.environ['METRICS_DIRECTORY'], worker.pid)
+
+
+def on_exit(server):
+    if temporary_metrics_directory is not None:
+        shutil.rmtree(temporary_metrics_directory, ignore_errors=True)
@@ -0,0 +1,146 @@
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics import registry
+
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds',
+    'Seconds spent handling a request.',
+    labels=['endpoint', 'method', 'status']
+)
+request_statements = registry.histogram(
+    'http_request_db_statements',
+    'SQL statements executed by a request.',
+    labels=['endpoint'],
+    buckets=STATEMENT_BUCKETS
+)
+request_db_seconds = registry.histogram(
+    'http_request_db_seconds',
+    'Seconds a request spent executing SQL statements.',
+    labels=['endpoint']
+)
+request_auth_seconds = registry.histogram(
+    'http_request_auth_seconds',
+    'Seconds a request spent verifying its bearer token.',
+    labels=['endpoint']
+)
+request_serialization_seconds = registry.histogram(
+    'http_request_serialization_seconds',
+    'Seconds a request spent serializing its response.',
+    labels=['endpoint']
+)
+
+timing_metrics = {
+    'db': request_db_seconds,
+    'auth': request_auth_seconds,
+    'serialize': request_serialization_seconds
+}
+
+
+def get_timings():
+    if not has_app_context():
+        return None
+    return g.get('timings')
+
+
+def record_timing(name, seconds):
+    timings = get_timings()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started_at)
+
+
+def start_request():
+    g.started_at = time.perf_counter()
+    g.timings = {}
+    g.statements = 0
+
+
+def create_server_timing(timings, statements, total):
+    entries = []
+    for name, seconds in timings.items():
+        entry = f'{name};dur={seconds * 1000:.1f}'
+        if name == 'db':
+            entry += f';desc="{statements} statements"'
+        entries.append(entry)
+
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def finish_request(response):
+    timings = get_timings()
+    if timings is None:
+        return response
+
+    total = time.perf_counter() - g.started_at
+    endpoint = request.endpoint or 'unmatched'
+
+    request_duration.observe(
+        total,
+        endpoint=endpoint,
+        method=request.method,
+        status=response.status_code
+    )
+    request_statements.observe(g.statements, endpoint=endpoint)
+    for name, metric in timing_metrics.items():
+        if name in timings:
+            metric.observe(timings[name], endpoint=endpoint)
+
+    response.headers['Server-Timing'] = create_server_timing(
+        timings,
+        g.statements,
+        total
+    )
+    return response
+
+
+def start_metrics_directory(app):
+    metrics_directory = app.extensions.get('metrics_directory')
+    if metrics_directory is not None:
+        metrics_directory.start()
+
+
+def instrument_app(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault('statement_started_at', []).\
+        append(time.perf_counter())
+
+
+def end_statement(conn):
+    started_at = conn.info['statement_started_at'].pop()
+    timings = get_timings()
+    if timings is not None:
+        g.statements += 1
+        record_timing('db', time.perf_counter() - started_at)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def finish_statement(conn, cursor, statement, parameters, context, many):
+    end_statement(conn)
+
+
+@event.listens_for(Engine, 'handle_error')
+def fail_statement(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('statement_started_at'):
+        end_statement(conn)
@@ -0,0 +1,419 @@
+import os
+import json
+import bisect
+import fcntl
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.\
+            replace('\\', '\\\\').\
+            replace('"', '\\"').\
+            replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def merge_samples(merged, metric_type, samples):
+    for values, value in samples:
+        values = tuple(values)
+        other = merged.get(values)
+        if other is None:
+            merged[values] = value
+        elif metric_type == 'histogram':
+            merged[values] = (
+                [a + b for a, b in zip(other[0], value[0])],
+                other[1] + value[1],
+                other[2] + value[2]
+            )
+        else:
+            merged[values] = other + value
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def label_values(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f'The metric "{self.name}" expects the labels {self.labels}.'
+            )
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self, samples=None):
+        if samples is None:
+            samples = self.samples()
+
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} {self.type}'
+        ]
+        for values, value in sorted(samples):
+            lines.extend(self.render_sample(values, value))
+        return lines
+
+    def render_sample(self, values, value):
+        labels = format_labels(self.labels, values)
+        return [f'{self.name}{labels} {format_value(value)}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self.label_values(labels), 0)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        return self._values.get(self.label_values(labels), 0)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key,
+                ([0] * (len(self.buckets) + 1), 0.0, 0)
+            )
+            counts = list(counts)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def get(self, **labels):
+        counts, total, count = self._values.get(
+            self.label_values(labels),
+            ([0] * (len(self.buckets) + 1), 0.0, 0)
+        )
+        return {'buckets': counts, 'sum': total, 'count': count}
+
+    def render_sample(self, values, value):
+        counts, total, count = value
+        names = self.labels + ('le',)
+        lines = []
+
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = format_labels(names, values + (format_value(bound),))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+
+        labels = format_labels(self.labels, values)
+        lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric_class, name, description, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, description, **kwargs)
+                self.metrics[name] = metric
+
+        if type(metric) is not metric_class:
+            raise ValueError(
+                f'The metric "{name}" is already registered'
+                f' as a {metric.type}.'
+            )
+        return metric
+
+    def counter(self, name, description, labels=()):
+        return self.register(Counter, name, description, labels=labels)
+
+    def gauge(self, name, description, labels=()):
+        return self.register(Gauge, name, description, labels=labels)
+
+    def histogram(
+        self,
+        name,
+        description,
+        labels=(),
+        buckets=DEFAULT_BUCKETS
+    ):
+        return self.register(
+            Histogram,
+            name,
+            description,
+            labels=labels,
+            buckets=buckets
+        )
+
+    def clear(self):
+        with self._lock:
+            for metric in self.metrics.values():
+                metric.clear()
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+
+        return {
+            metric.name: {
+                'type': metric.type,
+                'samples': [
+                    [list(values), value]
+                    for values, value in metric.samples()
+                ]
+            }
+            for metric in metrics
+        }
+
+    def merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for name, entry in snapshot.items():
+                if name in self.metrics:
+                    merge_samples(
+                        merged.setdefault(name, {}),
+                        entry['type'],
+                        entry['samples']
+                    )
+
+        return {
+            name: list(samples.items())
+            for name, samples in merged.items()
+        }
+
+    def render(self, samples=None):
+        with self._lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+
+        lines = []
+        for metric in metrics:
+            if samples is None:
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render(samples.get(metric.name, [])))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def write_json(path, data):
+    # Each write gets its own temporary file, so concurrent writers never
+    # publish a file that another one is still writing.
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(path),
+        prefix='.metrics-',
+        suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(data, file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+@contextmanager
+def locked(directory, operation):
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as file:
+        fcntl.flock(file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def get_process_path(directory, pid):
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def get_archive_path(directory):
+    return os.path.join(directory, 'metrics-archive.json')
+
+
+class MetricsDirectory:
+    def __init__(self, directory, registry=registry, interval=1):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def flush(self):
+        # The background thread and the scrapes of this worker flush to
+        # the same file, so the latest snapshot is always written last.
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            write_json(
+                get_process_path(self.directory, os.getpid()),
+                self.registry.snapshot()
+            )
+
+    def read_snapshot(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            return read_json(path)
+        except (OSError, ValueError):
+            logger.warning(
+                'Unable to read the metrics from %s.',
+                path,
+                exc_info=True
+            )
+            return {}
+
+    def collect(self):
+        # The samples of this process are written first, so a scrape
+        # served by another worker never reports less than this one did.
+        self.flush()
+        with locked(self.directory, fcntl.LOCK_SH):
+            snapshots = [
+                self.read_snapshot(name)
+                for name in sorted(os.listdir(self.directory))
+                if name.startswith('metrics-') and name.endswith('.json')
+            ]
+        return self.registry.merge(snapshots)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.warning(
+                    'Unable to write the metrics to %s.',
+                    self.directory,
+                    exc_info=True
+                )
+
+    def start(self):
+        # Threads do not survive a fork, so each worker starts its own.
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+def clear_directory(directory):
+    # Samples left by an earlier run would be added to the new totals.
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith(('metrics-', '.metrics-')):
+            os.remove(os.path.join(directory, name))
+
+
+def mark_process_dead(directory, pid):
+    # The counters and histograms of a process that exited are kept in
+    # the archive, so their totals do not go backwards, and its gauges
+    # are dropped.
+    path = get_process_path(directory, pid)
+    if not os.path.exists(path):
+        return
+
+    with locked(directory, fcntl.LOCK_EX):
+        archive_path = get_archive_path(directory)
+        archive = read_json(archive_path)
+        for name, entry in read_json(path).items():
+            if entry['type'] == 'gauge':
+                continue
+
+            archived = archive.get(name, {'samples': []})
+            merged = {}
+            merge_samples(merged, entry['type'], archived['samples'])
+            merge_samples(merged, entry['type'], entry['samples'])
+            archive[name] = {
+                'type': entry['type'],
+                'samples': [
+                    [list(values), value]
+                    for values, value in merged.items()
+                ]
+            }
+
+        write_json(archive_path, archive)
+        os.remove(path)
+
@@ -0,0 +1,53 @@
+"""add indexes
+
+Revision ID: 5c1d0e7a9b3f
+Revises: 89fd82845fc5
+Create Date: 2026-10-18 10:12:41.508913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d0e7a9b3f'
+down_revision = '89fd82845fc5'
+branch_labels = None
+depends_on = None
+
+
+indexes = [
+    ('ix_actor_movie_movie_id', 'actor_movie', ['movie_id', 'actor_id'], {}),
+    ('ix_actor_name', 'actor', ['name', 'id'], {}),
+    ('ix_actor_name_pattern', 'actor', ['name'], {
+        'postgresql_ops': {'name': 'text_pattern_ops'}
+    }),
+    ('ix_movie_title', 'movie', ['title', 'id'], {}),
+    ('ix_movie_title_pattern', 'movie', ['title'], {
+        'postgresql_ops': {'title': 'text_pattern_ops'}
+    }),
+    ('ix_movie_release_date', 'movie', ['release_date', 'id'], {})
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in indexes:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                **options
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(indexes):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True
+            )
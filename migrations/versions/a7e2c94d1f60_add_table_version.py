@@ -0,0 +1,37 @@
+"""add table version
+
+Revision ID: a7e2c94d1f60
+Revises: 5c1d0e7a9b3f
+Create Date: 2026-10-18 14:03:27.118402
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e2c94d1f60'
+down_revision = '5c1d0e7a9b3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_version = op.create_table(
+        'table_version',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+    updated_at = datetime.utcnow()
+    op.bulk_insert(table_version, [
+        {'name': name, 'version': 0, 'updated_at': updated_at}
+        for name in ['actor', 'movie', 'actor_movie']
+    ])
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, String, Integer, TIMESTAMP
+from datetime import datetime
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    TIMESTAMP,
+    and_,
+    event,
+    func,
+    select
+)
 from models.database import db
 
 
@@ -15,11 +25,96 @@ actor_movie_relation = db.Table(
         db.Integer,
         db.ForeignKey('movie.id', ondelete='CASCADE'),
         primary_key=True
-    )
+    ),
+    db.Index('ix_actor_movie_movie_id', 'movie_id', 'actor_id')
 )
 
+def bulk_insert(model, rows):
+    table = model.__table__
+    if not rows:
+        return []
+
+    if db.engine.dialect.name != 'postgresql':
+        return [
+            db.session.execute(table.insert(), row).inserted_primary_key[0]
+            for row in rows
+        ]
+
+    sequence = func.pg_get_serial_sequence(table.name, 'id')
+    ids = db.session.execute(
+        select([func.nextval(sequence)]).
+        select_from(func.generate_series(1, len(rows)))
+    ).fetchall()
+    ids = [id for id, in ids]
+
+    db.session.execute(
+        table.insert().values([
+            {**row, 'id': id}
+            for id, row in zip(ids, rows)
+        ])
+    )
+    return ids
+
+
+def update_castings(
+    owner_column,
+    owner_id,
+    target_column,
+    target_ids=None,
+    add_ids=(),
+    remove_ids=()
+):
+    add_ids = set(add_ids)
+    remove_ids = set(remove_ids) - add_ids
+
+    if target_ids is not None:
+        existing_ids = {
+            id
+            for id, in db.session.query(target_column).
+            filter(owner_column == owner_id)
+        }
+        add_ids = set(target_ids) - existing_ids
+        remove_ids = existing_ids - set(target_ids)
+    elif add_ids:
+        existing_ids = {
+            id
+            for id, in db.session.query(target_column).
+            filter(owner_column == owner_id).
+            filter(target_column.in_(add_ids))
+        }
+        add_ids -= existing_ids
+
+    if add_ids or remove_ids:
+        bump_versions('actor_movie')
+
+    if remove_ids:
+        db.session.execute(
+            actor_movie_relation.delete().where(and_(
+                owner_column == owner_id,
+                target_column.in_(remove_ids)
+            ))
+        )
+
+    if add_ids:
+        db.session.execute(
+            actor_movie_relation.insert(),
+            [
+                {owner_column.name: owner_id, target_column.name: id}
+                for id in sorted(add_ids)
+            ]
+        )
+
+
 class Actor(db.Model):
     __tablename__ = 'actor'
+    __table_args__ = (
+        db.Index('ix_actor_name', 'name', 'id'),
+        db.Index(
+            'ix_actor_name_pattern',
+            'name',
+            postgresql_ops={'name': 'text_pattern_ops'}
+        )
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -38,18 +133,30 @@ class Actor(db.Model):
 
     def insert(self):
         db.session.add(self)
+        bump_versions('actor', 'actor_movie')
         db.session.commit()
 
     def delete(self):
         db.session.delete(self)
+        bump_versions('actor', 'actor_movie')
         db.session.commit()
 
     def update(self):
+        bump_versions('actor', 'actor_movie')
         db.session.commit()
 
 
 class Movie(db.Model):
     __tablename__ = 'movie'
+    __table_args__ = (
+        db.Index('ix_movie_title', 'title', 'id'),
+        db.Index(
+            'ix_movie_title_pattern',
+            'title',
+            postgresql_ops={'title': 'text_pattern_ops'}
+        ),
+        db.Index('ix_movie_release_date', 'release_date', 'id')
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
@@ -60,11 +167,80 @@ class Movie(db.Model):
 
     def insert(self):
         db.session.add(self)
+        bump_versions('movie', 'actor_movie')
         db.session.commit()
 
     def delete(self):
         db.session.delete(self)
+        bump_versions('movie', 'actor_movie')
         db.session.commit()
 
     def update(self):
+        bump_versions('movie', 'actor_movie')
         db.session.commit()
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False)
+
+    def __repr__(self):
+        return f'<TableVersion name: {self.name}, version: {self.version}>'
+
+
+versioned_tables = ['actor', 'movie', 'actor_movie']
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def insert_table_versions(table, connection, **kwargs):
+    updated_at = datetime.utcnow()
+    connection.execute(table.insert(), [
+        {'name': name, 'version': 0, 'updated_at': updated_at}
+        for name in versioned_tables
+    ])
+
+
+def bump_versions(*names):
+    db.session.info.setdefault('changed_tables', set()).update(names)
+
+
+@event.listens_for(db.session, 'before_commit')
+def write_table_versions(session):
+    # The versions are written once per transaction, as late as possible,
+    # and their rows are locked in name order so concurrent writers can
+    # not deadlock on them.
+    names = sorted(session.info.get('changed_tables', ()))
+    if not names:
+        return
+
+    locked_names = select([TableVersion.name]).\
+        where(TableVersion.name.in_(names)).\
+        order_by(TableVersion.name).\
+        with_for_update()
+    session.execute(
+        TableVersion.__table__.update().
+        where(TableVersion.name.in_(locked_names)).
+        values(
+            version=TableVersion.version + 1,
+            updated_at=datetime.utcnow()
+        )
+    )
+
+
+def select_versions(names):
+    return select([
+        TableVersion.name,
+        TableVersion.version,
+        TableVersion.updated_at
+    ]).\
+        where(TableVersion.name.in_(names)).\
+        order_by(TableVersion.name)
+
+
+def get_versions(names):
+    return db.session.\
+        execute(select_versions(names)).\
+        fetchall()
@@ -1,5 +1,98 @@
-from flask_sqlalchemy import SQLAlchemy
+import time
+from flask import g, has_app_context
+from flask_sqlalchemy import (
+    SQLAlchemy,
+    SignallingSession,
+    _EngineConnector,
+    get_state
+)
 from flask_migrate import Migrate
+from sqlalchemy import orm
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
-db = SQLAlchemy()
+from metrics import registry
+
+pool_checkout_seconds = registry.histogram(
+    'db_pool_checkout_seconds',
+    'Seconds spent waiting for a pooled database connection.',
+    labels=['pool']
+)
+pool_checkout_timeouts = registry.counter(
+    'db_pool_checkout_timeouts_total',
+    'Pool checkouts that timed out waiting for a connection.',
+    labels=['pool']
+)
+pool_checked_out = registry.gauge(
+    'db_pool_checked_out',
+    'Connections currently checked out of the pool.',
+    labels=['pool']
+)
+pool_overflow = registry.gauge(
+    'db_pool_overflow',
+    'Connections open beyond the pool size.',
+    labels=['pool']
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    @property
+    def name(self):
+        return self._orig_logging_name or 'default'
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc(pool=self.name)
+            raise
+        finally:
+            pool_checkout_seconds.observe(
+                time.perf_counter() - started_at,
+                pool=self.name
+            )
+
+        self.record_usage()
+        return connection
+
+    def _do_return_conn(self, conn):
+        super()._do_return_conn(conn)
+        self.record_usage()
+
+    def record_usage(self):
+        pool_checked_out.set(self.checkedout(), pool=self.name)
+        pool_overflow.set(max(self.overflow(), 0), pool=self.name)
+
+
+class BindEngineConnector(_EngineConnector):
+    def get_options(self, sa_url, echo):
+        options = super().get_options(sa_url, echo)
+        if self._bind is not None and 'pool_logging_name' in options:
+            options['pool_logging_name'] = self._bind
+        return options
+
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        bind_key = g.get('replica_bind_key') if has_app_context() else None
+        if bind_key is None or \
+                self._flushing or \
+                isinstance(clause, UpdateBase):
+            return super().get_bind(mapper, clause)
+
+        state = get_state(self.app)
+        return state.db.get_engine(self.app, bind=bind_key)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def make_connector(self, app=None, bind=None):
+        return BindEngineConnector(self, self.get_app(app), bind)
+
+
+db = RoutingSQLAlchemy()
 migrate = Migrate()
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import atexit
+import pstats
+import logging
+import cProfile
+import sysconfig
+import threading
+from collections import Counter
+from functools import lru_cache
+from flask import Response, current_app, make_response, request
+from werkzeug.exceptions import BadRequest
+
+
+PROFILE_PERMISSION = 'profile:requests'
+PROFILE_MODES = ('cprofile', 'sample')
+
+logger = logging.getLogger(__name__)
+
+source_roots = sorted(
+    {
+        os.path.dirname(os.path.abspath(__file__)),
+        sysconfig.get_paths()['purelib'],
+        sysconfig.get_paths()['stdlib']
+    },
+    key=len,
+    reverse=True
+)
+
+
+def format_location(filename, name):
+    for root in source_roots:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+
+    frame = f'{filename}:{name}' if filename else name
+    # Semicolons separate frames and spaces separate the count in the
+    # collapsed format.
+    return frame.replace(';', ':').replace(' ', '_')
+
+
+@lru_cache(maxsize=4096)
+def format_code(code):
+    return format_location(code.co_filename, code.co_name)
+
+
+def collapse_frame(frame):
+    names = []
+    while frame is not None:
+        names.append(format_code(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def format_collapsed(counts):
+    return ''.join(
+        f'{stack} {count}\n'
+        for stack, count in sorted(counts.items())
+        if count > 0
+    )
+
+
+class StackSampler:
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts = Counter()
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        own_id = threading.get_ident()
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            frames = {self.thread_id: frames.get(self.thread_id)}
+
+        stacks = [
+            collapse_frame(frame)
+            for thread_id, frame in frames.items()
+            if frame is not None and thread_id != own_id
+        ]
+        with self._lock:
+            self.counts.update(stacks)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def collapsed(self):
+        with self._lock:
+            return format_collapsed(self.counts)
+
+
+def format_function(function):
+    filename, _, name = function
+    if filename == '~':
+        filename = ''
+    return format_location(filename, name)
+
+
+def collapse_stats(stats):
+    # cProfile only records caller and callee pairs, so the time of a
+    # function is split between its callers in proportion to the
+    # cumulative time it spent when called from each of them.
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[function] = edge
+
+    counts = Counter()
+
+    def visit(function, path, fraction):
+        own_time = stats[function][2]
+        path = path + [format_function(function)]
+        counts[';'.join(path)] += int(own_time * fraction * 1e6)
+
+        for callee, edge in callees.get(function, {}).items():
+            share = fraction * edge[3]
+            if share < 1e-6 or format_function(callee) in path:
+                continue
+            visit(callee, path, share / stats[callee][3])
+
+    for function, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            visit(function, [], 1.0)
+
+    return format_collapsed(counts)
+
+
+def get_profile_mode():
+    if not current_app.config['PROFILING_ENABLED']:
+        return None
+
+    mode = request.headers.get('X-Profile')
+    if mode is None:
+        return None
+
+    if mode not in PROFILE_MODES:
+        raise BadRequest(
+            description=(
+                'The X-Profile header must be one of'
+                f' {", ".join(PROFILE_MODES)}.'
+            )
+        )
+    return mode
+
+
+def profile_request(mode, call):
+    if mode == 'cprofile':
+        profile = cProfile.Profile()
+        response = make_response(profile.runcall(call))
+        collapsed = collapse_stats(pstats.Stats(profile).stats)
+    else:
+        sampler = StackSampler(
+            current_app.config['PROFILING_SAMPLE_INTERVAL'],
+            threading.get_ident()
+        )
+        sampler.start()
+        try:
+            response = make_response(call())
+        finally:
+            sampler.stop()
+        collapsed = sampler.collapsed()
+
+    return Response(
+        collapsed,
+        mimetype='text/plain',
+        headers={'X-Profiled-Status': str(response.status_code)}
+    )
+
+
+class BackgroundProfiler(StackSampler):
+    def __init__(self, directory, interval=0.1, flush_interval=60):
+        super().__init__(interval)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.path = None
+
+    def flush(self):
+        temporary_path = f'{self.path}.tmp'
+        try:
+            with open(temporary_path, 'w') as file:
+                file.write(self.collapsed())
+            os.replace(temporary_path, self.path)
+        except OSError:
+            logger.warning(
+                'Unable to write the profile to %s.',
+                self.path,
+                exc_info=True
+            )
+
+    def run(self):
+        flush_at = time.monotonic() + self.flush_interval
+        while not self._stopped.wait(self.interval):
+            self.sample()
+            if time.monotonic() >= flush_at:
+                self.flush()
+                flush_at = time.monotonic() + self.flush_interval
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        started_at = time.strftime('%Y%m%dT%H%M%S')
+        self.path = os.path.join(
+            self.directory,
+            f'profile-{started_at}-{os.getpid()}.collapsed'
+        )
+        super().start()
+
+    def stop(self):
+        super().stop()
+        self.flush()
+
+
+def start_background_profiler(app):
+    interval = app.config['PROFILING_BACKGROUND_INTERVAL']
+    if interval <= 0 or 'background_profiler' in app.extensions:
+        return None
+
+    profiler = BackgroundProfiler(
+        app.config['PROFILING_DIRECTORY'],
+        interval=interval,
+        flush_interval=app.config['PROFILING_FLUSH_INTERVAL']
+    )
+    profiler.start()
+    atexit.register(profiler.stop)
+    app.extensions['background_profiler'] = profiler
+    return profiler
@@ -0,0 +1,223 @@
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from models.database import db
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class LocalStickyStore:
+    shared = False
+
+    def __init__(self, max_clients=10000):
+        self.max_clients = max_clients
+        self._sticky_until = {}
+        self._lock = threading.Lock()
+
+    def mark(self, client, seconds):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sticky_until) >= self.max_clients:
+                self._sticky_until = {
+                    key: until
+                    for key, until in self._sticky_until.items()
+                    if until > now
+                }
+            self._sticky_until[client] = now + seconds
+
+    def is_sticky(self, client):
+        until = self._sticky_until.get(client)
+        return until is not None and until > time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._sticky_until.clear()
+
+
+class SharedStickyStore:
+    shared = True
+
+    def __init__(self, client, prefix='casting:'):
+        self.client = client
+        self.prefix = prefix
+
+    def key(self, client):
+        return f'{self.prefix}sticky:{client}'
+
+    def mark(self, client, seconds):
+        self.client.set(self.key(client), 1, px=max(int(seconds * 1000), 1))
+
+    def is_sticky(self, client):
+        return bool(self.client.exists(self.key(client)))
+
+    def clear(self):
+        pass
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        bind_keys,
+        sticky_seconds=5,
+        retry_seconds=30,
+        max_clients=10000,
+        sticky_store=None
+    ):
+        self.bind_keys = list(bind_keys)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self.sticky_store = sticky_store or LocalStickyStore(max_clients)
+
+        self._unhealthy_until = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, client):
+        if client is None or self.sticky_seconds <= 0:
+            return
+
+        try:
+            self.sticky_store.mark(client, self.sticky_seconds)
+        except Exception:
+            logger.warning(
+                'Unable to record the write of "%s" for sticky reads.',
+                client,
+                exc_info=True
+            )
+
+    def is_sticky(self, client):
+        if client is None:
+            return False
+
+        try:
+            return self.sticky_store.is_sticky(client)
+        except Exception:
+            # Reading from the primary is always consistent, so it is used
+            # while the shared store can not be reached.
+            logger.warning(
+                'Unable to check the writes of "%s", reading from the'
+                ' primary.',
+                client,
+                exc_info=True
+            )
+            return True
+
+    def mark_unhealthy(self, bind_key):
+        logger.warning(
+            'The database replica "%s" failed, reading from the primary'
+            ' for %s seconds.',
+            bind_key,
+            self.retry_seconds,
+            exc_info=True
+        )
+        with self._lock:
+            self._unhealthy_until[bind_key] = (
+                time.monotonic() + self.retry_seconds
+            )
+
+    def healthy_replicas(self):
+        now = time.monotonic()
+        return [
+            bind_key
+            for bind_key in self.bind_keys
+            if self._unhealthy_until.get(bind_key, 0) <= now
+        ]
+
+    def choose(self, client=None):
+        if not self.bind_keys or self.is_sticky(client):
+            return None
+
+        replicas = self.healthy_replicas()
+        if not replicas:
+            return None
+
+        return random.choice(replicas)
+
+    def clear(self):
+        self.sticky_store.clear()
+        with self._lock:
+            self._unhealthy_until.clear()
+
+
+def create_sticky_store(config):
+    url = config['REPLICA_STICKY_URL']
+    if url and redis is not None:
+        return SharedStickyStore(redis.Redis.from_url(url))
+
+    if url:
+        logger.warning(
+            'The redis package is not installed, '
+            'sticky reads are tracked in process.'
+        )
+    elif config['SQLALCHEMY_BINDS']:
+        logger.warning(
+            'REPLICA_STICKY_URL is not set, so sticky reads are tracked in'
+            ' process and writes are only read back from the primary by'
+            ' the worker that made them.'
+        )
+    return LocalStickyStore()
+
+
+def get_replica_binds(replica_urls):
+    return {
+        f'replica_{index}': url
+        for index, url in enumerate(replica_urls)
+    }
+
+
+def get_client():
+    token = g.get('token') or {}
+    return token.get('sub')
+
+
+def reads_from_replica(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        bind_key = router.choose(get_client()) if router else None
+        if bind_key is None:
+            return function(*args, **kwargs)
+
+        g.replica_bind_key = bind_key
+        try:
+            return function(*args, **kwargs)
+        except DBAPIError as error:
+            if not isinstance(error, OperationalError) and \
+                    not error.connection_invalidated:
+                raise
+
+            router.mark_unhealthy(bind_key)
+            db.session.rollback()
+            g.pop('replica_bind_key', None)
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def read_from_primary():
+    # Streamed rows are fetched after the view returns, where an error of
+    # the replica can no longer fall back to the primary and would cut
+    # the response short.
+    g.pop('replica_bind_key', None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def stick_to_primary(session):
+    if not has_request_context() or request.method in READ_METHODS:
+        return
+
+    router = current_app.extensions.get('replica_router')
+    if router is not None:
+        router.mark_write(get_client())
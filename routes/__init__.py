@@ -1,2 +1,3 @@
 from routes.health import health_blueprint
+from routes.metrics import metrics_blueprint
 from routes.casting import casting_blueprint
@@ -1,43 +1,337 @@
-from flask import Blueprint, jsonify
-from werkzeug.exceptions import NotFound
+from datetime import datetime
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    g,
+    jsonify,
+    request
+)
+from werkzeug.exceptions import BadRequest, NotFound
 from marshmallow import ValidationError
-from sqlalchemy.orm import load_only
-
-from models.casting import Actor, Movie
-from schema import ActorSchema, MovieSchema
+from sqlalchemy.orm import load_only, selectinload
+
+from models.database import db
+from models.casting import (
+    Actor,
+    Movie,
+    actor_movie_relation,
+    bulk_insert,
+    bump_versions,
+    get_versions,
+    update_castings
+)
+from schema import (
+    ActorSchema,
+    MovieSchema,
+    ActorBatchSchema,
+    MovieBatchSchema,
+    ActorUpdateSchema,
+    MovieUpdateSchema,
+    ActorFieldsSchema,
+    MovieFieldsSchema,
+    ActorPageSchema,
+    MoviePageSchema
+)
+from serializers import get_schema, get_serializer
 from auth import requires_auth
-from util import load_data
+from replicas import reads_from_replica, read_from_primary
+from instrumentation import timed
+from util import (
+    load_data,
+    load_args,
+    paginate,
+    order_by_sort,
+    stream_json,
+    create_validators,
+    is_not_modified,
+    set_validators,
+    fetch_entities
+)
 
 
 casting_blueprint = Blueprint('casting', __name__)
 
+
+def find_actor(actor_id, load_movies=True, options=()):
+    query = Actor.query.\
+        filter(Actor.id == actor_id).\
+        options(*options)
+    if load_movies:
+        query = query.options(selectinload(Actor.movies))
+
+    actor = query.one_or_none()
+
+    if not actor:
+        raise NotFound(
+            description=f'An actor with the id "{actor_id}" was not found.'
+        )
+
+    return actor
+
+
+def find_movie(movie_id, load_actors=True, options=()):
+    query = Movie.query.\
+        filter(Movie.id == movie_id).\
+        options(*options)
+    if load_actors:
+        query = query.options(selectinload(Movie.actors))
+
+    movie = query.one_or_none()
+
+    if not movie:
+        raise NotFound(
+            description=f'A movie with the id "{movie_id}" was not found.'
+        )
+
+    return movie
+
+
+def check_batch_size():
+    items = request.get_json(silent=True)
+    maximum = current_app.config['BATCH_SIZE_MAX']
+    if type(items) is list and len(items) > maximum:
+        raise BadRequest(
+            description=f'A batch can not contain more than {maximum} items.'
+        )
+
+
+def select_fields(model, page):
+    options = []
+    if page['only'] is not None:
+        names = ['id', page.get('sort', 'id').lstrip('-')] + page['only']
+        options.append(load_only(*[
+            name
+            for name in dict.fromkeys(names)
+            if name in model.__table__.columns
+        ]))
+
+    for relationship in page['expand']:
+        options.append(selectinload(getattr(model, relationship)))
+
+    return options
+
+
+def find_tables(table, related_table, page, relation_filter):
+    names = [table]
+    if page['expand']:
+        names += [related_table, 'actor_movie']
+    elif relation_filter in page:
+        names.append('actor_movie')
+
+    return names
+
+
+def respond_conditionally(tables, token, render, cacheable=True):
+    response_cache = current_app.extensions['response_cache']
+    versions = None
+    entry = None
+
+    if cacheable:
+        if response_cache.backend.shared:
+            generations = response_cache.backend.get_generations(tables)
+        else:
+            versions = get_versions(tables)
+            generations = [version for _, version, _ in versions]
+
+        key = response_cache.create_key(
+            tables,
+            token.get('permissions', []),
+            generations
+        )
+        entry = response_cache.get(key)
+
+    if entry is None:
+        etag, last_modified = create_validators(
+            versions or get_versions(tables),
+            request.full_path
+        )
+    else:
+        etag = entry['etag']
+        last_modified = datetime.fromisoformat(entry['last_modified'])
+
+    if is_not_modified(etag, last_modified, request.headers):
+        return set_validators(Response(status=304), etag, last_modified)
+
+    if entry is not None:
+        response = Response(entry['body'], mimetype='application/json')
+    else:
+        response = render()
+        # A lagging replica could store stale rows under generations that
+        # other workers already consider current.
+        if response_cache.backend.shared and g.get('replica_bind_key'):
+            cacheable = False
+        if cacheable:
+            response_cache.set(key, tables, response, etag, last_modified)
+
+    return set_validators(response, etag, last_modified)
+
+
+def filter_prefix(column, prefix):
+    # startswith(autoescape=True) appends the wildcard in SQL, which keeps
+    # SQLite from searching the pattern index, so the whole pattern is
+    # bound as one value.
+    pattern = prefix.\
+        replace('/', '//').\
+        replace('%', '/%').\
+        replace('_', '/_')
+    return column.like(pattern + '%', escape='/')
+
+
+def filter_actors(query, filters):
+    if 'ids' in filters:
+        query = query.filter(Actor.id.in_(filters['ids']))
+    if 'gender' in filters:
+        query = query.filter(Actor.gender == filters['gender'])
+    if 'min_age' in filters:
+        query = query.filter(Actor.age >= filters['min_age'])
+    if 'max_age' in filters:
+        query = query.filter(Actor.age <= filters['max_age'])
+    if 'name_prefix' in filters:
+        query = query.filter(
+            filter_prefix(Actor.name, filters['name_prefix'])
+        )
+    if 'movie_id' in filters:
+        query = query.\
+            join(
+                actor_movie_relation,
+                actor_movie_relation.c.actor_id == Actor.id
+            ).\
+            filter(actor_movie_relation.c.movie_id == filters['movie_id'])
+
+    return query
+
+
+def filter_movies(query, filters):
+    if 'ids' in filters:
+        query = query.filter(Movie.id.in_(filters['ids']))
+    if 'min_release_date' in filters:
+        query = query.filter(
+            Movie.release_date >= filters['min_release_date']
+        )
+    if 'max_release_date' in filters:
+        query = query.filter(
+            Movie.release_date <= filters['max_release_date']
+        )
+    if 'title_prefix' in filters:
+        query = query.filter(
+            filter_prefix(Movie.title, filters['title_prefix'])
+        )
+    if 'actor_id' in filters:
+        query = query.\
+            join(
+                actor_movie_relation,
+                actor_movie_relation.c.movie_id == Movie.id
+            ).\
+            filter(actor_movie_relation.c.actor_id == filters['actor_id'])
+
+    return query
+
+
+def insert_castings(castings):
+    rows = [
+        {'actor_id': actor_id, 'movie_id': movie_id}
+        for actor_id, movie_id in dict.fromkeys(castings)
+    ]
+    if rows:
+        db.session.execute(actor_movie_relation.insert(), rows)
+        bump_versions('actor_movie')
+
+
+def list_actors(page):
+    query = filter_actors(Actor.query, page).\
+        options(*select_fields(Actor, page))
+    serialize = get_serializer(
+        ActorSchema,
+        only=page['only'],
+        exclude=page['exclude'],
+        fast=current_app.config['FAST_SERIALIZATION']
+    )
+
+    if page['stream']:
+        rows = order_by_sort(query, Actor.id, page['sort']).\
+            yield_per(current_app.config['STREAM_BATCH_SIZE'])
+        return stream_json(rows, serialize)
+
+    actors, next_cursor = paginate(
+        query,
+        Actor.id,
+        page['limit'],
+        cursor=page['cursor'],
+        sort=page['sort']
+    )
+    with timed('serialize'):
+        serialized = [
+            serialize(actor)
+            for actor in actors
+        ]
+
+        return jsonify({
+            'success': True,
+            'data': serialized,
+            'next_cursor': next_cursor
+        })
+
+
 @casting_blueprint.route('/actors')
 @requires_auth('get:actors')
+@reads_from_replica
 def retrieve_actors(token):
-    actors = Actor.query.all()
-    schema = ActorSchema()
-    serialized = [
-        schema.dump(actor)
-        for actor in actors
-    ]
+    page = load_args(get_schema(ActorPageSchema))
+    if page['stream']:
+        read_from_primary()
+    tables = find_tables('actor', 'movie', page, 'movie_id')
+
+    return respond_conditionally(
+        tables,
+        token,
+        lambda: list_actors(page),
+        cacheable=not page['stream']
+    )
 
-    return jsonify({
-        'success': True,
-        'data': serialized
-    })
+
+def show_actor(actor_id, page):
+    actor = find_actor(
+        actor_id,
+        load_movies=False,
+        options=select_fields(Actor, page)
+    )
+    serialize = get_serializer(
+        ActorSchema,
+        only=page['only'],
+        exclude=page['exclude'],
+        fast=current_app.config['FAST_SERIALIZATION']
+    )
+
+    with timed('serialize'):
+        return jsonify({
+            'success': True,
+            'data': [serialize(actor)]
+        })
+
+
+@casting_blueprint.route('/actors/<int:actor_id>')
+@requires_auth('get:actors')
+@reads_from_replica
+def retrieve_actor(actor_id, token):
+    page = load_args(get_schema(ActorFieldsSchema))
+    tables = find_tables('actor', 'movie', page, None)
+
+    return respond_conditionally(
+        tables,
+        token,
+        lambda: show_actor(actor_id, page)
+    )
 
 
 @casting_blueprint.route('/actors', methods=['POST'])
 @requires_auth('post:actors')
 def create_actor(token):
-    schema = ActorSchema()
+    schema = get_schema(ActorSchema)
     data = load_data(schema)
 
     movie_ids = data['movie_ids']
-    movies = Movie.query.\
-        filter(Movie.id.in_(movie_ids)).\
-        options(load_only('id')).\
-        all()
+    movies = fetch_entities(Movie, movie_ids)
 
     actor = Actor(
         name=data['name'],
@@ -46,7 +340,46 @@ def create_actor(token):
         movies=movies
     )
     actor.insert()
-    serialized = [schema.dump(actor)]
+    serialized = [schema.dump(find_actor(actor.id))]
+
+    return jsonify({
+        'success': True,
+        'data': serialized
+    })
+
+
+@casting_blueprint.route('/actors/batch', methods=['POST'])
+@requires_auth('post:actors')
+def create_actors(token):
+    check_batch_size()
+    schema = get_schema(ActorBatchSchema, many=True)
+    data = load_data(schema)
+
+    actor_ids = bulk_insert(Actor, [
+        {
+            'name': item['name'],
+            'age': item['age'],
+            'gender': item['gender']
+        }
+        for item in data
+    ])
+    insert_castings(
+        (actor_id, movie_id)
+        for actor_id, item in zip(actor_ids, data)
+        for movie_id in item['movie_ids']
+    )
+    bump_versions('actor')
+    db.session.commit()
+
+    actors = Actor.query.\
+        filter(Actor.id.in_(actor_ids)).\
+        options(selectinload(Actor.movies)).\
+        all()
+    actors = {actor.id: actor for actor in actors}
+    serialized = [
+        schema.dump(actors[actor_id], many=False)
+        for actor_id in actor_ids
+    ]
 
     return jsonify({
         'success': True,
@@ -57,17 +390,10 @@ def create_actor(token):
 @casting_blueprint.route('/actors/<int:actor_id>', methods=['PATCH'])
 @requires_auth('patch:actors')
 def update_actor(actor_id, token):
-    schema = ActorSchema()
+    schema = get_schema(ActorUpdateSchema)
     data = load_data(schema, partial=True)
 
-    actor = Actor.query.\
-        filter(Actor.id == actor_id).\
-        one_or_none()
-
-    if not actor:
-        raise NotFound(
-            description=f'An actor with the id "{actor_id}" was not found.'
-        )
+    actor = find_actor(actor_id, load_movies=False)
 
     if 'name' in data:
         actor.name = data['name']
@@ -76,16 +402,23 @@ def update_actor(actor_id, token):
     if 'gender' in data:
         actor.gender = data['gender']
     if 'movie_ids' in data:
-        movie_ids = data['movie_ids']
-        movies = Movie.query.\
-            filter(Movie.id.in_(movie_ids)).\
-            options(load_only('id')).\
-            all()
-
-        actor.movies = movies
+        update_castings(
+            actor_movie_relation.c.actor_id,
+            actor_id,
+            actor_movie_relation.c.movie_id,
+            target_ids=data['movie_ids']
+        )
+    if 'add_movie_ids' in data or 'remove_movie_ids' in data:
+        update_castings(
+            actor_movie_relation.c.actor_id,
+            actor_id,
+            actor_movie_relation.c.movie_id,
+            add_ids=data.get('add_movie_ids', []),
+            remove_ids=data.get('remove_movie_ids', [])
+        )
 
     actor.update()
-    serialized = [schema.dump(actor)]
+    serialized = [schema.dump(find_actor(actor_id))]
 
     return jsonify({
         'success': True,
@@ -113,33 +446,100 @@ def delete_actor(actor_id, token):
     })
 
 
+def list_movies(page):
+    query = filter_movies(Movie.query, page).\
+        options(*select_fields(Movie, page))
+    serialize = get_serializer(
+        MovieSchema,
+        only=page['only'],
+        exclude=page['exclude'],
+        fast=current_app.config['FAST_SERIALIZATION']
+    )
+
+    if page['stream']:
+        rows = order_by_sort(query, Movie.id, page['sort']).\
+            yield_per(current_app.config['STREAM_BATCH_SIZE'])
+        return stream_json(rows, serialize)
+
+    movies, next_cursor = paginate(
+        query,
+        Movie.id,
+        page['limit'],
+        cursor=page['cursor'],
+        sort=page['sort']
+    )
+    with timed('serialize'):
+        serialized = [
+            serialize(movie)
+            for movie in movies
+        ]
+
+        return jsonify({
+            'success': True,
+            'data': serialized,
+            'next_cursor': next_cursor
+        })
+
+
 @casting_blueprint.route('/movies')
 @requires_auth('get:movies')
+@reads_from_replica
 def retrieve_movies(token):
-    movies = Movie.query.all()
-    schema = MovieSchema()
-    serialized = [
-        schema.dump(movie)
-        for movie in movies
-    ]
+    page = load_args(get_schema(MoviePageSchema))
+    if page['stream']:
+        read_from_primary()
+    tables = find_tables('movie', 'actor', page, 'actor_id')
+
+    return respond_conditionally(
+        tables,
+        token,
+        lambda: list_movies(page),
+        cacheable=not page['stream']
+    )
 
-    return jsonify({
-        'success': True,
-        'data': serialized
-    })
+
+def show_movie(movie_id, page):
+    movie = find_movie(
+        movie_id,
+        load_actors=False,
+        options=select_fields(Movie, page)
+    )
+    serialize = get_serializer(
+        MovieSchema,
+        only=page['only'],
+        exclude=page['exclude'],
+        fast=current_app.config['FAST_SERIALIZATION']
+    )
+
+    with timed('serialize'):
+        return jsonify({
+            'success': True,
+            'data': [serialize(movie)]
+        })
+
+
+@casting_blueprint.route('/movies/<int:movie_id>')
+@requires_auth('get:movies')
+@reads_from_replica
+def retrieve_movie(movie_id, token):
+    page = load_args(get_schema(MovieFieldsSchema))
+    tables = find_tables('movie', 'actor', page, None)
+
+    return respond_conditionally(
+        tables,
+        token,
+        lambda: show_movie(movie_id, page)
+    )
 
 
 @casting_blueprint.route('/movies', methods=['POST'])
 @requires_auth('post:movies')
 def create_movie(token):
-    schema = MovieSchema()
+    schema = get_schema(MovieSchema)
     data = load_data(schema)
 
     actor_ids = data['actor_ids']
-    actors = Actor.query.\
-        filter(Actor.id.in_(actor_ids)).\
-        options(load_only('id')).\
-        all()
+    actors = fetch_entities(Actor, actor_ids)
 
     release_date = data['release_date'].replace(tzinfo=None)
     movie = Movie(
@@ -148,7 +548,45 @@ def create_movie(token):
         actors=actors
     )
     movie.insert()
-    serialized = [schema.dump(movie)]
+    serialized = [schema.dump(find_movie(movie.id))]
+
+    return jsonify({
+        'success': True,
+        'data': serialized
+    })
+
+
+@casting_blueprint.route('/movies/batch', methods=['POST'])
+@requires_auth('post:movies')
+def create_movies(token):
+    check_batch_size()
+    schema = get_schema(MovieBatchSchema, many=True)
+    data = load_data(schema)
+
+    movie_ids = bulk_insert(Movie, [
+        {
+            'title': item['title'],
+            'release_date': item['release_date'].replace(tzinfo=None)
+        }
+        for item in data
+    ])
+    insert_castings(
+        (actor_id, movie_id)
+        for movie_id, item in zip(movie_ids, data)
+        for actor_id in item['actor_ids']
+    )
+    bump_versions('movie')
+    db.session.commit()
+
+    movies = Movie.query.\
+        filter(Movie.id.in_(movie_ids)).\
+        options(selectinload(Movie.actors)).\
+        all()
+    movies = {movie.id: movie for movie in movies}
+    serialized = [
+        schema.dump(movies[movie_id], many=False)
+        for movie_id in movie_ids
+    ]
 
     return jsonify({
         'success': True,
@@ -159,33 +597,33 @@ def create_movie(token):
 @casting_blueprint.route('/movies/<int:movie_id>', methods=['PATCH'])
 @requires_auth('patch:movies')
 def update_movie(movie_id, token):
-    schema = MovieSchema()
+    schema = get_schema(MovieUpdateSchema)
     data = load_data(schema, partial=True)
 
-    movie = Movie.query.\
-        filter(Movie.id == movie_id).\
-        one_or_none()
-
-    if not movie:
-        raise NotFound(
-            description=f'A movie with the id "{movie_id}" was not found.'
-        )
+    movie = find_movie(movie_id, load_actors=False)
 
     if 'title' in data:
         movie.title = data['title']
     if 'release_date' in data:
         movie.release_date = data['release_date'].replace(tzinfo=None)
     if 'actor_ids' in data:
-        actor_ids = data['actor_ids']
-        actors = Actor.query.\
-            filter(Actor.id.in_(actor_ids)).\
-            options(load_only('id')).\
-            all()
-
-        movie.actors = actors
+        update_castings(
+            actor_movie_relation.c.movie_id,
+            movie_id,
+            actor_movie_relation.c.actor_id,
+            target_ids=data['actor_ids']
+        )
+    if 'add_actor_ids' in data or 'remove_actor_ids' in data:
+        update_castings(
+            actor_movie_relation.c.movie_id,
+            movie_id,
+            actor_movie_relation.c.actor_id,
+            add_ids=data.get('add_actor_ids', []),
+            remove_ids=data.get('remove_actor_ids', [])
+        )
 
     movie.update()
-    serialized = [schema.dump(movie)]
+    serialized = [schema.dump(find_movie(movie_id))]
 
     return jsonify({
         'success': True,
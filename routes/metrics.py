@@ -0,0 +1,17 @@
+from flask import Blueprint, Response, current_app
+
+from metrics import registry
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+@metrics_blueprint.route('/metrics')
+def metrics():
+    samples = None
+    metrics_directory = current_app.extensions.get('metrics_directory')
+    if metrics_directory is not None:
+        samples = metrics_directory.collect()
+
+    return Response(
+        registry.render(samples),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
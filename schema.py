@@ -1,12 +1,18 @@
+from datetime import datetime
+from flask import current_app
 from marshmallow import (
+    RAISE,
     Schema,
     fields,
     validate,
     validates,
+    validates_schema,
+    post_load,
     ValidationError
 )
-from sqlalchemy.orm import load_only
+from models.database import db
 from models.casting import Actor, Movie
+from util import decode_cursor, fetch_entities
 
 
 def create_not_found_messages(provided_ids, existing_ids, message):
@@ -22,6 +28,35 @@ def create_not_found_messages(provided_ids, existing_ids, message):
     return messages
 
 
+def validate_batch_ids_exist(items, attribute, data_key, model, message):
+    provided_ids = {
+        id
+        for item in items
+        for id in item.get(attribute, [])
+    }
+    if not provided_ids:
+        return
+
+    existing_ids = {
+        id
+        for id, in db.session.query(model.id).
+        filter(model.id.in_(provided_ids))
+    }
+
+    messages = {}
+    for index, item in enumerate(items):
+        item_messages = create_not_found_messages(
+            item.get(attribute, []),
+            existing_ids,
+            message
+        )
+        if item_messages:
+            messages[index] = {data_key: item_messages}
+
+    if messages:
+        raise ValidationError(messages)
+
+
 class ActorSchema(Schema):
     id = fields.Integer(
         dump_only=True
@@ -58,13 +93,10 @@ class ActorSchema(Schema):
     @validates('movie_ids')
     def validate_movies_exist(self, provided_ids):
         if provided_ids:
-            movies = Movie.query.\
-                filter(Movie.id.in_(provided_ids)).\
-                options(load_only('id')).\
-                all()
+            movies = fetch_entities(Movie, provided_ids)
             movie_ids = [movie.id for movie in movies]
 
-            if len(provided_ids) != len(movie_ids):
+            if len(set(provided_ids)) != len(movie_ids):
                 messages = create_not_found_messages(
                     provided_ids,
                     movie_ids,
@@ -111,13 +143,10 @@ class MovieSchema(Schema):
     @validates('actor_ids')
     def validate_actors_exist(self, provided_ids):
         if provided_ids:
-            actors = Actor.query.\
-                filter(Actor.id.in_(provided_ids)).\
-                options(load_only('id')).\
-                all()
+            actors = fetch_entities(Actor, provided_ids)
             actor_ids = {actor.id for actor in actors}
 
-            if len(provided_ids) != len(actor_ids):
+            if len(set(provided_ids)) != len(actor_ids):
                 messages = create_not_found_messages(
                     provided_ids,
                     actor_ids,
@@ -131,3 +160,467 @@ class MovieSchema(Schema):
 
     class Meta:
         ordered = True
+
+
+class ActorUpdateSchema(ActorSchema):
+    add_movie_ids = fields.List(
+        fields.Integer(),
+        data_key='add_movies',
+        load_only=True
+    )
+
+    remove_movie_ids = fields.List(
+        fields.Integer(),
+        data_key='remove_movies',
+        load_only=True
+    )
+
+    @validates('add_movie_ids')
+    def validate_added_movies_exist(self, provided_ids):
+        self.validate_movies_exist(provided_ids)
+
+    @validates_schema
+    def validate_movies_changes(self, data, **kwargs):
+        if 'movie_ids' not in data:
+            return
+
+        messages = {
+            self.fields[attribute].data_key: [
+                self.error_messages['movies_conflict']
+            ]
+            for attribute in ['add_movie_ids', 'remove_movie_ids']
+            if attribute in data
+        }
+        if messages:
+            raise ValidationError(messages)
+
+    error_messages = {
+        'movies_conflict': 'Can not be combined with "movies".'
+    }
+
+    class Meta:
+        ordered = True
+
+
+class MovieUpdateSchema(MovieSchema):
+    add_actor_ids = fields.List(
+        fields.Integer(),
+        data_key='add_actors',
+        load_only=True
+    )
+
+    remove_actor_ids = fields.List(
+        fields.Integer(),
+        data_key='remove_actors',
+        load_only=True
+    )
+
+    @validates('add_actor_ids')
+    def validate_added_actors_exist(self, provided_ids):
+        self.validate_actors_exist(provided_ids)
+
+    @validates_schema
+    def validate_actors_changes(self, data, **kwargs):
+        if 'actor_ids' not in data:
+            return
+
+        messages = {
+            self.fields[attribute].data_key: [
+                self.error_messages['actors_conflict']
+            ]
+            for attribute in ['add_actor_ids', 'remove_actor_ids']
+            if attribute in data
+        }
+        if messages:
+            raise ValidationError(messages)
+
+    error_messages = {
+        'actors_conflict': 'Can not be combined with "actors".'
+    }
+
+    class Meta:
+        ordered = True
+
+
+class ActorBatchSchema(ActorSchema):
+    def validate_movies_exist(self, provided_ids):
+        pass
+
+    @validates_schema(pass_many=True)
+    def validate_batch_movies_exist(self, data, many, **kwargs):
+        validate_batch_ids_exist(
+            data if many else [data],
+            'movie_ids',
+            'movies',
+            Movie,
+            self.error_messages['not_found']
+        )
+
+    class Meta:
+        ordered = True
+
+
+class MovieBatchSchema(MovieSchema):
+    def validate_actors_exist(self, provided_ids):
+        pass
+
+    @validates_schema(pass_many=True)
+    def validate_batch_actors_exist(self, data, many, **kwargs):
+        validate_batch_ids_exist(
+            data if many else [data],
+            'actor_ids',
+            'actors',
+            Actor,
+            self.error_messages['not_found']
+        )
+
+    class Meta:
+        ordered = True
+
+
+class ActorRecordSchema(ActorSchema):
+    id = fields.Integer(
+        required=True
+    )
+
+    class Meta:
+        ordered = True
+        exclude = ['movies', 'movie_ids']
+
+
+class MovieRecordSchema(MovieSchema):
+    id = fields.Integer(
+        required=True
+    )
+
+    @post_load
+    def remove_timezone(self, data, **kwargs):
+        data['release_date'] = data['release_date'].replace(tzinfo=None)
+        return data
+
+    class Meta:
+        ordered = True
+        exclude = ['actors', 'actor_ids']
+
+
+class CastingRecordSchema(Schema):
+    actor_id = fields.Integer(
+        required=True
+    )
+
+    movie_id = fields.Integer(
+        required=True
+    )
+
+    class Meta:
+        ordered = True
+
+
+class Cursor(fields.Field):
+    default_error_messages = {
+        'invalid': 'The cursor is not valid.'
+    }
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            cursor = decode_cursor(value)
+        except (TypeError, ValueError):
+            raise self.make_error('invalid')
+
+        if type(cursor) is not dict or type(cursor.get('id')) is not int:
+            raise self.make_error('invalid')
+
+        if type(cursor.get('sort', 'id')) is not str:
+            raise self.make_error('invalid')
+
+        return cursor
+
+
+class DelimitedList(fields.List):
+    default_error_messages = {
+        'invalid': 'Not a valid comma separated list.'
+    }
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if type(value) is not str:
+            raise self.make_error('invalid')
+
+        items = [item for item in value.split(',') if item]
+        return super()._deserialize(items, attr, data, **kwargs)
+
+
+def remove_timezone(value):
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return value
+
+
+class FieldsSchema(Schema):
+    relationships = []
+
+    @post_load
+    def select_fields(self, data, **kwargs):
+        # An empty list of fields, such as ?fields=, selects every field
+        # rather than none.
+        field_names = data.pop('field_names', None) or None
+
+        expand = data.get('expand')
+        if expand is None and field_names is not None:
+            expand = [
+                relationship
+                for relationship in self.relationships
+                if relationship in field_names
+            ]
+        elif expand is None:
+            expand = self.relationships
+        data['expand'] = list(dict.fromkeys(expand))
+
+        data['only'] = None
+        if field_names is not None:
+            data['only'] = list(dict.fromkeys(
+                [
+                    name
+                    for name in field_names
+                    if name not in self.relationships
+                ] + data['expand']
+            ))
+
+        data['exclude'] = [
+            relationship
+            for relationship in self.relationships
+            if relationship not in data['expand']
+        ]
+        return data
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
+
+
+class ActorFieldsSchema(FieldsSchema):
+    field_names = DelimitedList(
+        fields.String(
+            validate=validate.OneOf(['id', 'name', 'age', 'gender', 'movies'])
+        ),
+        data_key='fields'
+    )
+
+    expand = DelimitedList(
+        fields.String(
+            validate=validate.OneOf(['movies'])
+        )
+    )
+
+    relationships = ['movies']
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
+
+
+class MovieFieldsSchema(FieldsSchema):
+    field_names = DelimitedList(
+        fields.String(
+            validate=validate.OneOf(['id', 'title', 'release_date', 'actors'])
+        ),
+        data_key='fields'
+    )
+
+    expand = DelimitedList(
+        fields.String(
+            validate=validate.OneOf(['actors'])
+        )
+    )
+
+    relationships = ['actors']
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
+
+
+class PageSchema(FieldsSchema):
+    limit = fields.Integer(
+        validate=validate.Range(min=1)
+    )
+
+    cursor = Cursor()
+
+    sort = fields.String(
+        missing='id',
+        validate=validate.OneOf(['id', '-id'])
+    )
+
+    stream = fields.Boolean(
+        missing=False
+    )
+
+    ids = DelimitedList(
+        fields.Integer()
+    )
+
+    sort_fields = {
+        'id': fields.Integer()
+    }
+
+    @validates('limit')
+    def validate_limit_maximum(self, limit):
+        maximum = current_app.config['PAGE_SIZE_MAX']
+        if limit > maximum:
+            raise ValidationError(
+                self.error_messages['limit_maximum'].format(maximum)
+            )
+
+    @validates('ids')
+    def validate_ids_maximum(self, ids):
+        maximum = current_app.config['PAGE_SIZE_MAX']
+        if len(ids) > maximum:
+            raise ValidationError(
+                self.error_messages['ids_maximum'].format(maximum)
+            )
+
+    @validates_schema
+    def validate_cursor_sort(self, data, **kwargs):
+        cursor = data.get('cursor')
+        if cursor is None:
+            return
+
+        sort = data['sort']
+        if cursor.get('sort', 'id') != sort:
+            raise ValidationError(
+                self.error_messages['cursor_sort'],
+                'cursor'
+            )
+
+        name = sort.lstrip('-')
+        if name == 'id':
+            return
+
+        try:
+            cursor['value'] = self.sort_fields[name].deserialize(
+                cursor.get('value')
+            )
+        except ValidationError:
+            raise ValidationError(
+                self.fields['cursor'].error_messages['invalid'],
+                'cursor'
+            )
+
+    @post_load
+    def apply_defaults(self, data, **kwargs):
+        data.setdefault('limit', current_app.config['PAGE_SIZE_DEFAULT'])
+        data.setdefault('cursor', None)
+        return data
+
+    def validate_range(self, data, minimum, maximum):
+        if minimum in data and maximum in data:
+            if data[minimum] > data[maximum]:
+                raise ValidationError(
+                    self.error_messages['range'].format(minimum),
+                    maximum
+                )
+
+    error_messages = {
+        'limit_maximum': 'Must be less than or equal to {}.',
+        'ids_maximum': 'Can not contain more than {} ids.',
+        'cursor_sort': 'The cursor was not created with this sort.',
+        'range': 'Must be greater than or equal to "{}".'
+    }
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
+
+
+class ActorPageSchema(PageSchema, ActorFieldsSchema):
+    sort = fields.String(
+        missing='id',
+        validate=validate.OneOf(['id', '-id', 'name', '-name', 'age', '-age'])
+    )
+
+    gender = fields.String(
+        validate=validate.OneOf(['male', 'female', 'other'])
+    )
+
+    min_age = fields.Integer(
+        validate=validate.Range(min=0)
+    )
+
+    max_age = fields.Integer(
+        validate=validate.Range(min=0)
+    )
+
+    name_prefix = fields.String(
+        validate=validate.Length(min=1)
+    )
+
+    movie_id = fields.Integer()
+
+    sort_fields = {
+        'id': fields.Integer(),
+        'name': fields.String(),
+        'age': fields.Integer()
+    }
+
+    @validates_schema
+    def validate_age_range(self, data, **kwargs):
+        self.validate_range(data, 'min_age', 'max_age')
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
+
+
+class MoviePageSchema(PageSchema, MovieFieldsSchema):
+    sort = fields.String(
+        missing='id',
+        validate=validate.OneOf([
+            'id',
+            '-id',
+            'title',
+            '-title',
+            'release_date',
+            '-release_date'
+        ])
+    )
+
+    min_release_date = fields.DateTime()
+
+    max_release_date = fields.DateTime()
+
+    title_prefix = fields.String(
+        validate=validate.Length(min=1)
+    )
+
+    actor_id = fields.Integer()
+
+    sort_fields = {
+        'id': fields.Integer(),
+        'title': fields.String(),
+        'release_date': fields.DateTime()
+    }
+
+    @validates_schema
+    def validate_release_date_range(self, data, **kwargs):
+        self.validate_range(
+            {
+                name: remove_timezone(value)
+                for name, value in data.items()
+            },
+            'min_release_date',
+            'max_release_date'
+        )
+
+    @post_load
+    def remove_timezones(self, data, **kwargs):
+        for name in ['min_release_date', 'max_release_date']:
+            if name in data:
+                data[name] = remove_timezone(data[name])
+        cursor = data.get('cursor')
+        if cursor and 'value' in cursor:
+            cursor['value'] = remove_timezone(cursor['value'])
+        return data
+
+    class Meta:
+        ordered = True
+        unknown = RAISE
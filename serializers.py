@@ -0,0 +1,98 @@
+import threading
+from marshmallow import fields
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+
+
+registry_lock = threading.Lock()
+schemas = {}
+dumpers = {}
+
+
+def create_key(schema_class, only=None, exclude=(), many=False):
+    if only is not None:
+        only = frozenset(only)
+    return (schema_class, only, frozenset(exclude), many)
+
+
+def resolve_nested(schema):
+    for field in schema.fields.values():
+        if isinstance(field, fields.List):
+            field = field.inner
+        if isinstance(field, fields.Nested):
+            resolve_nested(field.schema)
+
+
+def get_schema(schema_class, only=None, exclude=(), many=False):
+    key = create_key(schema_class, only, exclude, many)
+    schema = schemas.get(key)
+    if schema is not None:
+        return schema
+
+    with registry_lock:
+        schema = schemas.get(key)
+        if schema is None:
+            schema = schema_class(only=only, exclude=exclude, many=many)
+            resolve_nested(schema)
+            schemas[key] = schema
+
+    return schema
+
+
+def format_datetime(value):
+    if value is None:
+        return None
+    return value.isoformat()
+
+
+def compile_dumper(schema):
+    if schema._has_processors(PRE_DUMP) or schema._has_processors(POST_DUMP):
+        return None
+
+    namespace = {'format_datetime': format_datetime}
+    items = []
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        attribute = field.attribute or name
+        if not attribute.isidentifier():
+            return None
+
+        value = f'obj.{attribute}'
+        if type(field) in (fields.Integer, fields.String):
+            expression = value
+        elif type(field) is fields.DateTime and field.format in (None, 'iso'):
+            expression = f'format_datetime({value})'
+        elif type(field) is fields.List and \
+                type(field.inner) is fields.Nested and \
+                not field.inner.many:
+            dump_nested = compile_dumper(field.inner.schema)
+            if dump_nested is None:
+                return None
+            namespace[f'dump_{index}'] = dump_nested
+            expression = f'[dump_{index}(item) for item in {value}]'
+        else:
+            return None
+
+        items.append(f'{field.data_key or name!r}: {expression}')
+
+    source = 'def dump(obj):\n    return {' + ', '.join(items) + '}\n'
+    code = compile(source, f'<{type(schema).__name__} dumper>', 'exec')
+    exec(code, namespace)
+    return namespace['dump']
+
+
+def get_serializer(schema_class, only=None, exclude=(), fast=True):
+    schema = get_schema(schema_class, only, exclude)
+    if not fast:
+        return schema.dump
+
+    key = create_key(schema_class, only, exclude)
+    dump = dumpers.get(key)
+    if dump is not None:
+        return dump
+
+    with registry_lock:
+        dump = dumpers.get(key)
+        if dump is None:
+            dump = compile_dumper(schema) or schema.dump
+            dumpers[key] = dump
+
+    return dump
@@ -0,0 +1,313 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from profiler import format_code
+
+
+logger = logging.getLogger(__name__)
+
+root = os.path.dirname(os.path.abspath(__file__))
+routes_path = os.path.join(root, 'routes', 'casting.py')
+schema_path = os.path.join(root, 'schema.py')
+
+placeholder_pattern = (
+    r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+|'
+    r"'(?:[^']|'')*'|-?\d+(?:\.\d+)?)"
+)
+value_list_pattern = re.compile(
+    rf'\(\s*{placeholder_pattern}(?:\s*,\s*{placeholder_pattern})*\s*\)'
+)
+literal_pattern = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+whitespace_pattern = re.compile(r'\s+')
+volatile_pattern = re.compile(
+    r'\b(?:nextval|setval|pg_advisory_\w*|pg_notify)\s*\(',
+    re.I
+)
+
+
+def create_fingerprint(statement):
+    # Lists of values, such as the ids of an IN clause, vary in length
+    # between requests, so they are collapsed before the literals.
+    statement = whitespace_pattern.sub(' ', statement).strip()
+    statement = value_list_pattern.sub('(?)', statement)
+    return literal_pattern.sub('?', statement)
+
+
+def fingerprint_id(fingerprint):
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+
+def describe_value(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        types = sorted({describe_value(item) for item in value})
+        return f'{type(value).__name__}[{"|".join(types)}]'
+    return type(value).__name__
+
+
+def describe_parameters(parameters, many=False):
+    if many:
+        count = len(parameters)
+        shape = describe_parameters(parameters[0]) if count else '()'
+        return f'{count} x {shape}'
+
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(
+            f'{name}: {describe_value(value)}'
+            for name, value in parameters.items()
+        ) + '}'
+    return '(' + ', '.join(
+        describe_value(value)
+        for value in parameters or ()
+    ) + ')'
+
+
+@lru_cache(maxsize=4096)
+def is_watched(code):
+    filename = os.path.abspath(code.co_filename)
+    if filename == routes_path:
+        return True
+    return filename == schema_path and code.co_name.startswith('validate')
+
+
+def find_caller(frame):
+    while frame is not None:
+        if is_watched(frame.f_code):
+            return f'{format_code(frame.f_code)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+def can_analyze(statement):
+    # ANALYZE runs the statement again, and the side effects of these
+    # functions, such as the values taken from a sequence by the bulk
+    # inserts, are not undone by the rollback.
+    return volatile_pattern.search(statement) is None
+
+
+def is_explainable(dialect, statement):
+    words = statement.lstrip().split(None, 1)
+    return (
+        dialect.name == 'postgresql' and
+        bool(words) and
+        words[0].upper() == 'SELECT' and
+        not re.search(r'\bFOR\s+(?:UPDATE|SHARE)\b', statement, re.I)
+    )
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        threshold=0.25,
+        rate_seconds=60,
+        explain=True,
+        explain_timeout=5,
+        max_fingerprints=10000,
+        max_pending_explains=4
+    ):
+        self.threshold = threshold
+        self.rate_seconds = rate_seconds
+        self.explain = explain
+        self.explain_timeout = explain_timeout
+        self.max_fingerprints = max_fingerprints
+        self.max_pending_explains = max_pending_explains
+
+        self._logged_at = {}
+        self._suppressed = {}
+        self._pending_explains = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def allow(self, fingerprint):
+        now = time.monotonic()
+        with self._lock:
+            logged_at = self._logged_at.get(fingerprint)
+            if logged_at is not None and now - logged_at < self.rate_seconds:
+                self._suppressed[fingerprint] = \
+                    self._suppressed.get(fingerprint, 0) + 1
+                return None
+
+            if len(self._logged_at) >= self.max_fingerprints:
+                self._logged_at = {
+                    key: value
+                    for key, value in self._logged_at.items()
+                    if now - value < self.rate_seconds
+                }
+                self._suppressed = {
+                    key: value
+                    for key, value in self._suppressed.items()
+                    if key in self._logged_at
+                }
+            self._logged_at[fingerprint] = now
+            return self._suppressed.pop(fingerprint, 0)
+
+    def record(self, conn, statement, parameters, many, seconds):
+        if self.threshold <= 0 or seconds < self.threshold:
+            return
+
+        caller = find_caller(sys._getframe(1))
+        if caller is None:
+            return
+
+        fingerprint = create_fingerprint(statement)
+        suppressed = self.allow(fingerprint)
+        if suppressed is None:
+            return
+
+        query_id = fingerprint_id(fingerprint)
+        route = 'none'
+        if has_request_context():
+            route = (
+                f'{request.method} {request.path}'
+                f' ({request.endpoint or "unmatched"})'
+            )
+
+        logger.warning(
+            'Slow query %s took %.1f ms in %s from %s: %s'
+            ' parameters=%s suppressed=%d',
+            query_id,
+            seconds * 1000,
+            route,
+            caller,
+            whitespace_pattern.sub(' ', statement).strip(),
+            describe_parameters(parameters, many),
+            suppressed
+        )
+
+        if self.explain and not many and \
+                is_explainable(conn.dialect, statement):
+            self.submit_explain(
+                conn.engine,
+                query_id,
+                statement,
+                parameters,
+                can_analyze(statement)
+            )
+
+    def submit_explain(
+        self,
+        engine,
+        query_id,
+        statement,
+        parameters,
+        analyze
+    ):
+        with self._lock:
+            if self._pending_explains >= self.max_pending_explains:
+                return
+            self._pending_explains += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix='slow-query-explain'
+                )
+
+        self._executor.submit(
+            self.run_explain,
+            engine,
+            query_id,
+            statement,
+            parameters,
+            analyze
+        )
+
+    def run_explain(self, engine, query_id, statement, parameters, analyze):
+        try:
+            plan = self.explain_statement(
+                engine,
+                statement,
+                parameters,
+                analyze
+            )
+            logger.warning('Slow query %s plan:\n%s', query_id, plan)
+        except Exception:
+            logger.warning(
+                'Unable to explain the slow query %s.',
+                query_id,
+                exc_info=True
+            )
+        finally:
+            with self._lock:
+                self._pending_explains -= 1
+
+    def explain_statement(self, engine, statement, parameters, analyze=True):
+        # ANALYZE runs the statement again, so it is bounded by a timeout
+        # and rolled back, and it uses a raw connection so it is not
+        # timed or logged itself.
+        options = ' (ANALYZE, BUFFERS)' if analyze else ''
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                'SET LOCAL statement_timeout = %s',
+                (int(self.explain_timeout * 1000),)
+            )
+            cursor.execute(
+                f'EXPLAIN{options} {statement}',
+                parameters
+            )
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.close()
+            return plan
+        finally:
+            connection.rollback()
+            connection.close()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+def get_slow_query_log():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('slow_query_log')
+
+
+def start_slow_query(conn, cursor, statement, parameters, context, many):
+    if get_slow_query_log() is not None:
+        conn.info.setdefault('slow_query_started_at', []).\
+            append(time.perf_counter())
+
+
+def finish_slow_query(conn, cursor, statement, parameters, context, many):
+    slow_query_log = get_slow_query_log()
+    started_at = conn.info.get('slow_query_started_at')
+    if slow_query_log is None or not started_at:
+        return
+
+    seconds = time.perf_counter() - started_at.pop()
+    slow_query_log.record(conn, statement, parameters, many, seconds)
+
+
+def fail_slow_query(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('slow_query_started_at'):
+        conn.info['slow_query_started_at'].pop()
+
+
+listeners = (
+    ('before_cursor_execute', start_slow_query),
+    ('after_cursor_execute', finish_slow_query),
+    ('handle_error', fail_slow_query)
+)
+
+
+def install_slow_query_log(app):
+    app.extensions['slow_query_log'] = SlowQueryLog(
+        threshold=app.config['SLOW_QUERY_SECONDS'],
+        rate_seconds=app.config['SLOW_QUERY_RATE_SECONDS'],
+        explain=app.config['SLOW_QUERY_EXPLAIN']
+    )
+    for name, listener in listeners:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
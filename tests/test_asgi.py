@@ -0,0 +1,202 @@
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+from starlette.testclient import TestClient
+
+from asgi import create_asgi_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import get_database_url, load_test_env, mock_data
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+
+
+class AsgiTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_asgi_app(get_database_url(self.db_name))
+        self.flask_app = self.app.state.flask_app
+        self.flask_client = self.flask_app.test_client()
+
+        self.client = TestClient(self.app)
+        self.client.__enter__()
+        self.set_auth_token(ASSISTANT_TOKEN)
+
+        with self.flask_app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        with self.flask_app.app_context():
+            self.db.drop_all()
+
+    def set_auth_token(self, token):
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def create_castings(self):
+        with self.flask_app.app_context():
+            movies = [Movie(**movie) for movie in mock_data['movies_b']]
+            actors = [Actor(**actor) for actor in mock_data['actors_b']]
+            actors[0].movies = movies
+            actors[1].movies = movies[:1]
+            for actor in actors:
+                actor.insert()
+            Actor(**mock_data['actor_a']).insert()
+
+    def assert_matches_flask(self, path, query_string=None):
+        response = self.client.get(
+            path,
+            params=query_string,
+            headers=self.headers
+        )
+        expected = self.flask_client.get(
+            path,
+            query_string=query_string,
+            headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.get_json())
+        return response
+
+    def test_health(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True})
+
+    def test_retrieve_actors(self):
+        self.create_castings()
+
+        response = self.assert_matches_flask('/actors')
+        self.assertEqual(len(response.json()['data']), 3)
+        self.assertEqual(
+            response.headers['Content-Type'],
+            'application/json'
+        )
+
+    def test_retrieve_actors_with_page_arguments(self):
+        self.create_castings()
+
+        self.assert_matches_flask('/actors', {'fields': 'id,name'})
+        self.assert_matches_flask('/actors', {'expand': 'movies'})
+        self.assert_matches_flask('/actors', {'gender': 'female'})
+        self.assert_matches_flask('/actors', {'movie_id': 1})
+
+        response = self.assert_matches_flask(
+            '/actors',
+            {'sort': '-age', 'limit': 2}
+        )
+        next_cursor = response.json()['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        self.assert_matches_flask(
+            '/actors',
+            {'sort': '-age', 'limit': 2, 'cursor': next_cursor}
+        )
+
+    def test_retrieve_movies_with_page_arguments(self):
+        self.create_castings()
+
+        self.assert_matches_flask('/movies', {'expand': 'actors'})
+        response = self.assert_matches_flask(
+            '/movies',
+            {'sort': '-release_date', 'limit': 1}
+        )
+        self.assert_matches_flask('/movies', {
+            'sort': '-release_date',
+            'limit': 1,
+            'cursor': response.json()['next_cursor']
+        })
+
+    def test_stream_actors(self):
+        self.create_castings()
+        self.flask_app.config['STREAM_BATCH_SIZE'] = 2
+
+        response = self.client.get(
+            '/actors',
+            params={'stream': 'true', 'sort': 'name', 'expand': 'movies'},
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+
+        names = [actor['name'] for actor in response.json()['data']]
+        self.assertEqual(names, ['Diane Keaton', 'Robert Duvall', 'Tom Hanks'])
+        self.assertEqual(len(response.json()['data'][1]['movies']), 2)
+
+    def test_retrieve_actor_and_movie_by_id(self):
+        self.create_castings()
+
+        self.assert_matches_flask('/actors/1')
+        self.assert_matches_flask('/actors/2', {'fields': 'name,movies'})
+        self.assert_matches_flask('/movies/1', {'expand': 'actors'})
+
+    def test_retrieve_actor_when_actor_does_not_exist(self):
+        response = self.assert_matches_flask('/actors/1')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {
+            'success': False,
+            'description': 'An actor with the id "1" was not found.'
+        })
+
+    def test_retrieve_actors_without_token(self):
+        self.headers = {}
+
+        response = self.assert_matches_flask('/actors')
+        self.assertEqual(response.status_code, 401)
+
+    def test_retrieve_actors_with_invalid_arguments(self):
+        response = self.assert_matches_flask('/actors', {'limit': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['invalid_params'][0]['name'],
+            'limit'
+        )
+
+    def test_retrieve_actors_when_not_modified(self):
+        self.create_castings()
+
+        expected = self.flask_client.get('/actors', headers=self.headers)
+        response = self.client.get('/actors', headers=self.headers)
+        self.assertEqual(response.headers['ETag'], expected.headers['ETag'])
+
+        response = self.client.get('/actors', headers={
+            **self.headers,
+            'If-None-Match': response.headers['ETag']
+        })
+        self.assertEqual(response.status_code, 304)
+
+    def test_unhandled_error_is_logged(self):
+        client = TestClient(self.app, raise_server_exceptions=False)
+        list_entities = patch(
+            'asgi.list_entities',
+            side_effect=RuntimeError('broken')
+        )
+        with list_entities, self.assertLogs('asgi', 'ERROR') as logs:
+            response = client.get('/actors', headers=self.headers)
+        self.assertEqual(response.status_code, 500)
+
+        self.assertIn('Exception on GET /actors', logs.output[0])
+        self.assertIn('RuntimeError: broken', logs.output[0])
+
+    def test_writes_are_served_by_flask(self):
+        self.set_auth_token(DIRECTOR_TOKEN)
+
+        response = self.client.post(
+            '/actors',
+            json=mock_data['actor_a'],
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['success'], True)
+
+        response = self.assert_matches_flask('/actors')
+        self.assertEqual(len(response.json()['data']), 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import get_database_url, mock_data
+
+
+class CatalogCommandsTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.runner = self.app.test_cli_runner(mix_stderr=False)
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def create_catalog(self):
+        with self.app.app_context():
+            movies = [
+                Movie(**mock_movie)
+                for mock_movie in mock_data['movies_b']
+            ]
+            for mock_actor in mock_data['actors_b']:
+                actor = Actor(**mock_actor)
+                actor.movies = movies
+                actor.insert()
+
+    def export(self, entity):
+        result = self.runner.invoke(args=['catalog', 'export', entity])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.stdout
+
+    def import_lines(self, entity, lines):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as file:
+            file.write(lines)
+            file.flush()
+
+            return self.runner.invoke(
+                args=[
+                    'catalog',
+                    'import',
+                    entity,
+                    file.name,
+                    '--batch-size',
+                    '1'
+                ]
+            )
+
+    def test_export_actors(self):
+        self.create_catalog()
+
+        lines = self.export('actors').splitlines()
+        records = [json.loads(line) for line in lines]
+
+        self.assertEqual(
+            [record['name'] for record in records],
+            [mock_actor['name'] for mock_actor in mock_data['actors_b']]
+        )
+        self.assertEqual(
+            list(records[0]),
+            ['id', 'name', 'age', 'gender']
+        )
+
+    def test_export_and_import_catalog(self):
+        self.create_catalog()
+        exports = {
+            entity: self.export(entity)
+            for entity in ['actors', 'movies', 'castings']
+        }
+        self.assertEqual(len(exports['castings'].splitlines()), 4)
+
+        with self.app.app_context():
+            self.db.drop_all()
+            self.db.create_all()
+
+        for entity in ['actors', 'movies', 'castings']:
+            result = self.import_lines(entity, exports[entity])
+            self.assertEqual(result.exit_code, 0, result.output)
+
+        for entity in ['actors', 'movies', 'castings']:
+            self.assertEqual(self.export(entity), exports[entity])
+
+        with self.app.app_context():
+            actor = Actor.query.first()
+            self.assertEqual(len(actor.movies), 2)
+
+    def test_import_when_record_is_not_valid(self):
+        lines = '\n'.join([
+            json.dumps({'id': 1, 'name': 'Al Pacino', 'age': 80,
+                        'gender': 'male'}),
+            json.dumps({'id': 2, 'name': 'Diane Keaton', 'age': 'old',
+                        'gender': 'female'})
+        ])
+
+        result = self.import_lines('actors', lines)
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Line 2.age: Not a valid integer.', result.stderr)
+
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 0)
+
+    def test_import_when_lines_are_blank(self):
+        lines = '\n'.join([
+            json.dumps({'id': 1, 'name': 'Al Pacino', 'age': 80,
+                        'gender': 'male'}),
+            '',
+            '  ',
+            json.dumps({'id': 2, 'name': 'Diane Keaton', 'age': 74,
+                        'gender': 'female'}),
+            ''
+        ])
+
+        result = self.import_lines('actors', lines)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 2 actors.', result.stderr)
+
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 2)
+
+    def test_import_when_copy_fails(self):
+        self.create_catalog()
+        lines = self.export('actors')
+
+        connection = Mock()
+        connection.connection.cursor.return_value.copy_expert.side_effect = \
+            sqlite3.IntegrityError('duplicate key value')
+        with self.app.app_context():
+            dialect = patch.object(db.engine.dialect, 'name', 'postgresql')
+            session = patch.object(
+                db.session,
+                'connection',
+                return_value=connection
+            )
+            with dialect, session:
+                result = self.import_lines('actors', lines)
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn(
+            'The records could not be imported: duplicate key value',
+            result.stderr
+        )
+
+    def test_import_when_line_is_not_json(self):
+        result = self.import_lines('movies', '{"id": 1,')
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Line 1: The line is not valid JSON.', result.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -276,3 +282,51 @@ class CreateActorTestCase(TestCase):
 
         data = response.get_json()
         self.assertEqual(data, expected)
+
+    def test_create_actor_when_update_arguments_provided(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = {
+            **mock_data['actor_a'],
+            'remove_movies': [1]
+        }
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'remove_movies',
+                'reason': 'Unknown field.'
+            }]
+        }
+
+        response = self.client.post('/actors', json=payload)
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_actor_movies_with_one_lookup_query(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        related_ids = []
+        with self.app.app_context():
+            for mock_related in mock_data['movies_b']:
+                related = Movie(**mock_related)
+                related.insert()
+                related_ids.append(related.id)
+
+        with count_queries(self.app) as statements:
+            response = self.client.post(
+                '/actors',
+                json={**mock_data['actor_a'], 'movies': related_ids}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'WHERE movie.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(len(statements), 7)
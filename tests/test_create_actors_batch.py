@@ -0,0 +1,196 @@
+import os
+from unittest import TestCase, main
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import get_database_url, load_test_env, set_auth_token, mock_data
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+EXECUTIVE_TOKEN = os.getenv('EXECUTIVE_TOKEN')
+
+class CreateActorsBatchTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def test_create_actors_when_requested_by_assistant(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        payload = mock_data['actors_b']
+        expected = {
+            'success': False,
+            'description': (
+                'The account is not authorized to access this resource.')
+        }
+
+        response = self.client.post('/actors/batch', json=payload)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_actors_when_requested_by_director(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = None
+        expected = None
+        with self.app.app_context():
+            movie_ids = []
+            expected_movies = []
+            for mock_movie in mock_data['movies_b']:
+                movie = Movie(**mock_movie)
+                movie.insert()
+
+                movie_ids.append(movie.id)
+                release_date = mock_movie['release_date'].isoformat()
+                expected_movies.append({
+                    'id': movie.id,
+                    **mock_movie,
+                    'release_date': release_date
+                })
+
+            mock_actors = mock_data['actors_b']
+            payload = [
+                {**mock_actors[0], 'movies': movie_ids},
+                {**mock_actors[1], 'movies': movie_ids[:1]},
+                mock_data['actor_a']
+            ]
+
+            expected = {
+                'success': True,
+                'data': [
+                    {**mock_actors[0], 'movies': expected_movies},
+                    {**mock_actors[1], 'movies': expected_movies[:1]},
+                    {**mock_data['actor_a'], 'movies': []}
+                ]
+            }
+
+        response = self.client.post('/actors/batch', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        actor_ids = []
+        for actor in data['data']:
+            actor_ids.append(actor.pop('id'))
+
+        self.assertEqual(data, expected)
+
+        with self.app.app_context():
+            actors = Actor.query.order_by(Actor.id).all()
+            self.assertEqual([actor.id for actor in actors], actor_ids)
+            self.assertEqual(len(actors[0].movies), 2)
+
+    def test_create_actors_when_movies_not_found(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = None
+        with self.app.app_context():
+            movie = Movie(**mock_data['movie_a'])
+            movie.insert()
+
+            mock_actors = mock_data['actors_b']
+            payload = [
+                {**mock_actors[0], 'movies': [movie.id]},
+                {**mock_actors[1], 'movies': [movie.id, 100]},
+            ]
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': '[1].movies[1]',
+                'reason': 'A movie with the id "100" was not found.'
+            }]
+        }
+
+        response = self.client.post('/actors/batch', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 0)
+
+    def test_create_actors_when_required_argument_missing(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = [
+            mock_data['actor_a'],
+            {'name': 'Al Pacino', 'gender': 'male'}
+        ]
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': '[1].age',
+                'reason': 'Missing data for required field.'
+            }]
+        }
+
+        response = self.client.post('/actors/batch', json=payload)
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_actors_when_update_arguments_provided(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = [{**mock_data['actor_a'], 'add_movies': [1]}]
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': '[0].add_movies',
+                'reason': 'Unknown field.'
+            }]
+        }
+
+        response = self.client.post('/actors/batch', json=payload)
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_actors_when_batch_too_large(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        self.app.config['BATCH_SIZE_MAX'] = 1
+
+        expected = {
+            'success': False,
+            'description': 'A batch can not contain more than 1 items.'
+        }
+
+        response = self.client.post(
+            '/actors/batch',
+            json=mock_data['actors_b']
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+
+if __name__ == '__main__':
+    main()
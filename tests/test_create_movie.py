@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -247,6 +253,60 @@ class CreateMovieTestCase(TestCase):
         data = response.get_json()
         self.assertEqual(data, expected)
 
+    def test_create_movie_when_update_arguments_provided(self):
+        set_auth_token(self.client, EXECUTIVE_TOKEN)
+
+        mock_movie = mock_data['movie_a']
+        payload = {
+            **mock_movie,
+            'release_date': mock_movie['release_date'].isoformat(),
+            'remove_actors': [1]
+        }
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'remove_actors',
+                'reason': 'Unknown field.'
+            }]
+        }
+
+        response = self.client.post('/movies', json=payload)
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_movie_actors_with_one_lookup_query(self):
+        set_auth_token(self.client, EXECUTIVE_TOKEN)
+
+        related_ids = []
+        with self.app.app_context():
+            for mock_related in mock_data['actors_b']:
+                related = Actor(**mock_related)
+                related.insert()
+                related_ids.append(related.id)
+
+        mock_movie = mock_data['movie_a']
+        payload = {
+            **mock_movie,
+            'release_date': mock_movie['release_date'].isoformat(),
+            'actors': related_ids
+        }
+
+        with count_queries(self.app) as statements:
+            response = self.client.post('/movies', json=payload)
+        self.assertEqual(response.status_code, 200)
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'WHERE actor.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(len(statements), 7)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,159 @@
+import os
+from unittest import TestCase, main
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import get_database_url, load_test_env, set_auth_token, mock_data
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+EXECUTIVE_TOKEN = os.getenv('EXECUTIVE_TOKEN')
+
+class CreateMoviesBatchTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def test_create_movies_when_requested_by_director(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        payload = [
+            {
+                **mock_movie,
+                'release_date': mock_movie['release_date'].isoformat()
+            }
+            for mock_movie in mock_data['movies_b']
+        ]
+        expected = {
+            'success': False,
+            'description': (
+                'The account is not authorized to access this resource.')
+        }
+
+        response = self.client.post('/movies/batch', json=payload)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_create_movies_when_requested_by_executive(self):
+        set_auth_token(self.client, EXECUTIVE_TOKEN)
+
+        payload = None
+        expected = None
+        with self.app.app_context():
+            actor_ids = []
+            expected_actors = []
+            for mock_actor in mock_data['actors_b']:
+                actor = Actor(**mock_actor)
+                actor.insert()
+
+                actor_ids.append(actor.id)
+                expected_actors.append({
+                    'id': actor.id,
+                    **mock_actor
+                })
+
+            payload = []
+            expected_movies = []
+            for mock_movie in mock_data['movies_b']:
+                release_date = mock_movie['release_date'].isoformat()
+                payload.append({
+                    **mock_movie,
+                    'release_date': release_date,
+                    'actors': actor_ids
+                })
+                expected_movies.append({
+                    **mock_movie,
+                    'release_date': release_date,
+                    'actors': expected_actors
+                })
+
+            expected = {
+                'success': True,
+                'data': expected_movies
+            }
+
+        response = self.client.post('/movies/batch', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        for movie in data['data']:
+            self.assertTrue(movie.pop('id'))
+
+        self.assertEqual(data, expected)
+
+    def test_create_movies_when_actors_not_found(self):
+        set_auth_token(self.client, EXECUTIVE_TOKEN)
+
+        payload = [
+            {
+                **mock_movie,
+                'release_date': mock_movie['release_date'].isoformat(),
+                'actors': [100 + index]
+            }
+            for index, mock_movie in enumerate(mock_data['movies_b'])
+        ]
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [
+                {
+                    'name': '[0].actors[0]',
+                    'reason': 'An actor with the id "100" was not found.'
+                },
+                {
+                    'name': '[1].actors[0]',
+                    'reason': 'An actor with the id "101" was not found.'
+                }
+            ]
+        }
+
+        response = self.client.post('/movies/batch', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+        with self.app.app_context():
+            self.assertEqual(Movie.query.count(), 0)
+
+    def test_create_movies_when_body_is_not_a_list(self):
+        set_auth_token(self.client, EXECUTIVE_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': '_schema',
+                'reason': 'Invalid input type.'
+            }]
+        }
+
+        response = self.client.post('/movies/batch', json={'title': 'Heat'})
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import json
+from uuid import uuid4
+from datetime import date, datetime
+from unittest import TestCase, main
+from unittest.mock import patch
+from flask import jsonify
+from flask.json import JSONEncoder
+
+import encoders
+from app import create_app
+from encoders import FastJSONEncoder
+from util import get_database_url
+
+
+class FastJSONEncoderTestCase(TestCase):
+    def setUp(self):
+        self.app = create_app(get_database_url('casting_test'))
+        self.payload = {
+            'success': True,
+            'data': [{
+                'id': 1,
+                'title': 'Léon',
+                'release_date': datetime(1994, 9, 14),
+                'premiere': date(1994, 9, 14),
+                'uuid': uuid4()
+            }]
+        }
+
+    def encode(self, encoder, **kwargs):
+        options = {'ensure_ascii': False, 'sort_keys': False}
+        options.update(kwargs)
+        return encoder(**options).encode(self.payload)
+
+    def test_app_uses_fast_encoder(self):
+        self.assertIs(self.app.json_encoder, FastJSONEncoder)
+
+        with patch.dict(os.environ, {'FAST_JSON': '0'}):
+            app = create_app(get_database_url('casting_test'))
+        self.assertIsNot(app.json_encoder, FastJSONEncoder)
+
+    def test_encoding_matches_flask_encoder(self):
+        for options in [{}, {'sort_keys': True}, {'indent': 2}]:
+            expected = self.encode(JSONEncoder, **options)
+            encoded = self.encode(FastJSONEncoder, **options)
+            self.assertEqual(json.loads(encoded), json.loads(expected))
+
+        self.payload = {1: 'one'}
+        self.assertEqual(self.encode(FastJSONEncoder), '{"1":"one"}')
+
+    def test_key_order_is_kept_unless_sorted(self):
+        self.payload = {'b': 1, 'a': 2}
+
+        self.assertEqual(self.encode(FastJSONEncoder), '{"b":1,"a":2}')
+        self.assertEqual(
+            self.encode(FastJSONEncoder, sort_keys=True),
+            '{"a":2,"b":1}'
+        )
+
+    def test_standard_library_is_used_as_fallback(self):
+        expected = self.encode(JSONEncoder)
+        with patch.object(encoders, 'orjson', None):
+            self.assertEqual(self.encode(FastJSONEncoder), expected)
+
+        self.assertEqual(
+            self.encode(FastJSONEncoder, ensure_ascii=True),
+            self.encode(JSONEncoder, ensure_ascii=True)
+        )
+
+        self.payload = {'id': 2 ** 70}
+        self.assertEqual(
+            self.encode(FastJSONEncoder),
+            self.encode(JSONEncoder)
+        )
+
+    def test_jsonify_uses_fast_encoder(self):
+        with self.app.test_request_context():
+            with patch.object(
+                FastJSONEncoder,
+                'can_use_orjson',
+                autospec=True,
+                return_value=True
+            ) as can_use_orjson:
+                response = jsonify({'b': 1, 'a': 2})
+
+        self.assertTrue(can_use_orjson.called)
+        self.assertEqual(response.get_data(as_text=True), '{"b":1,"a":2}\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from threading import Thread
+from unittest import TestCase, main
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from models.database import (
+    InstrumentedQueuePool,
+    pool_checked_out,
+    pool_checkout_seconds,
+    pool_checkout_timeouts
+)
+from util import get_engine_options
+
+
+class EngineOptionsTestCase(TestCase):
+    def test_options_are_read_from_environment(self):
+        environment = {
+            'DB_POOL_SIZE': '20',
+            'DB_MAX_OVERFLOW': '0',
+            'DB_POOL_TIMEOUT': '2.5',
+            'DB_POOL_RECYCLE': '600',
+            'DB_POOL_PRE_PING': '0',
+            'DB_STATEMENT_TIMEOUT': '5000'
+        }
+        with patch.dict(os.environ, environment):
+            options = get_engine_options('postgresql://user@host/casting')
+
+        self.assertEqual(options, {
+            'poolclass': InstrumentedQueuePool,
+            'pool_logging_name': 'primary',
+            'pool_size': 20,
+            'max_overflow': 0,
+            'pool_timeout': 2.5,
+            'pool_recycle': 600,
+            'pool_pre_ping': False,
+            'connect_args': {'options': '-c statement_timeout=5000'}
+        })
+
+    def test_default_options(self):
+        with patch.dict(os.environ, {}, clear=True):
+            options = get_engine_options('postgres://user@host/casting')
+
+        self.assertEqual(options['pool_size'], 5)
+        self.assertEqual(options['max_overflow'], 10)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertNotIn('connect_args', options)
+
+    def test_sqlite_keeps_default_pool(self):
+        self.assertEqual(get_engine_options('sqlite:///casting.db'), {})
+
+
+class InstrumentedQueuePoolTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f'sqlite:///{self.directory.name}/pool.db',
+            poolclass=InstrumentedQueuePool,
+            pool_logging_name='test',
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+            connect_args={'check_same_thread': False}
+        )
+        pool_checkout_timeouts.clear()
+        pool_checkout_seconds.clear()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_checkouts_are_measured(self):
+        with self.engine.connect() as connection:
+            connection.execute('SELECT 1')
+            self.assertEqual(pool_checked_out.get(pool='test'), 1)
+
+        self.assertEqual(pool_checked_out.get(pool='test'), 0)
+        self.assertEqual(pool_checkout_seconds.get(pool='test')['count'], 1)
+
+    def test_saturated_pool_times_out(self):
+        errors = []
+
+        def connect():
+            try:
+                self.engine.connect().close()
+            except PoolTimeoutError as error:
+                errors.append(error)
+
+        with self.engine.connect():
+            thread = Thread(target=connect)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(pool_checkout_timeouts.get(pool='test'), 1)
+
+        histogram = pool_checkout_seconds.get(pool='test')
+        self.assertEqual(histogram['count'], 2)
+        self.assertGreaterEqual(histogram['sum'], 0.05)
+
+
+if __name__ == '__main__':
+    main()
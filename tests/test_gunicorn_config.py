@@ -0,0 +1,91 @@
+import os
+import sys
+import runpy
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+from sqlalchemy.engine import Engine
+
+
+def load_config(environment):
+    with patch.dict(os.environ, environment):
+        os.environ.pop('DB_POOL_SIZE', None)
+        os.environ.pop('METRICS_DIRECTORY', None)
+        config = runpy.run_path('gunicorn.conf.py')
+        pool_size = os.getenv('DB_POOL_SIZE')
+    config['on_exit'](None)
+    return config, pool_size
+
+
+class GunicornConfigTestCase(TestCase):
+    def test_sync_workers_are_sized_from_cpus(self):
+        config, pool_size = load_config({})
+        cpus = config['cpus']
+
+        self.assertEqual(config['worker_class'], 'sync')
+        self.assertEqual(config['workers'], cpus * 2 + 1)
+        self.assertEqual(config['threads'], 1)
+        self.assertTrue(config['preload_app'])
+        self.assertIsNone(pool_size)
+
+    def test_gthread_workers_size_the_pool_from_threads(self):
+        config, pool_size = load_config({
+            'GUNICORN_WORKER_CLASS': 'gthread',
+            'GUNICORN_THREADS': '8'
+        })
+
+        self.assertEqual(config['workers'], config['cpus'] + 1)
+        self.assertEqual(config['threads'], 8)
+        self.assertEqual(pool_size, '8')
+
+    def test_settings_are_read_from_environment(self):
+        config, _ = load_config({
+            'PORT': '5000',
+            'WEB_CONCURRENCY': '3',
+            'GUNICORN_KEEPALIVE': '10',
+            'GUNICORN_MAX_REQUESTS': '0',
+            'GUNICORN_PRELOAD': '0'
+        })
+
+        self.assertEqual(config['bind'], '0.0.0.0:5000')
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(config['keepalive'], 10)
+        self.assertEqual(config['max_requests'], 0)
+        self.assertFalse(config['preload_app'])
+
+    def test_post_fork_disposes_engines(self):
+        config, _ = load_config({})
+
+        with patch.object(Engine, 'dispose') as dispose:
+            config['post_fork'](None, None)
+        dispose.assert_called_once_with()
+
+    def test_gevent_workers_need_their_packages(self):
+        environment = {'GUNICORN_WORKER_CLASS': 'gevent'}
+        missing = {'gevent': None, 'psycogreen.gevent': None}
+
+        with tempfile.TemporaryDirectory() as directory:
+            environment['METRICS_DIRECTORY'] = directory
+            with patch.dict(os.environ, environment), \
+                    patch.dict(sys.modules, missing):
+                with self.assertRaisesRegex(RuntimeError, 'psycogreen'):
+                    runpy.run_path('gunicorn.conf.py')
+
+    def test_metrics_directory_is_shared_by_workers(self):
+        with patch.dict(os.environ, {}):
+            os.environ.pop('METRICS_DIRECTORY', None)
+            config = runpy.run_path('gunicorn.conf.py')
+            directory = os.environ['METRICS_DIRECTORY']
+
+            self.assertTrue(os.path.isdir(directory))
+            self.assertEqual(
+                config['temporary_metrics_directory'],
+                directory
+            )
+
+        config['on_exit'](None)
+        self.assertFalse(os.path.exists(directory))
+
+
+if __name__ == '__main__':
+    main()
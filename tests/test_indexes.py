@@ -0,0 +1,132 @@
+import re
+from datetime import datetime
+from unittest import TestCase, main
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie, actor_movie_relation
+from routes.casting import filter_actors, filter_movies
+from util import get_database_url
+
+
+class IndexesTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.context = self.app.app_context()
+        self.context.push()
+
+        self.db = db
+        self.db.drop_all()
+        self.db.create_all()
+
+        if self.db.engine.dialect.name == 'postgresql':
+            self.db.session.execute('SET enable_seqscan = off')
+        else:
+            self.db.session.execute('PRAGMA case_sensitive_like = ON')
+
+    def tearDown(self):
+        self.db.session.rollback()
+        self.db.drop_all()
+        self.context.pop()
+
+    def explain(self, query):
+        # The statement is explained with bound parameters, as the routes
+        # execute it, because literal values can be planned differently.
+        compiled = query.statement.compile(dialect=self.db.engine.dialect)
+        parameters = compiled.params
+        if compiled.positional:
+            parameters = tuple(
+                parameters[name]
+                for name in compiled.positiontup
+            )
+        connection = self.db.session.connection()
+
+        if self.db.engine.dialect.name == 'postgresql':
+            rows = connection.execute(f'EXPLAIN {compiled}', parameters)
+            return '\n'.join(row[0] for row in rows)
+
+        rows = connection.execute(
+            f'EXPLAIN QUERY PLAN {compiled}',
+            parameters
+        )
+        return '\n'.join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, query, index, sqlite_index=None):
+        if sqlite_index and self.db.engine.dialect.name == 'sqlite':
+            index = sqlite_index
+
+        plan = self.explain(query)
+        self.assertRegex(plan, rf'\b{re.escape(index)}\b', plan)
+
+    def test_movie_castings_use_reverse_index(self):
+        query = self.db.session.\
+            query(actor_movie_relation.c.actor_id).\
+            filter(actor_movie_relation.c.movie_id == 1)
+
+        self.assertUsesIndex(query, 'ix_actor_movie_movie_id')
+
+    def test_actors_sorted_by_name_use_index(self):
+        query = Actor.query.\
+            order_by(Actor.name, Actor.id).\
+            limit(10)
+
+        # SQLite ignores the operator class, so the pattern index is a
+        # narrower index on the name, which the rowid orders by id.
+        self.assertUsesIndex(
+            query,
+            'ix_actor_name',
+            sqlite_index='ix_actor_name_pattern'
+        )
+
+    def test_actors_filtered_by_name_prefix_use_index(self):
+        query = filter_actors(Actor.query, {'name_prefix': 'Al_%'})
+
+        self.assertUsesIndex(query, 'ix_actor_name_pattern')
+
+    def test_movies_sorted_by_title_use_index(self):
+        query = Movie.query.\
+            order_by(Movie.title, Movie.id).\
+            limit(10)
+
+        self.assertUsesIndex(
+            query,
+            'ix_movie_title',
+            sqlite_index='ix_movie_title_pattern'
+        )
+
+    def test_movies_filtered_by_title_prefix_use_index(self):
+        query = filter_movies(Movie.query, {'title_prefix': 'Th'})
+
+        self.assertUsesIndex(query, 'ix_movie_title_pattern')
+
+    def test_movies_filtered_by_release_date_use_index(self):
+        query = filter_movies(Movie.query, {
+            'min_release_date': datetime(2020, 1, 1),
+            'max_release_date': datetime(2021, 1, 1)
+        })
+
+        self.assertUsesIndex(query, 'ix_movie_release_date')
+
+    def test_prefix_wildcards_are_escaped(self):
+        for name in ['Al_ice', 'Al%', 'Alice', 'A/l']:
+            self.db.session.add(Actor(name=name, age=30, gender='female'))
+        self.db.session.flush()
+
+        for prefix, expected in [
+            ('Al_', ['Al_ice']),
+            ('Al%', ['Al%']),
+            ('A/', ['A/l'])
+        ]:
+            names = [
+                actor.name
+                for actor in filter_actors(
+                    Actor.query,
+                    {'name_prefix': prefix}
+                )
+            ]
+            self.assertEqual(names, expected)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from app import create_app
+from models.database import db
+from models.casting import Actor
+from metrics import get_process_path, registry, write_json
+from instrumentation import (
+    request_duration,
+    request_statements,
+    request_auth_seconds,
+    request_serialization_seconds
+)
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+            Actor(**mock_data['actor_a']).insert()
+
+        registry.clear()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def test_request_is_recorded(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 200)
+
+        endpoint = 'casting.retrieve_actors'
+        duration = request_duration.get(
+            endpoint=endpoint,
+            method='GET',
+            status=200
+        )
+        self.assertEqual(duration['count'], 1)
+
+        statements = request_statements.get(endpoint=endpoint)
+        self.assertEqual(statements['count'], 1)
+        self.assertEqual(statements['sum'], 3)
+
+        auth = request_auth_seconds.get(endpoint=endpoint)
+        self.assertEqual(auth['count'], 1)
+        serialization = request_serialization_seconds.get(endpoint=endpoint)
+        self.assertEqual(serialization['count'], 1)
+
+    def test_response_has_server_timing(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get('/actors')
+        self.assertRegex(
+            response.headers['Server-Timing'],
+            r'^auth;dur=[\d.]+, '
+            r'db;dur=[\d.]+;desc="3 statements", '
+            r'serialize;dur=[\d.]+, '
+            r'total;dur=[\d.]+$'
+        )
+
+    def test_failed_request_is_recorded(self):
+        response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 401)
+
+        duration = request_duration.get(
+            endpoint='casting.retrieve_actors',
+            method='GET',
+            status=401
+        )
+        self.assertEqual(duration['count'], 1)
+
+        response = self.client.get('/unknown')
+        self.assertEqual(response.status_code, 404)
+
+        duration = request_duration.get(
+            endpoint='unmatched',
+            method='GET',
+            status=404
+        )
+        self.assertEqual(duration['count'], 1)
+
+    def test_unhandled_error_is_logged(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        list_actors = patch(
+            'routes.casting.list_actors',
+            side_effect=RuntimeError('broken')
+        )
+        with list_actors, self.assertLogs('errors', 'ERROR') as logs:
+            response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 500)
+
+        self.assertIn('Exception on GET /actors', logs.output[0])
+        self.assertIn('RuntimeError: broken', logs.output[0])
+
+    def test_metrics_endpoint(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.client.get('/actors')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8'
+        )
+
+        text = response.get_data(as_text=True)
+        self.assertIn(
+            '# TYPE http_request_duration_seconds histogram',
+            text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{endpoint="casting.retrieve_actors",method="GET",status="200"} 1',
+            text
+        )
+        self.assertIn(
+            'http_request_db_statements_bucket'
+            '{endpoint="casting.retrieve_actors",le="3"} 1',
+            text
+        )
+
+    def test_metrics_endpoint_merges_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            environment = {'METRICS_DIRECTORY': directory}
+            with patch.dict(os.environ, environment):
+                app = create_app(get_database_url(self.db_name))
+            client = app.test_client()
+
+            set_auth_token(client, ASSISTANT_TOKEN)
+            client.get('/actors')
+            write_json(get_process_path(directory, 1), registry.snapshot())
+
+            response = client.get('/metrics')
+            app.extensions['metrics_directory'].stop()
+            self.assertIn(
+                'http_request_duration_seconds_count'
+                '{endpoint="casting.retrieve_actors",method="GET",'
+                'status="200"} 2',
+                response.get_data(as_text=True)
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest import TestCase, main
+from werkzeug.exceptions import ServiceUnavailable
+
+from auth import JWKSCache
+from util import create_signing_key
+
+
+public_jwks = {
+    kid: create_signing_key(kid)[1]
+    for kid in ['key-a', 'key-b', 'key-file']
+}
+
+
+def create_jwks(*kids):
+    return {
+        'keys': [public_jwks[kid] for kid in kids]
+    }
+
+
+def get_modulus(key):
+    return key.to_dict()['n']
+
+
+class StubIdentityProvider(HTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubJWKSHandler)
+        self.jwks = create_jwks('key-a')
+        self.available = True
+        self.delay = 0
+        self.requests = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'http://{host}:{port}/.well-known/jwks.json'
+
+
+class StubJWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+
+        if not self.server.available:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps(self.server.jwks).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class JWKSCacheTestCase(TestCase):
+    def setUp(self):
+        self.server = StubIdentityProvider()
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keys_are_fetched_once_within_ttl(self):
+        cache = JWKSCache(self.server.url, ttl=60, refresh_margin=0)
+
+        for _ in range(20):
+            key = cache.get_key('key-a')
+
+        self.assertEqual(get_modulus(key), public_jwks['key-a']['n'])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_unknown_kid_refetches_once(self):
+        cache = JWKSCache(
+            self.server.url,
+            ttl=60,
+            refresh_margin=0,
+            min_refetch_interval=0
+        )
+        cache.get_keys()
+
+        self.server.jwks = create_jwks('key-a', 'key-b')
+        key = cache.get_key('key-b')
+
+        self.assertEqual(get_modulus(key), public_jwks['key-b']['n'])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unknown_kid_refetch_is_throttled(self):
+        cache = JWKSCache(
+            self.server.url,
+            ttl=60,
+            refresh_margin=0,
+            min_refetch_interval=60
+        )
+        cache.get_keys()
+
+        for _ in range(10):
+            self.assertIsNone(cache.get_key('key-unknown'))
+
+        self.assertEqual(self.server.requests, 1)
+
+    def test_concurrent_kid_misses_share_one_fetch(self):
+        cache = JWKSCache(
+            self.server.url,
+            ttl=60,
+            refresh_margin=0,
+            min_refetch_interval=0
+        )
+        cache.get_keys()
+
+        self.server.jwks = create_jwks('key-a', 'key-b')
+        self.server.delay = 0.2
+        results = []
+
+        def lookup():
+            results.append(cache.get_key('key-b'))
+
+        threads = [threading.Thread(target=lookup) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(
+            get_modulus(key) == public_jwks['key-b']['n']
+            for key in results
+        ))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_keys_are_refreshed_in_background_before_expiring(self):
+        cache = JWKSCache(self.server.url, ttl=0.5, refresh_margin=0.4)
+        cache.get_keys()
+
+        self.server.jwks = create_jwks('key-b')
+        time.sleep(0.15)
+        keys = cache.get_keys()
+        self.assertIn('key-a', keys)
+
+        for _ in range(50):
+            if 'key-b' in cache.get_keys():
+                break
+            time.sleep(0.01)
+
+        self.assertIn('key-b', cache.get_keys())
+        self.assertEqual(self.server.requests, 2)
+
+    def test_stale_keys_are_served_when_provider_is_unavailable(self):
+        cache = JWKSCache(
+            self.server.url,
+            ttl=0.1,
+            refresh_margin=0,
+            min_refetch_interval=0
+        )
+        cache.get_keys()
+
+        self.server.available = False
+        time.sleep(0.15)
+        key = cache.get_key('key-a')
+
+        self.assertEqual(get_modulus(key), public_jwks['key-a']['n'])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unavailable_provider_without_cached_keys(self):
+        self.server.available = False
+        cache = JWKSCache(self.server.url)
+
+        with self.assertRaises(ServiceUnavailable):
+            cache.get_keys()
+
+    def test_keys_are_parsed_once_and_indexed_by_kid(self):
+        self.server.jwks = create_jwks('key-a', 'key-b')
+        cache = JWKSCache(self.server.url)
+
+        keys = cache.get_keys()
+        self.assertEqual(set(keys), {'key-a', 'key-b'})
+        self.assertIs(cache.get_key('key-b'), keys['key-b'])
+        self.assertIs(cache.get_key('key-b'), cache.get_key('key-b'))
+
+    def test_keys_without_kid_or_for_encryption_are_skipped(self):
+        encryption_key = dict(public_jwks['key-b'], use='enc')
+        anonymous_key = dict(public_jwks['key-file'])
+        del anonymous_key['kid']
+        self.server.jwks = {
+            'keys': [public_jwks['key-a'], encryption_key, anonymous_key]
+        }
+        cache = JWKSCache(self.server.url)
+
+        self.assertEqual(set(cache.get_keys()), {'key-a'})
+
+    def test_keys_can_be_loaded_from_a_local_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(create_jwks('key-file'), file)
+            file.flush()
+
+            cache = JWKSCache(Path(file.name).as_uri())
+            key = cache.get_key('key-file')
+
+        self.assertEqual(get_modulus(key), public_jwks['key-file']['n'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase, main
+
+from metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    MetricsDirectory,
+    get_archive_path,
+    get_process_path,
+    mark_process_dead,
+    read_json,
+    write_json
+)
+
+
+class MetricsTestCase(TestCase):
+    def test_counter_is_incremented_per_label(self):
+        counter = Counter('requests_total', 'Requests.', labels=['method'])
+        counter.inc(method='GET')
+        counter.inc(2, method='GET')
+        counter.inc(method='POST')
+
+        self.assertEqual(counter.get(method='GET'), 3)
+        self.assertEqual(counter.get(method='POST'), 1)
+        self.assertEqual(counter.get(method='PATCH'), 0)
+
+    def test_gauge_is_set(self):
+        gauge = Gauge('connections', 'Connections.')
+        gauge.set(4)
+        gauge.dec()
+
+        self.assertEqual(gauge.get(), 3)
+
+    def test_histogram_counts_buckets(self):
+        histogram = Histogram('latency', 'Latency.', buckets=[0.1, 1])
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        self.assertEqual(histogram.get(), {
+            'buckets': [2, 1, 1],
+            'sum': 5.65,
+            'count': 4
+        })
+
+    def test_labels_must_match(self):
+        counter = Counter('requests_total', 'Requests.', labels=['method'])
+
+        with self.assertRaises(ValueError):
+            counter.inc(status=200)
+
+    def test_registry_returns_registered_metric(self):
+        registry = Registry()
+        counter = registry.counter('requests_total', 'Requests.')
+
+        self.assertIs(registry.counter('requests_total', 'Requests.'), counter)
+        with self.assertRaises(ValueError):
+            registry.gauge('requests_total', 'Requests.')
+
+        counter.inc()
+        registry.clear()
+        self.assertEqual(counter.get(), 0)
+
+    def test_registry_renders_text_format(self):
+        registry = Registry()
+        counter = registry.counter(
+            'requests_total',
+            'Requests.',
+            labels=['path']
+        )
+        counter.inc(path='/actors')
+        counter.inc(path='/say "hi"\\')
+        registry.gauge('connections', 'Connections.').set(3)
+
+        self.assertEqual(registry.render(), (
+            '# HELP connections Connections.\n'
+            '# TYPE connections gauge\n'
+            'connections 3\n'
+            '# HELP requests_total Requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{path="/actors"} 1\n'
+            'requests_total{path="/say \\"hi\\"\\\\"} 1\n'
+        ))
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram(
+            'latency',
+            'Latency.',
+            labels=['endpoint'],
+            buckets=[0.1, 1]
+        )
+        histogram.observe(0.05, endpoint='health')
+        histogram.observe(0.5, endpoint='health')
+        histogram.observe(5, endpoint='health')
+
+        self.assertEqual(histogram.render(), [
+            '# HELP latency Latency.',
+            '# TYPE latency histogram',
+            'latency_bucket{endpoint="health",le="0.1"} 1',
+            'latency_bucket{endpoint="health",le="1"} 2',
+            'latency_bucket{endpoint="health",le="+Inf"} 3',
+            'latency_sum{endpoint="health"} 5.55',
+            'latency_count{endpoint="health"} 3'
+        ])
+
+
+class MetricsDirectoryTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_registry(self):
+        registry = Registry()
+        registry.counter('requests_total', 'Requests.', labels=['method'])
+        registry.gauge('connections', 'Connections.')
+        registry.histogram('latency', 'Latency.', buckets=[0.1, 1])
+        return registry
+
+    def record(self, registry, requests, latency):
+        registry.metrics['requests_total'].inc(requests, method='GET')
+        registry.metrics['connections'].set(2)
+        registry.metrics['latency'].observe(latency)
+
+    def write_worker(self, pid, requests, latency):
+        registry = self.create_registry()
+        self.record(registry, requests, latency)
+        write_json(
+            get_process_path(self.directory.name, pid),
+            registry.snapshot()
+        )
+
+    def test_samples_of_every_worker_are_merged(self):
+        registry = self.create_registry()
+        self.record(registry, 1, 0.05)
+        self.write_worker(1, 2, 0.5)
+
+        samples = MetricsDirectory(self.directory.name, registry).collect()
+        text = registry.render(samples)
+
+        self.assertIn('requests_total{method="GET"} 3\n', text)
+        self.assertIn('connections 4\n', text)
+        self.assertIn('latency_bucket{le="0.1"} 1\n', text)
+        self.assertIn('latency_bucket{le="1"} 2\n', text)
+        self.assertIn('latency_count 2\n', text)
+
+    def test_exited_workers_keep_counters_and_drop_gauges(self):
+        registry = self.create_registry()
+        self.write_worker(1, 2, 0.5)
+        self.write_worker(2, 3, 5)
+
+        mark_process_dead(self.directory.name, 1)
+        mark_process_dead(self.directory.name, 2)
+        mark_process_dead(self.directory.name, 3)
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)),
+            ['metrics-archive.json', 'metrics.lock']
+        )
+        archive = read_json(get_archive_path(self.directory.name))
+        self.assertNotIn('connections', archive)
+        self.assertEqual(
+            archive['requests_total']['samples'],
+            [[['GET'], 5]]
+        )
+
+        samples = MetricsDirectory(self.directory.name, registry).collect()
+        text = registry.render(samples)
+
+        self.assertIn('requests_total{method="GET"} 5\n', text)
+        self.assertIn('latency_bucket{le="+Inf"} 2\n', text)
+        self.assertNotIn('connections 2', text)
+
+    def test_concurrent_collects_read_whole_snapshots(self):
+        registry = self.create_registry()
+        self.record(registry, 1, 0.05)
+        metrics_directory = MetricsDirectory(self.directory.name, registry)
+        errors = []
+
+        def scrape():
+            try:
+                for _ in range(50):
+                    samples = metrics_directory.collect()
+                    self.assertEqual(
+                        samples['requests_total'],
+                        [(('GET',), 1)]
+                    )
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=scrape) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)),
+            [f'metrics-{os.getpid()}.json', 'metrics.lock']
+        )
+
+    def test_unreadable_snapshots_are_skipped(self):
+        registry = self.create_registry()
+        self.record(registry, 1, 0.05)
+        with open(get_process_path(self.directory.name, 1), 'w') as file:
+            file.write('{"requests_total": ')
+
+        with self.assertLogs('metrics', 'WARNING') as logs:
+            samples = MetricsDirectory(
+                self.directory.name,
+                registry
+            ).collect()
+
+        self.assertIn('metrics-1.json', logs.output[0])
+        self.assertEqual(samples['requests_total'], [(('GET',), 1)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import json
+import time
+import cProfile
+import pstats
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase, main
+
+import auth
+from app import create_app
+from auth import JWKSCache, TokenCache
+from models.database import db
+from profiler import BackgroundProfiler, StackSampler, collapse_stats
+from util import (
+    get_database_url,
+    set_auth_token,
+    create_signing_key,
+    create_token
+)
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def outer():
+    inner()
+    spin(0.01)
+
+
+def inner():
+    spin(0.02)
+
+
+class CollapsedStacksTestCase(TestCase):
+    def test_cprofile_stats_are_collapsed(self):
+        profile = cProfile.Profile()
+        profile.runcall(outer)
+
+        stacks = {}
+        for line in collapse_stats(pstats.Stats(profile).stats).splitlines():
+            stack, count = line.rsplit(' ', 1)
+            stacks[stack.split(';')[-1]] = (stack, int(count))
+
+        stack, _ = stacks['tests/test_profiler.py:inner']
+        self.assertTrue(stack.startswith('tests/test_profiler.py:outer;'))
+
+        stack, count = stacks['tests/test_profiler.py:spin']
+        self.assertIn('tests/test_profiler.py:outer;', stack)
+        self.assertGreater(count, 0)
+
+    def test_sampler_collects_stacks_of_thread(self):
+        thread = threading.Thread(target=outer)
+        thread.start()
+        sampler = StackSampler(interval=0.001, thread_id=thread.ident)
+        sampler.start()
+        thread.join()
+        sampler.stop()
+
+        collapsed = sampler.collapsed()
+        self.assertIn('tests/test_profiler.py:outer;', collapsed)
+        self.assertNotIn('profiler.py:run', collapsed)
+
+    def test_background_profiler_writes_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = BackgroundProfiler(
+                directory,
+                interval=0.001,
+                flush_interval=0.01
+            )
+            profiler.start()
+            outer()
+            profiler.stop()
+
+            paths = list(Path(directory).iterdir())
+            self.assertEqual(len(paths), 1)
+            self.assertIn(
+                'tests/test_profiler.py:outer;',
+                paths[0].read_text()
+            )
+
+
+class ProfileRequestTestCase(TestCase):
+    def setUp(self):
+        self.private_key, public_jwk = create_signing_key('key-a')
+        self.jwks_file = tempfile.NamedTemporaryFile('w', suffix='.json')
+        json.dump({'keys': [public_jwk]}, self.jwks_file)
+        self.jwks_file.flush()
+
+        self.jwks_cache = auth.jwks_cache
+        self.token_cache = auth.token_cache
+        auth.jwks_cache = JWKSCache(Path(self.jwks_file.name).as_uri())
+        auth.token_cache = TokenCache()
+
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.app.config['PROFILING_ENABLED'] = True
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+        auth.jwks_cache = self.jwks_cache
+        auth.token_cache = self.token_cache
+        self.jwks_file.close()
+
+    def set_permissions(self, permissions):
+        token = create_token(self.private_key, 'key-a', permissions)
+        set_auth_token(self.client, token)
+
+    def test_request_is_profiled_with_cprofile(self):
+        self.set_permissions(['get:movies', 'profile:requests'])
+
+        response = self.client.get(
+            '/movies',
+            headers={'X-Profile': 'cprofile'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers['Content-Type'],
+            'text/plain; charset=utf-8'
+        )
+        self.assertEqual(response.headers['X-Profiled-Status'], '200')
+
+        collapsed = response.get_data(as_text=True)
+        self.assertIn('auth.py:decode_token', collapsed)
+        self.assertIn('routes/casting.py:list_movies', collapsed)
+
+    def test_request_is_profiled_with_sampler(self):
+        self.set_permissions(['get:movies', 'profile:requests'])
+
+        response = self.client.get('/movies', headers={'X-Profile': 'sample'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Profiled-Status'], '200')
+
+    def test_profiling_requires_permission(self):
+        self.set_permissions(['get:movies'])
+
+        response = self.client.get(
+            '/movies',
+            headers={'X-Profile': 'cprofile'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_profiling_requires_valid_mode(self):
+        self.set_permissions(['get:movies', 'profile:requests'])
+
+        response = self.client.get('/movies', headers={'X-Profile': 'trace'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {
+            'success': False,
+            'description': (
+                'The X-Profile header must be one of cprofile, sample.'
+            )
+        })
+
+    def test_profiling_is_disabled_by_config(self):
+        self.app.config['PROFILING_ENABLED'] = False
+        self.set_permissions(['get:movies', 'profile:requests'])
+
+        response = self.client.get(
+            '/movies',
+            headers={'X-Profile': 'cprofile'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['success'], True)
+        self.assertNotIn('X-Profiled-Status', response.headers)
+
+
+if __name__ == '__main__':
+    main()
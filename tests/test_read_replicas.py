@@ -0,0 +1,218 @@
+import os
+import time
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from replicas import ReplicaRouter, SharedStickyStore
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+
+
+class FakeRedis:
+    def __init__(self):
+        self.expires_at = {}
+
+    def set(self, key, value, px=None):
+        self.expires_at[key] = time.monotonic() + px / 1000
+
+    def exists(self, key):
+        return int(self.expires_at.get(key, 0) > time.monotonic())
+
+
+class ReadReplicaTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.replica_dir = tempfile.TemporaryDirectory()
+        replica_url = f'sqlite:///{self.replica_dir.name}/replica.db'
+
+        environment = {'DATABASE_REPLICA_URLS': replica_url}
+        with patch.dict(os.environ, environment):
+            self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+        self.router = self.app.extensions['replica_router']
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+            self.replica = self.db.get_engine(self.app, bind='replica_0')
+            self.db.Model.metadata.create_all(bind=self.replica)
+
+            Actor(**mock_data['actor_a']).insert()
+            Movie(**mock_data['movie_a']).insert()
+
+        self.replica.execute(
+            Actor.__table__.insert(),
+            mock_data['actors_b']
+        )
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+            self.replica.dispose()
+        self.replica_dir.cleanup()
+
+    def retrieve_names(self):
+        response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 200)
+        return [actor['name'] for actor in response.get_json()['data']]
+
+    def test_retrieve_actors_reads_from_replica(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        names = self.retrieve_names()
+        self.assertEqual(names, ['Robert Duvall', 'Diane Keaton'])
+
+        response = self.client.get('/actors/2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json()['data'][0]['name'],
+            'Diane Keaton'
+        )
+
+    def test_retrieve_movies_reads_from_replica(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get('/movies')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data'], [])
+
+    def test_writes_go_to_primary(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        response = self.client.post('/actors', json=mock_data['actor_b'])
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 2)
+        count = self.replica.execute('SELECT count(*) FROM actor').scalar()
+        self.assertEqual(count, 2)
+
+    def test_reads_stick_to_primary_after_write(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        response = self.client.post('/actors', json=mock_data['actor_b'])
+        self.assertEqual(response.status_code, 200)
+
+        names = self.retrieve_names()
+        self.assertEqual(names, ['Tom Hanks', 'Al Pacino'])
+
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        names = self.retrieve_names()
+        self.assertEqual(names, ['Robert Duvall', 'Diane Keaton'])
+
+    def test_reads_return_to_replica_after_sticky_window(self):
+        self.router.sticky_seconds = 0
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        response = self.client.post('/actors', json=mock_data['actor_b'])
+        self.assertEqual(response.status_code, 200)
+
+        names = self.retrieve_names()
+        self.assertEqual(names, ['Robert Duvall', 'Diane Keaton'])
+
+    def test_reads_fall_back_to_primary_when_replica_fails(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.replica.execute('DROP TABLE actor')
+
+        with self.assertLogs('replicas', level='WARNING'):
+            names = self.retrieve_names()
+        self.assertEqual(names, ['Tom Hanks'])
+        self.assertEqual(self.router.healthy_replicas(), [])
+
+        names = self.retrieve_names()
+        self.assertEqual(names, ['Tom Hanks'])
+
+    def test_streamed_reads_use_primary(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.replica.execute('DROP TABLE actor')
+
+        response = self.client.get('/actors', query_string={'stream': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [actor['name'] for actor in response.get_json()['data']],
+            ['Tom Hanks']
+        )
+        self.assertEqual(self.router.healthy_replicas(), ['replica_0'])
+
+
+class ReplicaRouterTestCase(TestCase):
+    def test_choose_without_replicas(self):
+        router = ReplicaRouter([])
+        self.assertIsNone(router.choose('director'))
+
+    def test_choose_skips_unhealthy_replicas(self):
+        router = ReplicaRouter(['replica_0', 'replica_1'])
+        router.mark_unhealthy('replica_0')
+        self.assertEqual(router.choose('director'), 'replica_1')
+
+        router.mark_unhealthy('replica_1')
+        self.assertIsNone(router.choose('director'))
+
+    def test_unhealthy_replicas_are_retried(self):
+        router = ReplicaRouter(['replica_0'], retry_seconds=0)
+        router.mark_unhealthy('replica_0')
+        self.assertEqual(router.choose('director'), 'replica_0')
+
+    def test_sticky_clients_are_pruned(self):
+        router = ReplicaRouter(['replica_0'], max_clients=2)
+        router.sticky_seconds = 0.001
+        router.mark_write('assistant')
+        router.mark_write('director')
+
+        router.sticky_seconds = 5
+        with patch('time.monotonic', return_value=10 ** 9):
+            router.mark_write('executive')
+            self.assertEqual(
+                list(router.sticky_store._sticky_until),
+                ['executive']
+            )
+            self.assertIsNone(router.choose('executive'))
+            self.assertEqual(router.choose('director'), 'replica_0')
+
+    def test_sticky_writes_are_shared_between_workers(self):
+        redis_client = FakeRedis()
+        writer = ReplicaRouter(
+            ['replica_0'],
+            sticky_store=SharedStickyStore(redis_client)
+        )
+        reader = ReplicaRouter(
+            ['replica_0'],
+            sticky_store=SharedStickyStore(redis_client)
+        )
+
+        writer.mark_write('director')
+        self.assertIsNone(reader.choose('director'))
+        self.assertEqual(reader.choose('assistant'), 'replica_0')
+
+        reader.sticky_seconds = 0.001
+        reader.mark_write('assistant')
+        time.sleep(0.002)
+        self.assertEqual(writer.choose('assistant'), 'replica_0')
+
+    def test_reads_use_primary_when_sticky_store_fails(self):
+        redis_client = FakeRedis()
+        redis_client.exists = Mock(side_effect=ConnectionError)
+        router = ReplicaRouter(
+            ['replica_0'],
+            sticky_store=SharedStickyStore(redis_client)
+        )
+
+        with self.assertLogs('replicas', level='WARNING'):
+            self.assertIsNone(router.choose('director'))
+
+
+if __name__ == '__main__':
+    main()
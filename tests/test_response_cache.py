@@ -0,0 +1,192 @@
+import os
+from unittest import TestCase, main
+
+from app import create_app
+from cache import LRUBackend, ResponseCache, SharedBackend
+from models.database import db
+from models.casting import Actor, Movie
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        if type(value) is not bytes:
+            value = str(value).encode()
+        self.values[key] = value
+        return True
+
+    def incr(self, key):
+        value = int(self.values.get(key, 0)) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+        self.response_cache = self.app.extensions['response_cache']
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+            Actor(**mock_data['actor_a']).insert()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def get(self, path, **kwargs):
+        with count_queries(self.app) as statements:
+            response = self.client.get(path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, statements
+
+    def test_response_is_cached(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response, statements = self.get('/actors')
+        self.assertEqual(len(statements), 3)
+
+        cached_response, statements = self.get('/actors')
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(cached_response.get_json(), response.get_json())
+        self.assertEqual(
+            cached_response.headers['ETag'],
+            response.headers['ETag']
+        )
+        self.assertEqual(
+            cached_response.headers['Content-Type'],
+            'application/json'
+        )
+
+    def test_response_is_keyed_by_arguments_and_scope(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.get('/actors', query_string={'limit': 5, 'sort': 'name'})
+        self.get('/actors', query_string={'sort': 'name', 'limit': 5})
+        self.assertEqual(len(self.response_cache.backend), 1)
+
+        self.get('/actors', query_string={'limit': 5})
+        self.assertEqual(len(self.response_cache.backend), 2)
+
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        self.get('/actors', query_string={'limit': 5})
+        self.assertEqual(len(self.response_cache.backend), 3)
+
+    def test_writes_invalidate_dependent_responses(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.get('/actors')
+        self.get('/actors', query_string={'expand': ''})
+        self.get('/movies')
+        self.assertEqual(len(self.response_cache.backend), 3)
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        self.assertEqual(len(self.response_cache.backend), 1)
+
+        response, statements = self.get('/movies')
+        self.assertEqual(len(response.get_json()['data']), 1)
+        self.assertEqual(len(statements), 3)
+
+        with self.app.app_context():
+            actor = Actor.query.first()
+            actor.name = 'Thomas Hanks'
+            actor.update()
+
+        self.assertEqual(len(self.response_cache.backend), 0)
+        response, _ = self.get('/actors')
+        self.assertEqual(
+            response.get_json()['data'][0]['name'],
+            'Thomas Hanks'
+        )
+
+    def test_rolled_back_writes_do_not_invalidate(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.get('/actors')
+
+        with self.app.app_context():
+            self.db.session.add(Actor(**mock_data['actor_b']))
+            self.db.session.flush()
+            self.db.session.rollback()
+
+        self.assertEqual(len(self.response_cache.backend), 1)
+
+    def test_streamed_responses_are_not_cached(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.get('/actors', query_string={'stream': 1})
+
+        self.assertEqual(len(self.response_cache.backend), 0)
+
+    def test_shared_backend_is_invalidated_across_apps(self):
+        redis_client = FakeRedis()
+        other_app = create_app(get_database_url(self.db_name))
+        for app in [self.app, other_app]:
+            app.extensions['response_cache'] = ResponseCache(
+                SharedBackend(redis_client)
+            )
+
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        response, statements = self.get('/actors')
+        self.assertEqual(len(statements), 3)
+
+        response, statements = self.get('/actors')
+        self.assertEqual(len(statements), 0)
+
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        other_client = other_app.test_client()
+        set_auth_token(other_client, DIRECTOR_TOKEN)
+        with other_app.app_context():
+            actor_id = Actor.query.first().id
+        response = other_client.patch(
+            f'/actors/{actor_id}',
+            json={'age': 65}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        response, statements = self.get('/actors')
+        self.assertEqual(response.get_json()['data'][0]['age'], 65)
+        self.assertEqual(len(statements), 3)
+
+    def test_lru_backend_evicts_least_recently_used(self):
+        backend = LRUBackend(max_size=2)
+        backend.set('a', 1, ['actor'])
+        backend.set('b', 2, ['movie'])
+        backend.get('a')
+        backend.set('c', 3, ['actor'])
+
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+
+        backend.invalidate(['actor'])
+        self.assertEqual(len(backend), 0)
+
+
+if __name__ == '__main__':
+    main()
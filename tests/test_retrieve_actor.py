@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -44,7 +50,8 @@ class RetrieveActorTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_actors
+                'data': expected_actors,
+                'next_cursor': None
             }
 
         response = self.client.get('/actors')
@@ -69,7 +76,8 @@ class RetrieveActorTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_actors
+                'data': expected_actors,
+                'next_cursor': None
             }
 
         response = self.client.get('/actors')
@@ -94,7 +102,8 @@ class RetrieveActorTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_actors
+                'data': expected_actors,
+                'next_cursor': None
             }
 
         response = self.client.get('/actors')
@@ -122,7 +131,8 @@ class RetrieveActorTestCase(TestCase):
 
         expected = {
             'success': True,
-            'data': []
+            'data': [],
+            'next_cursor': None
         }
 
         response = self.client.get('/actors')
@@ -149,7 +159,8 @@ class RetrieveActorTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_actors
+                'data': expected_actors,
+                'next_cursor': None
             }
 
         response = self.client.get('/actors')
@@ -187,7 +198,8 @@ class RetrieveActorTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_actors
+                'data': expected_actors,
+                'next_cursor': None
             }
 
         response = self.client.get('/actors')
@@ -197,6 +209,566 @@ class RetrieveActorTestCase(TestCase):
         data = response.get_json()
         self.assertEqual(data, expected)
 
+    def test_retrieve_actors_when_paginated(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected_ids = []
+        with self.app.app_context():
+            for mock_actor in mock_data['actors_b'] * 3:
+                actor = Actor(**mock_actor)
+                actor.insert()
+                expected_ids.append(actor.id)
+
+        ids = []
+        cursor = None
+        pages = 0
+        while True:
+            query_string = {'limit': 4}
+            if cursor:
+                query_string['cursor'] = cursor
+
+            response = self.client.get('/actors', query_string=query_string)
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertLessEqual(len(data['data']), 4)
+            ids.extend(actor['id'] for actor in data['data'])
+            pages += 1
+
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(ids, expected_ids)
+        self.assertEqual(pages, 2)
+
+    def test_retrieve_actors_when_page_size_is_exceeded(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        maximum = self.app.config['PAGE_SIZE_MAX']
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'limit',
+                'reason': f'Must be less than or equal to {maximum}.'
+            }]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'limit': maximum + 1}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_when_filter_is_misspelled(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'gendr',
+                'reason': 'Unknown field.'
+            }]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'gendr': 'male'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_when_cursor_is_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'cursor',
+                'reason': 'The cursor is not valid.'
+            }]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_with_constant_queries(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        def create_actors(count):
+            with self.app.app_context():
+                for _ in range(count):
+                    for mock_actor in mock_data['actors_b']:
+                        actor = Actor(**mock_actor)
+                        actor.movies = [
+                            Movie(**mock_related)
+                            for mock_related in mock_data['movies_b']
+                        ]
+                        actor.insert()
+
+        create_actors(1)
+        with count_queries(self.app) as few_statements:
+            response = self.client.get('/actors')
+            self.assertEqual(response.status_code, 200)
+
+        create_actors(5)
+        with count_queries(self.app) as many_statements:
+            response = self.client.get('/actors')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(response.get_json()['data']), 12)
+        self.assertEqual(len(few_statements), 3)
+        self.assertEqual(len(many_statements), 3)
+
+    def test_retrieve_actors_when_streamed(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.app.config['PAGE_SIZE_MAX'] = 2
+        self.app.config['STREAM_BATCH_SIZE'] = 2
+
+        expected_ids = []
+        with self.app.app_context():
+            for mock_actor in mock_data['actors_b'] * 3:
+                actor = Actor(**mock_actor)
+                actor.insert()
+                expected_ids.append(actor.id)
+
+        response = self.client.get('/actors', query_string={'stream': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+        self.assertTrue(response.is_streamed)
+
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(
+            [actor['id'] for actor in data['data']],
+            expected_ids
+        )
+
+    def test_retrieve_actors_when_streamed_without_actors(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get('/actors', query_string={'stream': 1})
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, {'success': True, 'data': []})
+
+    def test_retrieve_actors_when_filtered(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected_ids = []
+        with self.app.app_context():
+            movie = Movie(**mock_data['movie_a'])
+            movie.insert()
+            movie_id = movie.id
+
+            mock_actors = [mock_data['actor_a'], mock_data['actor_b']]
+            for mock_actor in mock_actors + mock_data['actors_b']:
+                actor = Actor(**mock_actor)
+                actor.movies = [movie]
+                actor.insert()
+                if 60 <= actor.age <= 85 and actor.gender == 'male':
+                    expected_ids.append(actor.id)
+
+            Actor(**mock_data['actor_a']).insert()
+
+        response = self.client.get('/actors', query_string={
+            'gender': 'male',
+            'min_age': 60,
+            'max_age': 85,
+            'movie_id': movie_id
+        })
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [actor['id'] for actor in data['data']],
+            expected_ids
+        )
+
+    def test_retrieve_actors_when_filtered_by_name_prefix(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            for mock_actor in [mock_data['actor_a'], mock_data['actor_b']]:
+                Actor(**mock_actor).insert()
+            Actor(name='Al_ice', age=30, gender='female').insert()
+
+        response = self.client.get(
+            '/actors',
+            query_string={'name_prefix': 'Al '}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [actor['name'] for actor in data['data']],
+            ['Al Pacino']
+        )
+
+        response = self.client.get(
+            '/actors',
+            query_string={'name_prefix': 'Al_'}
+        )
+        data = response.get_json()
+        self.assertEqual(
+            [actor['name'] for actor in data['data']],
+            ['Al_ice']
+        )
+
+    def test_retrieve_actors_when_sorted_and_paginated(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = []
+        with self.app.app_context():
+            for mock_actor in mock_data['actors_b'] * 3:
+                actor = Actor(**mock_actor)
+                actor.insert()
+                expected.append((actor.name, actor.id))
+
+        expected.sort(reverse=True)
+        expected_ids = [id for _, id in expected]
+
+        ids = []
+        cursor = None
+        while True:
+            query_string = {'limit': 4, 'sort': '-name'}
+            if cursor:
+                query_string['cursor'] = cursor
+
+            response = self.client.get('/actors', query_string=query_string)
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            ids.extend(actor['id'] for actor in data['data'])
+
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_retrieve_actors_when_cursor_sort_differs(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            for mock_actor in mock_data['actors_b']:
+                Actor(**mock_actor).insert()
+
+        response = self.client.get(
+            '/actors',
+            query_string={'limit': 1, 'sort': 'age'}
+        )
+        cursor = response.get_json()['next_cursor']
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'cursor',
+                'reason': 'The cursor was not created with this sort.'
+            }]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'cursor': cursor, 'sort': 'name'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_when_filters_are_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [
+                {
+                    'name': 'sort',
+                    'reason': (
+                        'Must be one of: id, -id, name, -name, age, -age.'
+                    )
+                },
+                {
+                    'name': 'gender',
+                    'reason': 'Must be one of: male, female, other.'
+                }
+            ]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'sort': 'gender', 'gender': 'unknown'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_when_age_range_is_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'max_age',
+                'reason': 'Must be greater than or equal to "min_age".'
+            }]
+        }
+
+        response = self.client.get(
+            '/actors',
+            query_string={'min_age': 50, 'max_age': 40}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actors_with_sparse_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = None
+        with self.app.app_context():
+            expected_actors = []
+            for mock_actor in mock_data['actors_b']:
+                actor = Actor(**mock_actor)
+                actor.movies = [
+                    Movie(**mock_related)
+                    for mock_related in mock_data['movies_b']
+                ]
+                actor.insert()
+                expected_actors.append({
+                    'id': actor.id,
+                    'name': actor.name
+                })
+
+            expected = {
+                'success': True,
+                'data': expected_actors,
+                'next_cursor': None
+            }
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/actors',
+                query_string={'fields': 'id,name'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+        self.assertEqual(len(statements), 2)
+        self.assertNotIn('age', statements[1])
+
+    def test_retrieve_actors_with_expanded_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            actor = Actor(**mock_data['actors_b'][0])
+            actor.movies = [Movie(**mock_data['movies_b'][0])]
+            actor.insert()
+
+        response = self.client.get(
+            '/actors',
+            query_string={'fields': 'name', 'expand': 'movies'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(list(data['data'][0]), ['name', 'movies'])
+        self.assertEqual(len(data['data'][0]['movies']), 1)
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/actors',
+                query_string={'expand': ''}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertNotIn('movies', data['data'][0])
+        self.assertEqual(len(statements), 2)
+
+    def test_retrieve_actors_with_empty_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Actor(**mock_data['actor_a']).insert()
+
+        expected = self.client.get('/actors').get_json()
+
+        for fields in ['', ',']:
+            response = self.client.get(
+                '/actors',
+                query_string={'fields': fields}
+            )
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertEqual(data, expected)
+            self.assertIn('movies', data['data'][0])
+
+    def test_retrieve_actors_when_fields_are_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get(
+            '/actors',
+            query_string={'fields': 'id,unknown', 'expand': 'unknown'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(
+            [param['name'] for param in data['invalid_params']],
+            ['fields[1]', 'expand[0]']
+        )
+
+    def test_retrieve_actors_when_not_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Actor(**mock_data['actor_a']).insert()
+
+        response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/actors',
+                headers={'If-None-Match': etag}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('table_version', statements[0])
+
+        response = self.client.get(
+            '/actors',
+            headers={'If-Modified-Since': last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            '/actors',
+            query_string={'limit': 1},
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_actors_when_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Actor(**mock_data['actor_a']).insert()
+
+        response = self.client.get('/actors')
+        etag = response.headers['ETag']
+        response = self.client.get('/actors', query_string={'expand': ''})
+        unexpanded_etag = response.headers['ETag']
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        response = self.client.get(
+            '/actors',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        response = self.client.get(
+            '/actors',
+            query_string={'expand': ''},
+            headers={'If-None-Match': unexpanded_etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        with self.app.app_context():
+            Actor(**mock_data['actor_a']).insert()
+
+        response = self.client.get(
+            '/actors',
+            query_string={'expand': ''},
+            headers={'If-None-Match': unexpanded_etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['data']), 2)
+
+    def test_retrieve_actors_by_ids(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        ids = []
+        with self.app.app_context():
+            for mock_actor in mock_data['actors_b'] * 2:
+                actor = Actor(**mock_actor)
+                actor.insert()
+                ids.append(actor.id)
+
+        requested_ids = [ids[3], ids[0], ids[2] + 100]
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/actors',
+                query_string={'ids': ','.join(map(str, requested_ids))}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [actor['id'] for actor in data['data']],
+            [ids[0], ids[3]]
+        )
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'actor.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+
+    def test_retrieve_actors_when_too_many_ids(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.app.config['PAGE_SIZE_MAX'] = 2
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'ids',
+                'reason': 'Can not contain more than 2 ids.'
+            }]
+        }
+
+        response = self.client.get('/actors', query_string={'ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,154 @@
+import os
+from unittest import TestCase, main
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+
+class RetrieveActorByIdTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def create_actor(self):
+        with self.app.app_context():
+            movie = Movie(**mock_data['movie_a'])
+            actor = Actor(**mock_data['actor_a'])
+            actor.movies = [movie]
+            actor.insert()
+
+            release_date = mock_data['movie_a']['release_date'].isoformat()
+            expected_actor = {
+                'id': actor.id,
+                **mock_data['actor_a'],
+                'movies': [{
+                    'id': movie.id,
+                    **mock_data['movie_a'],
+                    'release_date': release_date
+                }]
+            }
+
+        return expected_actor
+
+    def test_retrieve_actor_when_requested_by_assistant(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_actor = self.create_actor()
+
+        expected = {
+            'success': True,
+            'data': [expected_actor]
+        }
+
+        response = self.client.get(f'/actors/{expected_actor["id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actor_when_requested_without_token(self):
+        expected = {
+            'success': False,
+            'description': 'Authorization header is expected.'
+        }
+
+        response = self.client.get('/actors/1')
+        self.assertEqual(response.status_code, 401)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actor_when_actor_does_not_exist(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'An actor with the id "1" was not found.'
+        }
+
+        response = self.client.get('/actors/1')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_actor_with_sparse_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_actor = self.create_actor()
+
+        expected = {
+            'success': True,
+            'data': [{
+                'id': expected_actor['id'],
+                'name': expected_actor['name']
+            }]
+        }
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                f'/actors/{expected_actor["id"]}',
+                query_string={'fields': 'id,name'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+        self.assertEqual(len(statements), 2)
+
+    def test_retrieve_actor_with_eager_loaded_movies(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_actor = self.create_actor()
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(f'/actors/{expected_actor["id"]}')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(statements), 3)
+        self.assertIn('WHERE actor.id = ', statements[1])
+
+    def test_retrieve_actor_when_not_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_actor = self.create_actor()
+        path = f'/actors/{expected_actor["id"]}'
+
+        response = self.client.get(path)
+        etag = response.headers['ETag']
+
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.app.app_context():
+            actor = Actor.query.get(expected_actor['id'])
+            actor.age = 65
+            actor.update()
+
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data'][0]['age'], 65)
+
+
+if __name__ == '__main__':
+    main()
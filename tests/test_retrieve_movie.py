@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -47,7 +53,8 @@ class RetrieveMovieTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_movies
+                'data': expected_movies,
+                'next_cursor': None
             }
 
         response = self.client.get('/movies')
@@ -76,7 +83,8 @@ class RetrieveMovieTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_movies
+                'data': expected_movies,
+                'next_cursor': None
             }
 
         response = self.client.get('/movies')
@@ -105,7 +113,8 @@ class RetrieveMovieTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_movies
+                'data': expected_movies,
+                'next_cursor': None
             }
 
         response = self.client.get('/movies')
@@ -133,7 +142,8 @@ class RetrieveMovieTestCase(TestCase):
 
         expected = {
             'success': True,
-            'data': []
+            'data': [],
+            'next_cursor': None
         }
 
         response = self.client.get('/movies')
@@ -163,7 +173,8 @@ class RetrieveMovieTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_movies
+                'data': expected_movies,
+                'next_cursor': None
             }
 
         response = self.client.get('/movies')
@@ -201,7 +212,8 @@ class RetrieveMovieTestCase(TestCase):
 
             expected = {
                 'success': True,
-                'data': expected_movies
+                'data': expected_movies,
+                'next_cursor': None
             }
 
         response = self.client.get('/movies')
@@ -211,6 +223,521 @@ class RetrieveMovieTestCase(TestCase):
         data = response.get_json()
         self.assertEqual(data, expected)
 
+    def test_retrieve_movies_when_paginated(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected_ids = []
+        with self.app.app_context():
+            for mock_movie in mock_data['movies_b'] * 3:
+                movie = Movie(**mock_movie)
+                movie.insert()
+                expected_ids.append(movie.id)
+
+        ids = []
+        cursor = None
+        pages = 0
+        while True:
+            query_string = {'limit': 4}
+            if cursor:
+                query_string['cursor'] = cursor
+
+            response = self.client.get('/movies', query_string=query_string)
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertLessEqual(len(data['data']), 4)
+            ids.extend(movie['id'] for movie in data['data'])
+            pages += 1
+
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(ids, expected_ids)
+        self.assertEqual(pages, 2)
+
+    def test_retrieve_movies_when_page_size_is_exceeded(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        maximum = self.app.config['PAGE_SIZE_MAX']
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'limit',
+                'reason': f'Must be less than or equal to {maximum}.'
+            }]
+        }
+
+        response = self.client.get(
+            '/movies',
+            query_string={'limit': maximum + 1}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movies_when_filter_is_misspelled(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'title_prefx',
+                'reason': 'Unknown field.'
+            }]
+        }
+
+        response = self.client.get(
+            '/movies',
+            query_string={'title_prefx': 'Forrest'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movies_when_cursor_is_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'cursor',
+                'reason': 'The cursor is not valid.'
+            }]
+        }
+
+        response = self.client.get(
+            '/movies',
+            query_string={'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movies_with_constant_queries(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        def create_movies(count):
+            with self.app.app_context():
+                for _ in range(count):
+                    for mock_movie in mock_data['movies_b']:
+                        movie = Movie(**mock_movie)
+                        movie.actors = [
+                            Actor(**mock_related)
+                            for mock_related in mock_data['actors_b']
+                        ]
+                        movie.insert()
+
+        create_movies(1)
+        with count_queries(self.app) as few_statements:
+            response = self.client.get('/movies')
+            self.assertEqual(response.status_code, 200)
+
+        create_movies(5)
+        with count_queries(self.app) as many_statements:
+            response = self.client.get('/movies')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(response.get_json()['data']), 12)
+        self.assertEqual(len(few_statements), 3)
+        self.assertEqual(len(many_statements), 3)
+
+    def test_retrieve_movies_when_streamed(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.app.config['PAGE_SIZE_MAX'] = 2
+        self.app.config['STREAM_BATCH_SIZE'] = 2
+
+        expected_ids = []
+        with self.app.app_context():
+            for mock_movie in mock_data['movies_b'] * 3:
+                movie = Movie(**mock_movie)
+                movie.insert()
+                expected_ids.append(movie.id)
+
+        response = self.client.get('/movies', query_string={'stream': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+        self.assertTrue(response.is_streamed)
+
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(
+            [movie['id'] for movie in data['data']],
+            expected_ids
+        )
+
+    def test_retrieve_movies_when_streamed_without_movies(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get('/movies', query_string={'stream': 1})
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, {'success': True, 'data': []})
+
+    def test_retrieve_movies_when_filtered(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected_ids = []
+        with self.app.app_context():
+            actor = Actor(**mock_data['actor_b'])
+            mock_movies = [mock_data['movie_a']] + mock_data['movies_b']
+            actor.movies = [
+                Movie(**mock_movie)
+                for mock_movie in mock_movies
+            ]
+            actor.insert()
+            actor_id = actor.id
+            expected_ids = [
+                movie.id
+                for movie in actor.movies
+                if movie.release_date.year < 1990
+            ]
+
+            Movie(**mock_data['movies_b'][0]).insert()
+
+        response = self.client.get('/movies', query_string={
+            'min_release_date': '1970-01-01T00:00:00',
+            'max_release_date': '1989-12-31T00:00:00+00:00',
+            'actor_id': actor_id
+        })
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [movie['id'] for movie in data['data']],
+            expected_ids
+        )
+
+    def test_retrieve_movies_when_filtered_by_title_prefix(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            mock_movies = [mock_data['movie_a']] + mock_data['movies_b']
+            for mock_movie in mock_movies:
+                Movie(**mock_movie).insert()
+
+        response = self.client.get(
+            '/movies',
+            query_string={'title_prefix': 'The Godfather:'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [movie['title'] for movie in data['data']],
+            ['The Godfather: Part II']
+        )
+
+    def test_retrieve_movies_when_sorted_and_paginated(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = []
+        with self.app.app_context():
+            mock_movies = [mock_data['movie_a']] + mock_data['movies_b']
+            for mock_movie in mock_movies * 2:
+                movie = Movie(**mock_movie)
+                movie.insert()
+                expected.append((movie.release_date, movie.id))
+
+        expected.sort()
+        expected_ids = [id for _, id in expected]
+
+        ids = []
+        cursor = None
+        while True:
+            query_string = {'limit': 4, 'sort': 'release_date'}
+            if cursor:
+                query_string['cursor'] = cursor
+
+            response = self.client.get('/movies', query_string=query_string)
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            ids.extend(movie['id'] for movie in data['data'])
+
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_retrieve_movies_when_release_date_range_is_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'max_release_date',
+                'reason': (
+                    'Must be greater than or equal to "min_release_date".'
+                )
+            }]
+        }
+
+        response = self.client.get('/movies', query_string={
+            'min_release_date': '2000-01-01T00:00:00',
+            'max_release_date': '1990-01-01T00:00:00'
+        })
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movies_when_sort_is_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'sort',
+                'reason': (
+                    'Must be one of: id, -id, title, -title,'
+                    ' release_date, -release_date.'
+                )
+            }]
+        }
+
+        response = self.client.get('/movies', query_string={'sort': 'age'})
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movies_with_sparse_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = None
+        with self.app.app_context():
+            expected_movies = []
+            for mock_movie in mock_data['movies_b']:
+                movie = Movie(**mock_movie)
+                movie.actors = [
+                    Actor(**mock_related)
+                    for mock_related in mock_data['actors_b']
+                ]
+                movie.insert()
+                expected_movies.append({
+                    'id': movie.id,
+                    'title': movie.title
+                })
+
+            expected = {
+                'success': True,
+                'data': expected_movies,
+                'next_cursor': None
+            }
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/movies',
+                query_string={'fields': 'id,title'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+        self.assertEqual(len(statements), 2)
+        self.assertNotIn('release_date', statements[1])
+
+    def test_retrieve_movies_with_expanded_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            movie = Movie(**mock_data['movies_b'][0])
+            movie.actors = [Actor(**mock_data['actors_b'][0])]
+            movie.insert()
+
+        response = self.client.get(
+            '/movies',
+            query_string={'fields': 'title', 'expand': 'actors'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(list(data['data'][0]), ['title', 'actors'])
+        self.assertEqual(len(data['data'][0]['actors']), 1)
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/movies',
+                query_string={'expand': ''}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertNotIn('actors', data['data'][0])
+        self.assertEqual(len(statements), 2)
+
+    def test_retrieve_movies_with_empty_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        expected = self.client.get('/movies').get_json()
+
+        for fields in ['', ',']:
+            response = self.client.get(
+                '/movies',
+                query_string={'fields': fields}
+            )
+            self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertEqual(data, expected)
+            self.assertIn('actors', data['data'][0])
+
+    def test_retrieve_movies_when_fields_are_invalid(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        response = self.client.get(
+            '/movies',
+            query_string={'fields': 'id,unknown', 'expand': 'unknown'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(
+            [param['name'] for param in data['invalid_params']],
+            ['fields[1]', 'expand[0]']
+        )
+
+    def test_retrieve_movies_when_not_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        response = self.client.get('/movies')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/movies',
+                headers={'If-None-Match': etag}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('table_version', statements[0])
+
+        response = self.client.get(
+            '/movies',
+            headers={'If-Modified-Since': last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            '/movies',
+            query_string={'limit': 1},
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_movies_when_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        response = self.client.get('/movies')
+        etag = response.headers['ETag']
+        response = self.client.get('/movies', query_string={'expand': ''})
+        unexpanded_etag = response.headers['ETag']
+
+        with self.app.app_context():
+            Actor(**mock_data['actor_a']).insert()
+
+        response = self.client.get(
+            '/movies',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        response = self.client.get(
+            '/movies',
+            query_string={'expand': ''},
+            headers={'If-None-Match': unexpanded_etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        with self.app.app_context():
+            Movie(**mock_data['movie_a']).insert()
+
+        response = self.client.get(
+            '/movies',
+            query_string={'expand': ''},
+            headers={'If-None-Match': unexpanded_etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['data']), 2)
+
+    def test_retrieve_movies_by_ids(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        ids = []
+        with self.app.app_context():
+            for mock_movie in mock_data['movies_b'] * 2:
+                movie = Movie(**mock_movie)
+                movie.insert()
+                ids.append(movie.id)
+
+        requested_ids = [ids[3], ids[0], ids[2] + 100]
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                '/movies',
+                query_string={'ids': ','.join(map(str, requested_ids))}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [movie['id'] for movie in data['data']],
+            [ids[0], ids[3]]
+        )
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'movie.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+
+    def test_retrieve_movies_when_too_many_ids(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        self.app.config['PAGE_SIZE_MAX'] = 2
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'ids',
+                'reason': 'Can not contain more than 2 ids.'
+            }]
+        }
+
+        response = self.client.get('/movies', query_string={'ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
 
 if __name__ == '__main__':
     main()
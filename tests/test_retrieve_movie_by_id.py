@@ -0,0 +1,157 @@
+import os
+from unittest import TestCase, main
+
+from app import create_app
+from models.database import db
+from models.casting import Actor, Movie
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+
+class RetrieveMovieByIdTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def create_movie(self):
+        with self.app.app_context():
+            movie = Movie(**mock_data['movie_a'])
+            actor = Actor(**mock_data['actor_a'])
+            movie.actors = [actor]
+            movie.insert()
+
+            release_date = mock_data['movie_a']['release_date'].isoformat()
+            expected_movie = {
+                'id': movie.id,
+                **mock_data['movie_a'],
+                'release_date': release_date,
+                'actors': [{
+                    'id': actor.id,
+                    **mock_data['actor_a']
+                }]
+            }
+
+        return expected_movie
+
+    def test_retrieve_movie_when_requested_by_assistant(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_movie = self.create_movie()
+
+        expected = {
+            'success': True,
+            'data': [expected_movie]
+        }
+
+        response = self.client.get(f'/movies/{expected_movie["id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movie_when_requested_without_token(self):
+        expected = {
+            'success': False,
+            'description': 'Authorization header is expected.'
+        }
+
+        response = self.client.get('/movies/1')
+        self.assertEqual(response.status_code, 401)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movie_when_movie_does_not_exist(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        expected = {
+            'success': False,
+            'description': 'A movie with the id "1" was not found.'
+        }
+
+        response = self.client.get('/movies/1')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
+    def test_retrieve_movie_with_sparse_fields(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_movie = self.create_movie()
+
+        expected = {
+            'success': True,
+            'data': [{
+                'id': expected_movie['id'],
+                'title': expected_movie['title']
+            }]
+        }
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(
+                f'/movies/{expected_movie["id"]}',
+                query_string={'fields': 'id,title'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+        self.assertEqual(len(statements), 2)
+
+    def test_retrieve_movie_with_eager_loaded_actors(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_movie = self.create_movie()
+
+        with count_queries(self.app) as statements:
+            response = self.client.get(f'/movies/{expected_movie["id"]}')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(statements), 3)
+        self.assertIn('WHERE movie.id = ', statements[1])
+
+    def test_retrieve_movie_when_not_modified(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+        expected_movie = self.create_movie()
+        path = f'/movies/{expected_movie["id"]}'
+
+        response = self.client.get(path)
+        etag = response.headers['ETag']
+
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.app.app_context():
+            movie = Movie.query.get(expected_movie['id'])
+            movie.title = 'Cast Away'
+            movie.update()
+
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json()['data'][0]['title'],
+            'Cast Away'
+        )
+
+
+if __name__ == '__main__':
+    main()
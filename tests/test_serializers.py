@@ -0,0 +1,80 @@
+from threading import Thread
+from unittest import TestCase, main
+from marshmallow import fields
+
+from models.casting import Actor, Movie
+from schema import ActorSchema, MovieSchema
+from serializers import get_schema, get_serializer
+from util import mock_data
+
+
+class SerializersTestCase(TestCase):
+    def create_actor(self):
+        actor = Actor(id=1, **mock_data['actor_a'])
+        actor.movies = [
+            Movie(id=index, **mock_movie)
+            for index, mock_movie in enumerate(mock_data['movies_b'])
+        ]
+        return actor
+
+    def test_schema_is_shared(self):
+        schema = get_schema(ActorSchema, only=['id', 'name'])
+
+        self.assertIs(get_schema(ActorSchema, only=['name', 'id']), schema)
+        self.assertIsNot(get_schema(ActorSchema), schema)
+        self.assertIsNot(get_schema(ActorSchema, many=True), schema)
+
+    def test_schema_is_shared_across_threads(self):
+        schemas = []
+
+        def get_movie_schema():
+            schemas.append(get_schema(MovieSchema, exclude=['actors']))
+
+        threads = [Thread(target=get_movie_schema) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(schema) for schema in schemas}), 1)
+
+    def test_fast_dump_matches_schema_dump(self):
+        actor = self.create_actor()
+        movie = actor.movies[0]
+
+        options = [
+            (ActorSchema, actor, None, ()),
+            (ActorSchema, actor, ['id', 'name'], ()),
+            (ActorSchema, actor, None, ['movies']),
+            (MovieSchema, movie, None, ())
+        ]
+        for schema_class, obj, only, exclude in options:
+            schema = schema_class(only=only, exclude=exclude)
+            serialize = get_serializer(schema_class, only, exclude)
+
+            self.assertIsNot(serialize, schema.dump)
+            self.assertEqual(serialize(obj), schema.dump(obj))
+            self.assertEqual(list(serialize(obj)), list(schema.dump(obj)))
+
+    def test_unsupported_fields_use_schema_dump(self):
+        class NamedActorSchema(ActorSchema):
+            display_name = fields.Method('get_display_name')
+
+            def get_display_name(self, actor):
+                return actor.name.upper()
+
+        actor = self.create_actor()
+        serialize = get_serializer(NamedActorSchema)
+
+        self.assertEqual(
+            serialize(actor),
+            NamedActorSchema().dump(actor)
+        )
+        self.assertEqual(
+            get_serializer(NamedActorSchema, fast=False),
+            get_schema(NamedActorSchema).dump
+        )
+
+
+if __name__ == '__main__':
+    main()
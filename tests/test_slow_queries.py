@@ -0,0 +1,226 @@
+import os
+import sys
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from app import create_app
+from models.database import db
+from models.casting import Actor
+from slow_queries import (
+    SlowQueryLog,
+    can_analyze,
+    create_fingerprint,
+    describe_parameters,
+    find_caller,
+    is_explainable
+)
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    mock_data
+)
+
+
+load_test_env()
+
+ASSISTANT_TOKEN = os.getenv('ASSISTANT_TOKEN')
+DIRECTOR_TOKEN = os.getenv('DIRECTOR_TOKEN')
+
+class StatementShapeTestCase(TestCase):
+    def test_fingerprint_collapses_values(self):
+        self.assertEqual(
+            create_fingerprint(
+                'SELECT movies.id FROM movies\n'
+                '  WHERE movies.id IN (?, ?, ?) AND movies.title = \'Up\''
+                ' LIMIT 20'
+            ),
+            'SELECT movies.id FROM movies WHERE movies.id IN (?)'
+            ' AND movies.title = ? LIMIT ?'
+        )
+        self.assertEqual(
+            create_fingerprint(
+                'SELECT anon_1.id FROM actors AS anon_1'
+                ' WHERE anon_1.id IN (%(id_1_1)s, %(id_1_2)s)'
+            ),
+            create_fingerprint(
+                'SELECT anon_1.id FROM actors AS anon_1'
+                ' WHERE anon_1.id IN (%(id_1_1)s)'
+            )
+        )
+
+    def test_parameters_are_described_by_type(self):
+        self.assertEqual(
+            describe_parameters({'id_1': 5, 'names': ['a', 'b']}),
+            '{id_1: int, names: list[str]}'
+        )
+        self.assertEqual(
+            describe_parameters((5, 'a', None)),
+            '(int, str, NoneType)'
+        )
+        self.assertEqual(
+            describe_parameters([(1, 'a'), (2, 'b')], many=True),
+            '2 x (int, str)'
+        )
+
+    def test_only_postgres_selects_are_explained(self):
+        postgresql = Mock()
+        postgresql.name = 'postgresql'
+        sqlite = Mock()
+        sqlite.name = 'sqlite'
+
+        self.assertTrue(is_explainable(postgresql, 'SELECT 1'))
+        self.assertFalse(is_explainable(sqlite, 'SELECT 1'))
+        self.assertFalse(
+            is_explainable(postgresql, 'UPDATE actors SET age = 1')
+        )
+        self.assertFalse(
+            is_explainable(postgresql, 'SELECT * FROM actors FOR UPDATE')
+        )
+
+    def test_volatile_statements_are_not_analyzed(self):
+        self.assertTrue(can_analyze('SELECT actor.id FROM actor'))
+        self.assertFalse(can_analyze(
+            "SELECT nextval(pg_get_serial_sequence('actor', 'id'))"
+            ' FROM generate_series(1, 3)'
+        ))
+        self.assertFalse(can_analyze(
+            "SELECT setval('actor_id_seq', 10)"
+        ))
+
+    def test_callers_outside_routes_are_ignored(self):
+        self.assertIsNone(find_caller(sys._getframe()))
+
+    def test_explain_is_rolled_back(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('Seq Scan on actors',)]
+        connection = Mock()
+        connection.cursor.return_value = cursor
+        engine = Mock()
+        engine.raw_connection.return_value = connection
+
+        plan = SlowQueryLog(explain_timeout=2).explain_statement(
+            engine,
+            'SELECT * FROM actors WHERE id = %(id)s',
+            {'id': 1}
+        )
+        self.assertEqual(plan, 'Seq Scan on actors')
+        cursor.execute.assert_any_call(
+            'SET LOCAL statement_timeout = %s',
+            (2000,)
+        )
+        cursor.execute.assert_any_call(
+            'EXPLAIN (ANALYZE, BUFFERS)'
+            ' SELECT * FROM actors WHERE id = %(id)s',
+            {'id': 1}
+        )
+        connection.rollback.assert_called_once_with()
+        connection.close.assert_called_once_with()
+
+    def test_explain_without_analyze(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('Function Scan',)]
+        connection = Mock()
+        connection.cursor.return_value = cursor
+        engine = Mock()
+        engine.raw_connection.return_value = connection
+
+        SlowQueryLog().explain_statement(
+            engine,
+            'SELECT nextval(%(sequence)s)',
+            {'sequence': 'actor_id_seq'},
+            analyze=False
+        )
+        cursor.execute.assert_called_with(
+            'EXPLAIN SELECT nextval(%(sequence)s)',
+            {'sequence': 'actor_id_seq'}
+        )
+
+
+class SlowQueryLogTestCase(TestCase):
+    def setUp(self):
+        self.db_name = 'casting_test'
+        with patch.dict(os.environ, {'SLOW_QUERY_SECONDS': '0.000001'}):
+            self.app = create_app(get_database_url(self.db_name))
+        self.client = self.app.test_client()
+        self.slow_query_log = self.app.extensions['slow_query_log']
+
+        with self.app.app_context():
+            self.db = db
+            self.db.drop_all()
+            self.db.create_all()
+            Actor(**mock_data['actor_a']).insert()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.drop_all()
+
+    def test_route_statements_are_logged(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            response = self.client.get('/actors')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn(
+            'in GET /actors (casting.retrieve_actors)'
+            ' from routes/casting.py:',
+            logs.output[1]
+        )
+        self.assertIn('FROM actor ', logs.output[1])
+        self.assertIn('parameters=(int, int) suppressed=0', logs.output[1])
+
+    def test_validator_statements_are_logged(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            response = self.client.post(
+                '/actors',
+                json={**mock_data['actor_b'], 'movies': [100]}
+            )
+        self.assertEqual(response.status_code, 400)
+
+        self.assertTrue(any(
+            'from schema.py:validate_movies_exist:' in output
+            for output in logs.output
+        ))
+
+    def test_repeated_statements_are_rate_limited(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            self.client.get('/actors')
+            self.client.get('/actors')
+        self.assertEqual(len(logs.output), 3)
+
+        # The cached response only checks the version of the tables.
+        self.slow_query_log.rate_seconds = 0
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            self.client.get('/actors')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('suppressed=1', logs.output[0])
+
+    def test_statements_under_threshold_are_not_logged(self):
+        self.slow_query_log.threshold = 60
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        with patch('slow_queries.logger') as logger:
+            self.client.get('/actors')
+        logger.warning.assert_not_called()
+
+    def test_postgres_selects_are_explained(self):
+        set_auth_token(self.client, ASSISTANT_TOKEN)
+
+        explainable = patch('slow_queries.is_explainable', return_value=True)
+        submit_explain = patch.object(self.slow_query_log, 'submit_explain')
+        with explainable, submit_explain as submit:
+            with self.assertLogs('slow_queries', 'WARNING'):
+                self.client.get('/actors')
+        self.assertEqual(submit.call_count, 3)
+        for call in submit.call_args_list:
+            self.assertTrue(call[0][-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import json
+import time
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+from werkzeug.exceptions import Unauthorized
+
+import auth
+from auth import JWKSCache, TokenCache, decode_token
+from util import create_signing_key, create_token
+
+
+class TokenCacheTestCase(TestCase):
+    def test_cached_payload_is_returned(self):
+        cache = TokenCache()
+        payload = {'sub': 'a', 'exp': time.time() + 60}
+        cache.set('token-a', payload)
+
+        self.assertIs(cache.get('token-a'), payload)
+        self.assertIsNone(cache.get('token-b'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_payload_expires_at_exp_claim(self):
+        cache = TokenCache()
+        cache.set('token-a', {'sub': 'a', 'exp': time.time() + 0.05})
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get('token-a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_payload_without_exp_claim_is_not_cached(self):
+        cache = TokenCache()
+        cache.set('token-a', {'sub': 'a'})
+
+        self.assertIsNone(cache.get('token-a'))
+
+    def test_least_recently_used_payload_is_evicted(self):
+        cache = TokenCache(max_size=2)
+        exp = time.time() + 60
+        cache.set('token-a', {'sub': 'a', 'exp': exp})
+        cache.set('token-b', {'sub': 'b', 'exp': exp})
+        cache.get('token-a')
+        cache.set('token-c', {'sub': 'c', 'exp': exp})
+
+        self.assertIsNotNone(cache.get('token-a'))
+        self.assertIsNone(cache.get('token-b'))
+        self.assertIsNotNone(cache.get('token-c'))
+
+    def test_tokens_are_keyed_by_digest(self):
+        cache = TokenCache()
+        cache.set('token-a', {'sub': 'a', 'exp': time.time() + 60})
+
+        self.assertNotIn('token-a', cache._entries)
+
+
+class DecodeTokenCacheTestCase(TestCase):
+    def setUp(self):
+        self.private_key, public_jwk = create_signing_key('key-a')
+        self.jwks_file = tempfile.NamedTemporaryFile('w', suffix='.json')
+        json.dump({'keys': [public_jwk]}, self.jwks_file)
+        self.jwks_file.flush()
+
+        self.jwks_cache = auth.jwks_cache
+        self.token_cache = auth.token_cache
+        auth.jwks_cache = JWKSCache(Path(self.jwks_file.name).as_uri())
+        auth.token_cache = TokenCache()
+
+    def tearDown(self):
+        auth.jwks_cache = self.jwks_cache
+        auth.token_cache = self.token_cache
+        self.jwks_file.close()
+
+    def test_repeated_token_skips_verification(self):
+        token = create_token(self.private_key, 'key-a', ['get:actors'])
+
+        first = decode_token(token)
+        second = decode_token(token)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['permissions'], ['get:actors'])
+        self.assertEqual(auth.token_cache.stats()['hits'], 1)
+        self.assertEqual(auth.token_cache.stats()['misses'], 1)
+
+    def test_expired_token_is_not_served_from_cache(self):
+        token = create_token(
+            self.private_key,
+            'key-a',
+            ['get:actors'],
+            expires_in=1
+        )
+        decode_token(token)
+        time.sleep(2.1)
+
+        with self.assertRaises(Unauthorized):
+            decode_token(token)
+
+
+if __name__ == '__main__':
+    main()
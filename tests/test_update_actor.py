@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -298,3 +304,184 @@ class UpdateActorTestCase(TestCase):
 
         data = response.get_json()
         self.assertEqual(data, expected)
+
+    def test_update_actor_movies_with_constant_queries(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        def update_movies(count):
+            with self.app.app_context():
+                actor = Actor(**mock_data['actor_a'])
+                actor.insert()
+                actor_id = actor.id
+
+                related_ids = []
+                for _ in range(count):
+                    for mock_related in mock_data['movies_b']:
+                        related = Movie(**mock_related)
+                        related.insert()
+                        related_ids.append(related.id)
+
+            with count_queries(self.app) as statements:
+                response = self.client.patch(
+                    f'/actors/{actor_id}',
+                    json={'movies': related_ids}
+                )
+                self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertEqual(len(data['data'][0]['movies']), count * 2)
+            return statements
+
+        few_statements = update_movies(1)
+        many_statements = update_movies(5)
+        self.assertEqual(len(few_statements), len(many_statements))
+
+    def test_update_actor_movies_with_one_lookup_query(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        related_ids = []
+        with self.app.app_context():
+            owner = Actor(**mock_data['actor_a'])
+            owner.insert()
+            owner_id = owner.id
+
+            for mock_related in mock_data['movies_b']:
+                related = Movie(**mock_related)
+                related.insert()
+                related_ids.append(related.id)
+
+        with count_queries(self.app) as statements:
+            response = self.client.patch(
+                f'/actors/{owner_id}',
+                json={'movies': related_ids}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'WHERE movie.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(len(statements), 7)
+
+        versions = [
+            index
+            for index, statement in enumerate(statements)
+            if statement.startswith('UPDATE table_version')
+        ]
+        writes = [
+            index
+            for index, statement in enumerate(statements)
+            if statement.startswith(('INSERT', 'UPDATE actor', 'DELETE'))
+        ]
+        self.assertEqual(len(versions), 1)
+        self.assertGreater(versions[0], max(writes))
+
+    def create_actor_with_movies(self, count, cast_count):
+        with self.app.app_context():
+            actor = Actor(**mock_data['actor_a'])
+            related = []
+            for index in range(count):
+                mock_related = mock_data['movies_b'][index % 2]
+                movie = Movie(**mock_related)
+                movie.insert()
+                related.append(movie)
+
+            actor.movies = related[:cast_count]
+            actor.insert()
+            return actor.id, [movie.id for movie in related]
+
+    def retrieve_movies_ids(self, actor_id):
+        with self.app.app_context():
+            actor = Actor.query.get(actor_id)
+            return sorted(movie.id for movie in actor.movies)
+
+    def test_update_actor_movies_with_association_diff(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        actor_id, movie_ids = self.create_actor_with_movies(3, 2)
+
+        with count_queries(self.app) as statements:
+            response = self.client.patch(
+                f'/actors/{actor_id}',
+                json={'movies': movie_ids[1:]}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        deletes = [
+            statement
+            for statement in statements
+            if statement.startswith('DELETE FROM actor_movie')
+        ]
+        inserts = [
+            statement
+            for statement in statements
+            if statement.startswith('INSERT INTO actor_movie')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.retrieve_movies_ids(actor_id), movie_ids[1:])
+
+    def test_update_actor_when_movies_added(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        actor_id, movie_ids = self.create_actor_with_movies(3, 2)
+
+        response = self.client.patch(
+            f'/actors/{actor_id}',
+            json={'add_movies': movie_ids[1:]}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [movie['id'] for movie in data['data'][0]['movies']],
+            movie_ids
+        )
+        self.assertEqual(self.retrieve_movies_ids(actor_id), movie_ids)
+
+    def test_update_actor_when_movies_removed(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        actor_id, movie_ids = self.create_actor_with_movies(3, 3)
+
+        response = self.client.patch(
+            f'/actors/{actor_id}',
+            json={'remove_movies': movie_ids[:1] + [100]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.retrieve_movies_ids(actor_id), movie_ids[1:])
+
+    def test_update_actor_when_added_movies_not_found(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        actor_id, movie_ids = self.create_actor_with_movies(1, 1)
+
+        response = self.client.patch(
+            f'/actors/{actor_id}',
+            json={'add_movies': [100]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data['invalid_params'][0]['name'], 'add_movies[0]')
+        self.assertEqual(self.retrieve_movies_ids(actor_id), movie_ids)
+
+    def test_update_actor_when_movies_changes_combined(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        actor_id, movie_ids = self.create_actor_with_movies(2, 1)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'add_movies',
+                'reason': 'Can not be combined with "movies".'
+            }]
+        }
+
+        response = self.client.patch(
+            f'/actors/{actor_id}',
+            json={'movies': movie_ids[:1], 'add_movies': movie_ids[1:]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
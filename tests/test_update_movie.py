@@ -4,7 +4,13 @@ from unittest import TestCase, main
 from app import create_app
 from models.database import db
 from models.casting import Actor, Movie
-from util import get_database_url, load_test_env, set_auth_token, mock_data
+from util import (
+    get_database_url,
+    load_test_env,
+    set_auth_token,
+    count_queries,
+    mock_data
+)
 
 
 load_test_env()
@@ -303,6 +309,174 @@ class UpdateMovieTestCase(TestCase):
         data = response.get_json()
         self.assertEqual(data, expected)
 
+    def test_update_movie_actors_with_constant_queries(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        def update_actors(count):
+            with self.app.app_context():
+                movie = Movie(**mock_data['movie_a'])
+                movie.insert()
+                movie_id = movie.id
+
+                related_ids = []
+                for _ in range(count):
+                    for mock_related in mock_data['actors_b']:
+                        related = Actor(**mock_related)
+                        related.insert()
+                        related_ids.append(related.id)
+
+            with count_queries(self.app) as statements:
+                response = self.client.patch(
+                    f'/movies/{movie_id}',
+                    json={'actors': related_ids}
+                )
+                self.assertEqual(response.status_code, 200)
+
+            data = response.get_json()
+            self.assertEqual(len(data['data'][0]['actors']), count * 2)
+            return statements
+
+        few_statements = update_actors(1)
+        many_statements = update_actors(5)
+        self.assertEqual(len(few_statements), len(many_statements))
+
+    def test_update_movie_actors_with_one_lookup_query(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+
+        related_ids = []
+        with self.app.app_context():
+            owner = Movie(**mock_data['movie_a'])
+            owner.insert()
+            owner_id = owner.id
+
+            for mock_related in mock_data['actors_b']:
+                related = Actor(**mock_related)
+                related.insert()
+                related_ids.append(related.id)
+
+        with count_queries(self.app) as statements:
+            response = self.client.patch(
+                f'/movies/{owner_id}',
+                json={'actors': related_ids}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        lookups = [
+            statement
+            for statement in statements
+            if 'WHERE actor.id IN' in statement
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(len(statements), 7)
+
+    def create_movie_with_actors(self, count, cast_count):
+        with self.app.app_context():
+            movie = Movie(**mock_data['movie_a'])
+            related = []
+            for index in range(count):
+                mock_related = mock_data['actors_b'][index % 2]
+                actor = Actor(**mock_related)
+                actor.insert()
+                related.append(actor)
+
+            movie.actors = related[:cast_count]
+            movie.insert()
+            return movie.id, [actor.id for actor in related]
+
+    def retrieve_actors_ids(self, movie_id):
+        with self.app.app_context():
+            movie = Movie.query.get(movie_id)
+            return sorted(actor.id for actor in movie.actors)
+
+    def test_update_movie_actors_with_association_diff(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        movie_id, actor_ids = self.create_movie_with_actors(3, 2)
+
+        with count_queries(self.app) as statements:
+            response = self.client.patch(
+                f'/movies/{movie_id}',
+                json={'actors': actor_ids[1:]}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        deletes = [
+            statement
+            for statement in statements
+            if statement.startswith('DELETE FROM actor_movie')
+        ]
+        inserts = [
+            statement
+            for statement in statements
+            if statement.startswith('INSERT INTO actor_movie')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.retrieve_actors_ids(movie_id), actor_ids[1:])
+
+    def test_update_movie_when_actors_added(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        movie_id, actor_ids = self.create_movie_with_actors(3, 2)
+
+        response = self.client.patch(
+            f'/movies/{movie_id}',
+            json={'add_actors': actor_ids[1:]}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(
+            [actor['id'] for actor in data['data'][0]['actors']],
+            actor_ids
+        )
+        self.assertEqual(self.retrieve_actors_ids(movie_id), actor_ids)
+
+    def test_update_movie_when_actors_removed(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        movie_id, actor_ids = self.create_movie_with_actors(3, 3)
+
+        response = self.client.patch(
+            f'/movies/{movie_id}',
+            json={'remove_actors': actor_ids[:1] + [100]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.retrieve_actors_ids(movie_id), actor_ids[1:])
+
+    def test_update_movie_when_added_actors_not_found(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        movie_id, actor_ids = self.create_movie_with_actors(1, 1)
+
+        response = self.client.patch(
+            f'/movies/{movie_id}',
+            json={'add_actors': [100]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data['invalid_params'][0]['name'], 'add_actors[0]')
+        self.assertEqual(self.retrieve_actors_ids(movie_id), actor_ids)
+
+    def test_update_movie_when_actors_changes_combined(self):
+        set_auth_token(self.client, DIRECTOR_TOKEN)
+        movie_id, actor_ids = self.create_movie_with_actors(2, 1)
+
+        expected = {
+            'success': False,
+            'description': 'The request parameters are not valid.',
+            'invalid_params': [{
+                'name': 'add_actors',
+                'reason': 'Can not be combined with "actors".'
+            }]
+        }
+
+        response = self.client.patch(
+            f'/movies/{movie_id}',
+            json={'actors': actor_ids[:1], 'add_actors': actor_ids[1:]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data = response.get_json()
+        self.assertEqual(data, expected)
+
 
 if __name__ == '__main__':
     main()
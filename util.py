@@ -1,10 +1,23 @@
 import os
+import json
+import time
+import base64
+import hashlib
 from pathlib import Path
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from flask import request
+from flask import g, request, Response, stream_with_context
+from flask.json import dumps as json_dumps
 from werkzeug.exceptions import BadRequest
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
 from datetime import datetime
-from models.database import db
+from jose import jwt
+from sqlalchemy import event, literal, tuple_
+from sqlalchemy.orm import load_only
+from Crypto.PublicKey import RSA
+from sqlalchemy.engine.url import make_url
+from models.database import db, InstrumentedQueuePool
+from auth import AUTH0_DOMAIN, API_AUDIENCE
 
 
 load_dotenv()
@@ -45,6 +58,33 @@ def get_database_url(db_name=None):
     return db_url
 
 
+def get_pool_options():
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_logging_name': 'primary',
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': bool(int(os.getenv('DB_POOL_PRE_PING', 1)))
+    }
+
+
+def get_engine_options(database_url):
+    backend = make_url(database_url).get_backend_name()
+    if backend == 'sqlite':
+        return {}
+
+    options = get_pool_options()
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    if statement_timeout and backend in ('postgresql', 'postgres'):
+        options['connect_args'] = {
+            'options': f'-c statement_timeout={statement_timeout}'
+        }
+
+    return options
+
+
 def load_data(schema, partial=False):
     if not request.data:
         raise BadRequest(
@@ -64,6 +104,172 @@ def load_data(schema, partial=False):
     return data
 
 
+def fetch_entities(model, ids):
+    identity_cache = g.setdefault('identity_cache', {})
+    entities = identity_cache.setdefault(model, {})
+
+    ids = list(dict.fromkeys(ids))
+    missing_ids = [id for id in ids if id not in entities]
+    if missing_ids:
+        found = model.query.\
+            filter(model.id.in_(missing_ids)).\
+            options(load_only('id')).\
+            all()
+        for entity in found:
+            entities[entity.id] = entity
+        for id in missing_ids:
+            entities.setdefault(id, None)
+
+    return [
+        entities[id]
+        for id in ids
+        if entities[id] is not None
+    ]
+
+
+def load_args(schema):
+    return schema.load(request.args)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    data = base64.urlsafe_b64decode(cursor + padding)
+    return json.loads(data)
+
+
+def sort_columns(id_column, sort='id'):
+    descending = sort.startswith('-')
+    name = sort.lstrip('-')
+
+    columns = [id_column]
+    if name != id_column.key:
+        columns.insert(0, getattr(id_column.class_, name))
+
+    return columns, descending
+
+
+def order_by_sort(query, id_column, sort='id'):
+    columns, descending = sort_columns(id_column, sort)
+    return query.order_by(*[
+        column.desc() if descending else column
+        for column in columns
+    ])
+
+
+def page_query(query, id_column, limit, cursor=None, sort='id'):
+    columns, descending = sort_columns(id_column, sort)
+
+    if cursor is not None:
+        values = [cursor['id']]
+        if len(columns) > 1:
+            values.insert(0, cursor['value'])
+
+        position = tuple_(*columns)
+        after = tuple_(*[
+            literal(value, column.type)
+            for column, value in zip(columns, values)
+        ])
+        if descending:
+            query = query.filter(position < after)
+        else:
+            query = query.filter(position > after)
+
+    return order_by_sort(query, id_column, sort).\
+        limit(limit + 1)
+
+
+def split_page(rows, id_column, limit, sort='id'):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        columns, _ = sort_columns(id_column, sort)
+        next_cursor = encode_cursor(
+            create_cursor(rows[-1], columns, sort)
+        )
+
+    return rows, next_cursor
+
+
+def paginate(query, id_column, limit, cursor=None, sort='id'):
+    rows = page_query(query, id_column, limit, cursor, sort).all()
+    return split_page(rows, id_column, limit, sort)
+
+
+def create_cursor(row, columns, sort):
+    cursor = {}
+    if sort != 'id':
+        cursor['sort'] = sort
+    if len(columns) > 1:
+        value = getattr(row, columns[0].key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        cursor['value'] = value
+    cursor['id'] = row.id
+    return cursor
+
+
+def create_validators(versions, full_path):
+    digest = hashlib.sha1(full_path.encode())
+    for name, version, _ in versions:
+        digest.update(f'{name}:{version};'.encode())
+
+    last_modified = max(updated_at for _, _, updated_at in versions)
+    return digest.hexdigest(), last_modified.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified, headers):
+    if_none_match = parse_etags(headers.get('If-None-Match'))
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+
+    if_modified_since = parse_date(headers.get('If-Modified-Since'))
+    if if_modified_since:
+        return last_modified <= if_modified_since
+    return False
+
+
+def create_validator_headers(etag, last_modified):
+    return {
+        'ETag': quote_etag(etag, weak=True),
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': 'private, no-cache'
+    }
+
+
+def set_validators(response, etag, last_modified):
+    for name, value in create_validator_headers(etag, last_modified).items():
+        response.headers[name] = value
+    return response
+
+
+def stream_json(rows, serialize, chunk_size=100):
+    def generate():
+        yield '{"success": true, "data": ['
+
+        chunk = []
+        separator = ''
+        for row in rows:
+            chunk.append(separator + json_dumps(serialize(row)))
+            separator = ','
+
+            if len(chunk) >= chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+
+        chunk.append(']}')
+        yield ''.join(chunk)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/json'
+    )
+
+
 def load_test_env():
     env_path = str(Path('.env-test').absolute())
     load_dotenv(env_path)
@@ -73,6 +279,56 @@ def set_auth_token(client, token):
     client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
 
 
+@contextmanager
+def count_queries(app):
+    with app.app_context():
+        engine = db.engine
+
+    statements = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+
+
+def encode_base64url_uint(value):
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def create_signing_key(kid='casting-test'):
+    private_key = RSA.generate(2048)
+    public_jwk = {
+        'kty': 'RSA',
+        'kid': kid,
+        'use': 'sig',
+        'n': encode_base64url_uint(private_key.n),
+        'e': encode_base64url_uint(private_key.e)
+    }
+    return private_key.export_key().decode(), public_jwk
+
+
+def create_token(private_key, kid, permissions, expires_in=3600):
+    claims = {
+        'iss': f'https://{AUTH0_DOMAIN}/',
+        'aud': API_AUDIENCE,
+        'sub': f'casting-test|{kid}',
+        'exp': int(time.time()) + expires_in,
+        'permissions': permissions
+    }
+    return jwt.encode(
+        claims,
+        private_key,
+        algorithm='RS256',
+        headers={'kid': kid}
+    )
+
+
 mock_data = {
     'actor_a': {
         'name': 'Tom Hanks',